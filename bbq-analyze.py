@@ -0,0 +1,57 @@
+""" 
+BBQ Analyze
+Name: Topaz Montague
+Date: 6/4/24
+
+File Description & Approach:
+This Python script backtests the smoker and food alert rules on historical cook CSV files without
+RabbitMQ. Each file is loaded into NumPy/pandas columns and the 2.5-minute smoker drop rule and the
+10-minute food stall rule are evaluated with vectorized window operations (see bbq/backtest.py).
+Every alert is printed as channel, time, temp and window change, followed by a count per channel.
+The results match what the streaming consumers would alert on; pass --verify to check that.
+
+Usage: python bbq-analyze.py [--verify] [file.csv ...]
+
+"""
+
+import sys
+import time
+
+from bbq.backtest import analyze, verify
+from bbq.consumer import DEFAULT_CHANNELS
+
+# Declare variables
+csv_file = 'smoker-temps.csv'
+
+def main(paths, check: bool = False):
+    """Print every alert the rules would fire for the given CSV files.
+
+    Parameters:
+        paths (list[str]): CSV files to analyze
+        check (bool): also replay the files through the streaming logic and compare
+    """
+    start_time = time.perf_counter()
+    results = analyze(paths)
+    elapsed = time.perf_counter() - start_time
+
+    print("file,channel,time,temp,change")
+    for path, alerts in results.items():
+        for alert in alerts:
+            print(f"{path},{alert.channel},{alert.time},{alert.temp},{alert.change}")
+    print()
+    for spec in DEFAULT_CHANNELS:
+        count = sum(1 for alerts in results.values() for alert in alerts if alert.channel == spec.name)
+        print(f"{spec.alert_label} ({spec.name}): {count} alerts")
+    print(f"Analyzed {len(paths)} file(s) in {elapsed:.3f} seconds")
+
+    if check:
+        if verify(paths):
+            print("Vectorized results match the streaming callbacks.")
+        else:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    check = "--verify" in args
+    paths = [arg for arg in args if arg != "--verify"] or [csv_file]
+    main(paths, check)
@@ -0,0 +1,64 @@
+""" 
+BBQ Benchmark
+Name: Topaz Montague
+Date: 6/4/24
+
+File Description & Approach:
+This Python script benchmarks the producer and the three consumers without a RabbitMQ server.
+Messages go through the real ingestion, publish and callback code, with an in-process fake pika
+channel standing in for the broker (see bbq/benchmark.py and bbq/fakes.py). Each stage runs in its
+own process and the script prints messages/sec, p50/p99 per-message latency, CPU seconds and peak
+memory for every stage, so regressions in the callback or publish path show up as numbers. For the
+consumers the latency runs from publish to the alert decision, with deliveries held to the prefetch
+window and each ack taking --rtt milliseconds to reach the fake broker.
+--startup prints the cold-start time of every entry script instead, with its slowest imports,
+so an import that slows down short replay jobs or worker respawns shows up too.
+
+Usage: python bbq-benchmark.py [--csv FILE | --rows N] [--format text|binary] [--envelope N]
+                               [--prefetch N] [--ack-batch N] [--rtt MS] [--log-level LEVEL]
+       python bbq-benchmark.py --startup [--repeat N]
+
+"""
+
+import argparse
+import glob
+import os
+import tempfile
+
+from bbq.benchmark import format_results, format_startup, run_benchmark, startup_times, write_synthetic_csv
+
+# Declare variables
+csv_file = 'smoker-temps.csv'
+rtt_ms = 0.1  # broker round trip for acks, in milliseconds (localhost)
+
+def main():
+    """Parse the options, build the workload and print the results table."""
+    parser = argparse.ArgumentParser(description="Benchmark the smoker pipeline against a fake broker.")
+    parser.add_argument("--csv", default=csv_file, help="workload CSV (default: smoker-temps.csv)")
+    parser.add_argument("--rows", type=int, help="use a synthetic workload with this many rows instead")
+    parser.add_argument("--format", default="text", choices=["text", "binary"], help="message format")
+    parser.add_argument("--envelope", type=int, default=1, help="readings per envelope (1 disables)")
+    parser.add_argument("--prefetch", type=int, default=1, help="consumer prefetch count")
+    parser.add_argument("--ack-batch", type=int, default=1, help="messages per cumulative ack")
+    parser.add_argument("--rtt", type=float, default=rtt_ms, help=f"ack round trip in ms (default: {rtt_ms})")
+    parser.add_argument("--log-level", default="INFO", help="consumer log level (WARNING logs alerts only)")
+    parser.add_argument("--startup", action="store_true", help="measure entry script cold-start times instead")
+    parser.add_argument("--repeat", type=int, default=5, help="cold starts per script (default: 5)")
+    args = parser.parse_args()
+
+    if args.startup:
+        scripts = sorted(glob.glob("bbq-*.py"))
+        print(format_startup(startup_times(scripts, args.repeat)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.csv
+        if args.rows:
+            path = write_synthetic_csv(os.path.join(tmp, "synthetic.csv"), args.rows)
+        print(f"Workload: {path if not args.rows else f'synthetic, {args.rows} rows'}")
+        results = run_benchmark(path, args.format, args.envelope, args.prefetch, args.ack_batch, args.log_level,
+                                args.rtt / 1000)
+    print(format_results(results))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+""" 
+BBQ Consumer (asyncio)
+Name: Topaz Montague
+Date: 6/4/24
+
+File Description & Approach:
+This Python script is the asyncio version of bbq-consumer.py. One event loop serves the smoker,
+Food A and Food B queues through pika's AsyncioConnection adapter (see bbq/aio.py), along with the
+ack flush timer and the email alerts. The windows, thresholds and alert text come from the same
+ChannelSpec declarations, and the processed messages per second are printed on exit. A lost
+connection is reopened with backoff and every channel is registered again.
+
+"""
+
+import asyncio
+import sys
+
+import pika
+
+from bbq.aio import consume
+from bbq.consumer import FOOD_A_CHANNEL, FOOD_B_CHANNEL, SMOKER_CHANNEL
+from bbq.log import setup_logging
+
+# Declare variables
+channels = [SMOKER_CHANNEL, FOOD_A_CHANNEL, FOOD_B_CHANNEL]
+prefetch_count = 1  # unacknowledged messages the broker may send per channel
+ack_batch = 1  # processed messages per cumulative ack (must not exceed prefetch_count)
+ack_interval = 0.5  # max seconds before pending acks are flushed
+heartbeat = 30  # seconds between AMQP heartbeats; a dead connection is noticed and reconnected within about two
+checkpoint_dir = "checkpoints"  # per-channel window checkpoints restored on restart; None disables
+log_level = "INFO"  # "DEBUG" adds the SMTP transcript; "WARNING" shows only alerts
+log_sample_every = 1  # log one "Current temp" line in every N readings (alerts are always logged)
+
+def main(hn: str = "localhost"):
+    """Continuously listen for temperature messages on every channel.
+
+    Parameters:
+        hn (str): the host name or IP address of the RabbitMQ server
+    """
+    setup_logging(log_level, log_sample_every)
+    try:
+        print(" [*] Starting asyncio consumer. To exit press CTRL+C")
+        asyncio.run(consume(hn, channels, prefetch_count, ack_batch, ack_interval,
+                            checkpoint_dir=checkpoint_dir, heartbeat=heartbeat))
+    except pika.exceptions.AMQPConnectionError as e:
+        print()
+        print("ERROR: connection to RabbitMQ server failed.")
+        print(f"Verify the server is running on host={hn}.")
+        print(f"The error says: {e}")
+        print()
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print()
+        print(" User interrupted continuous listening process.")
+        sys.exit(0)
+
+if __name__ == "__main__":
+    main("localhost")
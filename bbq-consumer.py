@@ -0,0 +1,56 @@
+""" 
+BBQ Consumer
+Name: Topaz Montague
+Date: 6/4/24
+
+File Description & Approach:
+This Python script monitors the smoker, Food A and Food B temperature queues from a single process
+with the consumer engine in bbq/consumer.py: one RabbitMQ connection, one channel per queue. The
+channels are declared in CHANNELS (queue, window, threshold and alert text); to monitor another
+probe, add a ChannelSpec. The settings below tune delivery (prefetch_count, ack_batch), add alert
+rules from a TOML file (rules_file, see rules.example.toml), and choose where checkpoints, history,
+ETA forecasts and metrics go.
+
+"""
+
+from bbq.consumer import FOOD_A_CHANNEL, FOOD_B_CHANNEL, SMOKER_CHANNEL, run
+from bbq.log import setup_logging
+from bbq.metrics import configure
+from bbq.rules import apply_rules, load_rules
+
+# Declare variables
+channels = [SMOKER_CHANNEL, FOOD_A_CHANNEL, FOOD_B_CHANNEL]
+prefetch_count = 1  # unacknowledged messages the broker may send per channel
+ack_batch = 1  # processed messages per cumulative ack (must not exceed prefetch_count)
+ack_interval = 0.5  # max seconds before pending acks are flushed
+max_envelope = 1000  # largest envelope (in readings) accepted from the producer
+max_retries = 3  # retries of a message whose processing fails before it goes to the dead-letter queue
+retry_delay = 5.0  # seconds before a failed message is retried
+catchup_threshold = 1000  # queued messages that switch to catch-up mode (large prefetch and ack batches); None disables
+heartbeat = 30  # seconds between AMQP heartbeats; a dead connection is noticed and reconnected within about two
+rules_file = None  # TOML file of extra alert rules, e.g. "rules.toml"; None uses only the built-in rules
+results_queue = "04-eta"  # queue the food ETA forecasts are published on (JSON); None disables
+history_dir = "history"  # store every reading with 1/10 minute rollups for charts (see bbq-history.py); None disables
+checkpoint_dir = "checkpoints"  # per-channel window checkpoints restored on restart; None disables
+log_level = "INFO"  # "DEBUG" adds the SMTP transcript; "WARNING" shows only alerts
+log_sample_every = 1  # log one "Current temp" line in every N readings (alerts are always logged)
+log_structured = False  # key=value log lines instead of plain text
+metrics_port = None  # serve latency/throughput metrics on http://127.0.0.1:<port>/metrics
+metrics_interval = None  # print the metrics every N seconds
+
+def main(hn: str = "localhost"):
+    """Continuously listen for temperature messages on every channel.
+
+    Parameters:
+        hn (str): the host name or IP address of the RabbitMQ server
+    """
+    setup_logging(log_level, log_sample_every, log_structured)
+    configure(metrics_port, metrics_interval)
+    specs = apply_rules(channels, load_rules(rules_file)) if rules_file else channels
+    run(hn, specs, prefetch_count=prefetch_count, ack_batch=ack_batch, ack_interval=ack_interval,
+        max_envelope=max_envelope, checkpoint_dir=checkpoint_dir, results_queue=results_queue,
+        history_dir=history_dir, max_retries=max_retries, retry_delay=retry_delay,
+        catchup_threshold=catchup_threshold, heartbeat=heartbeat)
+
+if __name__ == "__main__":
+    main("localhost")
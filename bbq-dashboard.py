@@ -0,0 +1,70 @@
+"""
+BBQ Dashboard
+Name: Topaz Montague
+Date: 6/4/24
+
+File Description & Approach:
+This Python script serves a live dashboard of the smoker and food temperatures at
+http://127.0.0.1:8050/. It reads a copy of every reading through its own exclusive queue on the
+readings and fleet exchanges, so the alerting consumers still get every message (see
+bbq/dashboard.py). Browsers get the recent readings from an in-memory ring buffer when they connect
+and then coalesced updates over Server-Sent Events, at most max_rate per second each; a slow
+browser only gets fewer updates and never slows down the consumers. Add ?prefix=pit-07/ to the URL
+to follow one fleet device. /history?series=01-smoker&hours=12 returns the stored rollups when
+history_dir is set.
+
+"""
+
+import sys
+
+import pika
+
+from bbq.consumer import FOOD_A_CHANNEL, FOOD_B_CHANNEL, SMOKER_CHANNEL
+from bbq.dashboard import DashboardFeed, LiveState, serve
+from bbq.tsdb import HistoryStore
+
+# Declare variables
+channels = [SMOKER_CHANNEL, FOOD_A_CHANNEL, FOOD_B_CHANNEL]
+port = 8050  # dashboard port
+bind_host = "127.0.0.1"  # "0.0.0.0" serves other machines on the network
+max_rate = 2.0  # most updates per second pushed to one browser
+ring_size = 600  # recent readings kept per channel for browsers that connect mid-cook
+max_backlog = 10000  # messages the dashboard queue holds before the broker drops the oldest
+max_clients = 200  # browsers streaming at once
+heartbeat = 30  # seconds between AMQP heartbeats; the feed reconnects after a lost connection
+history_dir = "history"  # history store written by the consumers (see bbq-history.py); None disables /history
+
+def main(hn: str = "localhost"):
+    """Serve the dashboard until interrupted.
+
+    Parameters:
+        hn (str): the host name or IP address of the RabbitMQ server
+    """
+    state = LiveState(ring_size)
+    feed = DashboardFeed(hn, state, channels, max_backlog, heartbeat)
+    try:
+        feed.start()
+    except pika.exceptions.AMQPConnectionError as e:
+        print()
+        print("ERROR: connection to RabbitMQ server failed.")
+        print(f"Verify the server is running on host={hn}.")
+        print(f"The error says: {e}")
+        print()
+        sys.exit(1)
+
+    history = HistoryStore(history_dir) if history_dir is not None else None
+    server = serve(state, port, bind_host, max_rate=max_rate, max_clients=max_clients, history=history)
+    try:
+        print(f" [*] Dashboard on http://{bind_host}:{port}/ . To exit press CTRL+C")
+        feed.run_forever()
+    except KeyboardInterrupt:
+        print()
+        print(" User interrupted continuous listening process.")
+    finally:
+        print("\nClosing connection. Goodbye.\n")
+        server.shutdown()
+        feed.close()
+    sys.exit(0)
+
+if __name__ == "__main__":
+    main("localhost")
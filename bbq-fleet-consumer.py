@@ -0,0 +1,97 @@
+"""
+BBQ Fleet Consumer
+Name: Topaz Montague
+Date: 6/4/24
+
+File Description & Approach:
+This Python script is one worker of the fleet consumer. The fleet exchange spreads devices over
+shards queues by a stable hash of the device id (see bbq/fleet.py), and this worker serves the
+shards where shard % workers == worker, keeping separate window state and alerts for every smoker
+on them. Start one worker per core or host with the same workers count and a different --worker,
+and run the producer with fleet_device set to publish into the fleet.
+
+Usage: python bbq-fleet-consumer.py [--worker I] [--workers N] [--shards N]
+
+"""
+
+import argparse
+import sys
+
+import pika
+
+from bbq.consumer import FOOD_A_CHANNEL, FOOD_B_CHANNEL, SMOKER_CHANNEL
+from bbq.fleet import DEFAULT_SHARDS, FleetEngine, owned_shards
+from bbq.log import setup_logging
+from bbq.metrics import configure
+from bbq.rules import apply_rules, load_rules
+
+# Declare variables
+channels = [SMOKER_CHANNEL, FOOD_A_CHANNEL, FOOD_B_CHANNEL]
+prefetch_count = 100  # unacknowledged messages the broker may send per shard
+ack_batch = 50  # processed messages per cumulative ack (must not exceed prefetch_count)
+ack_interval = 0.5  # max seconds before pending acks are flushed
+max_envelope = 1000  # largest envelope (in readings) accepted from a producer
+max_retries = 3  # retries of a message whose processing fails before it goes to the dead-letter queue
+retry_delay = 5.0  # seconds before a failed message is retried
+catchup_threshold = 10000  # queued messages that switch to catch-up mode (large prefetch and ack batches); None disables
+heartbeat = 30  # seconds between AMQP heartbeats; a dead connection is noticed and reconnected within about two
+rules_file = None  # TOML file of extra alert rules (see rules.example.toml); None uses only the built-in rules
+history_dir = "history"  # store every reading with 1/10 minute rollups for charts (see bbq-history.py); None disables
+checkpoint_dir = "checkpoints/fleet"  # per-device window checkpoints restored on restart; None disables
+device_idle_timeout = 3600.0  # seconds without readings before a device's windows are dropped (restored from its checkpoint if it returns); None keeps every device
+log_level = "INFO"  # "WARNING" shows only alerts
+log_sample_every = 100  # log one "Current temp" line in every N readings (alerts are always logged)
+log_structured = False  # key=value log lines instead of plain text
+metrics_port = None  # serve latency/throughput metrics on http://127.0.0.1:<port>/metrics
+metrics_interval = None  # print the metrics every N seconds
+
+def main(hn: str = "localhost"):
+    """Serve this worker's shards until interrupted.
+
+    Parameters:
+        hn (str): the host name or IP address of the RabbitMQ server
+    """
+    parser = argparse.ArgumentParser(description="Run one fleet consumer worker.")
+    parser.add_argument("--worker", type=int, default=0, help="index of this worker (default: 0)")
+    parser.add_argument("--workers", type=int, default=1, help="workers sharing the fleet (default: 1)")
+    parser.add_argument("--shards", type=int, default=DEFAULT_SHARDS, help="shard queues in the fleet")
+    args = parser.parse_args()
+
+    setup_logging(log_level, log_sample_every, log_structured)
+    configure(metrics_port, metrics_interval)
+    shards = owned_shards(args.worker, args.workers, args.shards)
+    specs = apply_rules(channels, load_rules(rules_file)) if rules_file else channels
+    engine = FleetEngine(hn, shards, args.shards, specs, prefetch_count=prefetch_count,
+                         ack_batch=ack_batch, ack_interval=ack_interval, max_envelope=max_envelope,
+                         checkpoint_dir=checkpoint_dir, history_dir=history_dir,
+                         max_retries=max_retries, retry_delay=retry_delay,
+                         catchup_threshold=catchup_threshold, heartbeat=heartbeat,
+                         device_idle_timeout=device_idle_timeout)
+    try:
+        engine.start()
+    except pika.exceptions.AMQPConnectionError as e:
+        print()
+        print("ERROR: connection to RabbitMQ server failed.")
+        print(f"Verify the server is running on host={hn}.")
+        print(f"The error says: {e}")
+        print()
+        sys.exit(1)
+
+    try:
+        print(f" [*] Worker {args.worker} of {args.workers} ready for work on shards {shards}. To exit press CTRL+C")
+        engine.run_forever()
+    except Exception as e:
+        print()
+        print("ERROR: something went wrong.")
+        print(f"The error says: {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print()
+        print(" User interrupted continuous listening process.")
+        sys.exit(0)
+    finally:
+        print("\nClosing connection. Goodbye.\n")
+        engine.close()
+
+if __name__ == "__main__":
+    main("localhost")
@@ -0,0 +1,83 @@
+"""
+BBQ Fleet Supervisor
+Name: Topaz Montague
+Date: 6/4/24
+
+File Description & Approach:
+This Python script runs a pool of fleet consumer workers, one process per core by default, so a
+large fleet or a replayed backlog is processed on every core of the box (see bbq/supervisor.py).
+Each worker owns its share of the shard queues and the devices on them, and reconnects to the
+broker on its own. The supervisor restarts a crashed worker with exponential backoff and prints
+the fleet totals every stats_interval seconds.
+
+Usage: python bbq-fleet-supervisor.py [--workers N] [--shards N]
+
+"""
+
+import argparse
+import os
+import signal
+import sys
+
+from bbq.consumer import FOOD_A_CHANNEL, FOOD_B_CHANNEL, SMOKER_CHANNEL
+from bbq.fleet import DEFAULT_SHARDS
+from bbq.rules import apply_rules, load_rules
+from bbq.supervisor import Supervisor
+
+# Declare variables
+channels = [SMOKER_CHANNEL, FOOD_A_CHANNEL, FOOD_B_CHANNEL]
+prefetch_count = 100  # unacknowledged messages the broker may send per shard
+ack_batch = 50  # processed messages per cumulative ack (must not exceed prefetch_count)
+ack_interval = 0.5  # max seconds before pending acks are flushed
+max_envelope = 1000  # largest envelope (in readings) accepted from a producer
+max_retries = 3  # retries of a message whose processing fails before it goes to the dead-letter queue
+retry_delay = 5.0  # seconds before a failed message is retried
+catchup_threshold = 10000  # queued messages that switch to catch-up mode (large prefetch and ack batches); None disables
+heartbeat = 30  # seconds between AMQP heartbeats; a dead connection is noticed and reconnected within about two
+rules_file = None  # TOML file of extra alert rules (see rules.example.toml); None uses only the built-in rules
+history_dir = "history"  # store every reading with 1/10 minute rollups for charts (see bbq-history.py); None disables
+checkpoint_dir = "checkpoints/fleet"  # per-device window checkpoints restored on restart; None disables
+device_idle_timeout = 3600.0  # seconds without readings before a device's windows are dropped (restored from its checkpoint if it returns); None keeps every device
+log_level = "WARNING"  # "INFO" adds sampled "Current temp" lines from every worker
+log_sample_every = 100  # log one "Current temp" line in every N readings (alerts are always logged)
+stats_interval = 10.0  # seconds between fleet stats lines
+metrics_port = None  # worker i serves metrics on metrics_port + i; None disables
+
+def main(hn: str = "localhost"):
+    """Run the worker pool until interrupted.
+
+    Parameters:
+        hn (str): the host name or IP address of the RabbitMQ server
+    """
+    parser = argparse.ArgumentParser(description="Run a pool of fleet consumer workers.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: one per core)")
+    parser.add_argument("--shards", type=int, default=DEFAULT_SHARDS, help="shard queues in the fleet")
+    args = parser.parse_args()
+
+    specs = apply_rules(channels, load_rules(rules_file)) if rules_file else channels
+    engine_options = {"specs": specs, "prefetch_count": prefetch_count, "ack_batch": ack_batch,
+                      "ack_interval": ack_interval, "max_envelope": max_envelope, "checkpoint_dir": checkpoint_dir,
+                      "history_dir": history_dir, "max_retries": max_retries, "retry_delay": retry_delay,
+                      "catchup_threshold": catchup_threshold, "heartbeat": heartbeat,
+                      "device_idle_timeout": device_idle_timeout}
+    log_options = {"level": log_level, "sample_every": log_sample_every}
+    workers = min(args.workers, args.shards)
+    supervisor = Supervisor(hn, workers, args.shards, engine_options, log_options,
+                            stats_interval=stats_interval, metrics_port=metrics_port)
+    # Treat SIGTERM like CTRL+C so the workers are stopped cleanly
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        supervisor.start()
+        print(f" [*] Supervising {workers} workers on {args.shards} shards. To exit press CTRL+C")
+        supervisor.run_forever()
+    except KeyboardInterrupt:
+        print()
+        print(" User interrupted continuous listening process.")
+    finally:
+        print("\nStopping workers. Goodbye.\n")
+        supervisor.stop()
+    sys.exit(0)
+
+if __name__ == "__main__":
+    main("localhost")
@@ -0,0 +1,56 @@
+""" 
+BBQ History
+Name: Topaz Montague
+Date: 6/4/24
+
+File Description & Approach:
+This Python script prints the temperature curve of a channel from the history store the consumers
+write (see bbq/tsdb.py). It reads the 1 or 10 minute rollups (min, max and mean per bucket) that
+cover the requested range in at most --points rows, so even a long cook loads in milliseconds;
+short ranges are answered from the raw readings.
+
+Usage: python bbq-history.py [SERIES] [--hours H] [--points N] [--root DIR]
+       python bbq-history.py --list
+SERIES is a channel queue ("01-smoker") or, in fleet mode, "<device>/<queue>" ("pit-07/01-smoker").
+
+"""
+
+import argparse
+import time
+
+from bbq.tsdb import HistoryStore
+
+# Declare variables
+history_dir = "history"
+
+def main():
+    """Parse the options and print the curve or the stored series."""
+    parser = argparse.ArgumentParser(description="Print a channel's temperature history.")
+    parser.add_argument("series", nargs="?", default="01-smoker", help="series name (default: 01-smoker)")
+    parser.add_argument("--hours", type=float, default=12.0, help="hours before the newest reading (default: 12)")
+    parser.add_argument("--points", type=int, default=100, help="max rows to print (default: 100)")
+    parser.add_argument("--root", default=history_dir, help="history store directory")
+    parser.add_argument("--list", action="store_true", help="list the stored series")
+    args = parser.parse_args()
+
+    store = HistoryStore(args.root)
+    if args.list:
+        print("\n".join(store.names()))
+        return
+    # Cooks are often replayed from old CSV files, so the range ends at the newest reading
+    last = store.latest(args.series)
+    if last is None:
+        print(f"No readings stored for {args.series} in {args.root}")
+        return
+    started = time.perf_counter()
+    resolution, points = store.query(args.series, last - args.hours * 3600, last, args.points)
+    elapsed = time.perf_counter() - started
+    label = f"{resolution // 60} minute buckets" if resolution else "raw readings"
+    print(f"{args.series}: {len(points)} rows of {label} in {elapsed * 1000:.1f} ms")
+    print(f"{'time (UTC)':<20}{'min':>8}{'max':>8}{'mean':>8}{'n':>6}")
+    for point in points:
+        stamp = time.strftime("%m/%d/%y %H:%M:%S", time.gmtime(point.timestamp))
+        print(f"{stamp:<20}{point.min:>8.1f}{point.max:>8.1f}{point.mean:>8.1f}{point.count:>6}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+""" 
+BBQ Producer (asyncio)
+Name: Topaz Montague
+Date: 6/4/24
+
+File Description & Approach:
+This Python script is the asyncio version of bbq-producer.py. It replays the CSV file onto the same
+three durable queues through pika's AsyncioConnection adapter (see bbq/aio.py), pacing rows with the
+same replay clock, and reports the sustained messages per second so it can be compared with the
+blocking producer. While the broker is away, readings are held in a bounded spill buffer and sent
+in order after a reconnect with backoff.
+
+"""
+
+import asyncio
+import sys
+
+import pika
+
+from bbq.aio import produce
+from bbq.messages import TEXT
+
+# Declare variables
+smoker_temp_queue = "01-smoker"
+foodA_temp_queue = "02-food-A"
+foodB_temp_queue = "03-food-B"
+csv_file = 'smoker-temps.csv'
+replay_speed = 1.0  # 1.0 replays in real time, 60.0 at 60x, None as fast as possible
+message_format = TEXT  # "text" (legacy "<time>, <temp>") or "binary" (packed, versioned)
+heartbeat = 30  # seconds between AMQP heartbeats; a dead connection is noticed within about two
+spill_size = 100000  # messages held while the broker is unreachable; the oldest are dropped beyond this
+
+def main(host: str, csv_file: str, speed: float | None = replay_speed):
+    """
+    Replay the CSV file onto the temperature queues on an asyncio event loop.
+
+    Parameters:
+        host (str): the host name or IP address of the RabbitMQ server
+        csv_file (str): the CSV file to read data from
+        speed (float | None): replay multiplier for the CSV timestamps; None means unthrottled
+    """
+    queues = (smoker_temp_queue, foodA_temp_queue, foodB_temp_queue)
+    try:
+        stats = asyncio.run(produce(host, csv_file, queues, speed, message_format, spill_size, heartbeat))
+        print(f" [x] Sent {stats['sent']} messages at {stats['rate']:.0f} msgs/sec"
+              f" ({stats['dropped']} dropped while the broker was unreachable)")
+    except pika.exceptions.AMQPConnectionError as e:
+        print(f"Error: Connection to RabbitMQ server failed: {e}")
+        sys.exit(30)
+    except FileNotFoundError as e:
+        print(f"Error: CSV file not found: {e}")
+        sys.exit(30)
+
+if __name__ == "__main__":
+    main("localhost", csv_file)
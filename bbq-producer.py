@@ -4,29 +4,60 @@ Name: Topaz Montague
 Date: 6/4/24
 
 File Description & Approach:
-This Python script reads temperature data from a CSV file and sends it to three RabbitMQ task queues, 
-simulating real-time temperature readings from a smart smoker and two food items. It establishes a RabbitMQ connection, 
-clears any existing messages in the queues, and declares durable queues for message persistence. 
-The script iterates through the CSV file, converts temperature readings to floats, formats them as messages, 
-and publishes them to the respective queues with a 30-second delay between readings. 
-Error handling ensures graceful exit if the RabbitMQ connection fails, and the connection is closed after processing
+This Python script replays a smart smoker cook from a CSV file into RabbitMQ. The smoker, Food A
+and Food B temperatures are published to their durable queues through the bbq.readings exchange,
+so the live dashboard can receive a copy of each one. The file is streamed in blocks with blank
+cells skipped (see bbq/ingest.py), and rows are paced by their "Time (UTC)" timestamps at
+replay_speed (1x is real time; None sends as fast as possible).
+
+The settings below choose how readings are sent: publish_mode "confirm" batches messages with
+publisher confirms (see bbq/publisher.py), message_format "binary" sends 13-byte readings and
+envelope_size packs many readings into one message (see bbq/messages.py), and fleet_device
+publishes the cook as one smoker of the fleet (see bbq/fleet.py). If the broker goes away, readings
+are held in a bounded spill buffer and sent in order once the connection is back. The sustained
+messages per second are reported when the file has been sent.
 
 """
 
-import csv
 import pika
 import sys
 import time
-import webbrowser
+
+from bbq.ingest import iter_row_chunks
+from bbq.log import readings_log, setup_logging
+from bbq.fleet import FLEET_EXCHANGE, declare_fleet, device_properties, routing_key
+from bbq.messages import (BINARY, FOOD_A_ID, FOOD_B_ID, READINGS_EXCHANGE, SMOKER_ID, TEXT, EnvelopePacker,
+                          declare_readings, message_properties)
+from bbq.metrics import configure, registry, stamp
+from bbq.publisher import BlockingPublisher, ConfirmPublisher
+from bbq.replay import ReplayClock
 
 # Declare variables
 smoker_temp_queue = "01-smoker"
 foodA_temp_queue = "02-food-A"
 foodB_temp_queue = "03-food-B"
 csv_file = 'smoker-temps.csv'
+publish_mode = "blocking"  # "blocking" sends one message per round trip; "confirm" batches with publisher confirms
+batch_size = 100  # confirm mode: messages per batch
+batch_linger = 0.05  # confirm mode: max seconds a message waits in a partial batch
+replay_speed = 1.0  # 1.0 replays in real time, 60.0 at 60x, None as fast as possible
+message_format = TEXT  # "text" (legacy "<time>, <temp>") or "binary" (packed, versioned)
+envelope_size = 1  # readings per envelope message; 1 sends one message per reading
+envelope_linger = 1.0  # max seconds a reading waits in a partial envelope
+log_level = "INFO"  # "DEBUG", "INFO" or "WARNING" (WARNING hides the per-message lines)
+log_sample_every = 1  # log one " [x] Sent" line in every N messages
+log_structured = False  # key=value log lines instead of plain text
+metrics_port = None  # serve publish metrics on this port (and stamp publish times); None disables
+fleet_device = None  # publish as this device id (letters, digits, "-" and "_") to the fleet exchange (always binary); None uses the three queues
+fleet_shards = 8  # shard queues in the fleet topology (must match the fleet consumers)
+reset_queues = False  # delete the three queues (and any unconsumed readings) before sending
+heartbeat = 30  # seconds between AMQP heartbeats; a dead connection is noticed within about two
+spill_size = 100000  # messages held while the broker is unreachable; the oldest are dropped beyond this
 
 def offer_rabbitmq_admin_site(show_offer):
     """Offer to open the RabbitMQ Admin website."""
+    import webbrowser
+
     if show_offer == "True":
         ans = input("Would you like to monitor RabbitMQ queues? y or n ")
         print()
@@ -37,7 +68,10 @@ def offer_rabbitmq_admin_site(show_offer):
         webbrowser.open_new("http://localhost:15672/#/queues")
         print()
 
-def main(host: str, csv_file: str):
+def main(host: str, csv_file: str, mode: str = publish_mode, speed: float | None = replay_speed,
+         message_format: str = message_format, envelope_size: int = envelope_size,
+         envelope_linger: float = envelope_linger, device: str | None = fleet_device,
+         shards: int = fleet_shards):
     """
     Creates and sends a message to the queue each execution.
     This process runs and finishes.
@@ -45,67 +79,125 @@ def main(host: str, csv_file: str):
     Parameters:
         host (str): the host name or IP address of the RabbitMQ server
         csv_file (str): the CSV file to read data from
+        mode (str): "blocking" or "confirm" (batched publishing with publisher confirms)
+        speed (float | None): replay multiplier for the CSV timestamps; None means unthrottled
+        message_format (str): "text" or "binary" (ignored for envelopes, which are always binary)
+        envelope_size (int): readings per envelope message; 1 disables envelopes
+        envelope_linger (float): max seconds a reading waits in a partial envelope
+        device (str | None): publish to the fleet exchange as this device; None uses the three queues
+        shards (int): shard queues in the fleet topology
     """
     try:
-        # Read CSV file
-        with open(csv_file, 'r') as file:
-            reader = csv.reader(file, delimiter=',')
-            # Skip header
-            header = next(reader)
-
+        # Read CSV file in blocks (the header is skipped by the reader)
+        with open(csv_file, 'rb') as file:
+            link = None
             try:
-                # Create a blocking connection to the RabbitMQ server
-                conn = pika.BlockingConnection(pika.ConnectionParameters(host))
-                # Use the connection to create a communication channel
-                ch = conn.channel()
-
-                # Clear queues to clear out old messages
-                ch.queue_delete(smoker_temp_queue)
-                ch.queue_delete(foodA_temp_queue)
-                ch.queue_delete(foodB_temp_queue)
-
-                # Declare durable queues
-                ch.queue_declare(smoker_temp_queue, durable=True)
-                ch.queue_declare(foodA_temp_queue, durable=True)
-                ch.queue_declare(foodB_temp_queue, durable=True)
-
-                for row in reader:
-                    Time, Channel1, Channel2, Channel3 = row
-
-                    # Convert numbers to floats and send messages to respective queues
-                    try:
-                        smoker_temp = float(Channel1)
-                        smoker_message = f"{Time}, {smoker_temp}".encode()
-                        ch.basic_publish(exchange="", routing_key=smoker_temp_queue, body=smoker_message)
-                        print(f" [x] Sent {smoker_message} on {smoker_temp_queue}")
-                    except ValueError:
-                        pass
-
-                    try:
-                        foodA_temp = float(Channel2)
-                        foodA_message = f"{Time}, {foodA_temp}".encode()
-                        ch.basic_publish(exchange="", routing_key=foodA_temp_queue, body=foodA_message)
-                        print(f" [x] Sent {foodA_message} on {foodA_temp_queue}")
-                    except ValueError:
-                        pass
-
-                    try:
-                        foodB_temp = float(Channel3)
-                        foodB_message = f"{Time}, {foodB_temp}".encode()
-                        ch.basic_publish(exchange="", routing_key=foodB_temp_queue, body=foodB_message)
-                        print(f" [x] Sent {foodB_message} on {foodB_temp_queue}")
-                    except ValueError:
-                        pass
-
-                    # Read values every second
-                    time.sleep(30)
+                queues = (smoker_temp_queue, foodA_temp_queue, foodB_temp_queue)
+                if device is not None:
+                    # Fleet mode: every channel of the device goes to its shard on the fleet exchange,
+                    # as binary readings (the channel id tells the probes apart)
+                    exchange = FLEET_EXCHANGE
+                    message_format = BINARY
+                    declare = lambda ch: declare_fleet(ch, shards)
+                    key = routing_key(device, shards)
+                    queues = (key, key, key)
+                else:
+                    # Durable queues, bound to the readings exchange so a dashboard can copy them
+                    exchange = READINGS_EXCHANGE
+                    declare = lambda ch: declare_readings(ch, queues)
+
+                # Create a blocking connection to the RabbitMQ server, declaring the topology again after a reconnect
+                link = BlockingPublisher(host, declare, spill_size=spill_size, heartbeat=heartbeat)
+                link.connect()
+                if reset_queues and device is None:
+                    # Clear queues to clear out old messages
+                    for queue in queues:
+                        link.channel.queue_delete(queue)
+                    declare(link.channel)
+
+                publisher = None
+                sent_count = 0
+                if mode == "confirm":
+                    # Batch messages and let the broker confirm them asynchronously
+                    publisher = ConfirmPublisher(host, batch_size=batch_size, linger=batch_linger,
+                                                 max_outstanding=spill_size, heartbeat=heartbeat)
+                    publisher.start()
+                    # The confirm publisher has its own connection
+                    link.close()
+
+                properties = message_properties(message_format)
+                channel_ids = (SMOKER_ID, FOOD_A_ID, FOOD_B_ID)
+
+                def send(queue: str, message: bytes, properties=properties):
+                    """Publish one message using the selected mode."""
+                    nonlocal sent_count
+                    sent_count += 1
+                    if device is not None:
+                        # Tag the message with the device id, keeping its content type
+                        properties = device_properties(device, properties)
+                    if registry.enabled:
+                        # Carry the publish time so consumers can measure end-to-end latency
+                        properties = stamp(properties)
+                        registry.counter(f"published.{queue}").inc()
+                    if publisher is not None:
+                        publisher.publish(queue, message, exchange=exchange, properties=properties)
+                    elif link.publish(exchange, queue, message, properties):
+                        readings_log.info(" [x] Sent %r on %s", message, queue, extra={"queue": queue})
+
+                packer = None
+                if envelope_size > 1:
+                    # Pack readings per queue into envelopes published by size or linger time
+                    packer = EnvelopePacker(send, envelope_size, envelope_linger, sleep=link.sleep)
+
+                clock = ReplayClock(speed)
+                start_time = time.perf_counter()
+                # Stream rows with pre-encoded bodies; blank cells are already skipped
+                for rows in iter_row_chunks(file, message_format, channel_ids):
+                    for _, timestamp, readings in rows:
+                        # Wait until this row is due according to its timestamp
+                        if not clock.unthrottled:
+                            if packer is not None:
+                                # Keep publishing envelopes whose linger time runs out while waiting
+                                packer.sleep(clock.delay(timestamp))
+                            else:
+                                clock.wait(timestamp, sleep=link.sleep)
+                        elif packer is not None:
+                            packer.flush_due()
+
+                        # Send messages to respective queues
+                        for column, temp, body in readings:
+                            if packer is not None:
+                                packer.add(queues[column], timestamp, temp, channel_ids[column])
+                            else:
+                                send(queues[column], body)
+
+                if packer is not None:
+                    packer.flush_all()
+
+                # Report the sustained publish rate
+                if publisher is not None:
+                    publisher.close()
+                    stats = publisher.stats()
+                    print(f" [x] Confirmed {stats['confirmed']} of {stats['published']} messages "
+                          f"({stats['retried']} retried, {stats['failed']} failed, {stats['dropped']} dropped) "
+                          f"at {stats['rate']:.0f} msgs/sec")
+                else:
+                    # Give spilled messages a last chance to go out
+                    link.close()
+                    elapsed = time.perf_counter() - start_time
+                    rate = sent_count / elapsed if elapsed > 0 else 0.0
+                    print(f" [x] Sent {sent_count} messages at {rate:.0f} msgs/sec "
+                          f"({link.reconnects} reconnects, {len(link.spill)} unsent, {link.dropped} dropped)")
+                if registry.enabled:
+                    print(registry.render_text())
 
             except pika.exceptions.AMQPConnectionError as e:
                 print(f"Error: Connection to RabbitMQ server failed: {e}")
                 sys.exit(30)
             finally:
                 # Close the connection to the server
-                conn.close()
+                if link is not None:
+                    link.close(timeout=0)
 
     except FileNotFoundError as e:
         print(f"Error: CSV file not found: {e}")
@@ -117,5 +209,7 @@ def main(host: str, csv_file: str):
 # Standard Python idiom to indicate main program entry point
 # This allows us to import this module and use its functions without executing the code below.
 if __name__ == "__main__":
+    setup_logging(log_level, log_sample_every, log_structured)
+    configure(metrics_port)
     offer_rabbitmq_admin_site("False")
     main("localhost", csv_file)
\ No newline at end of file
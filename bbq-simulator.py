@@ -0,0 +1,100 @@
+"""
+BBQ Simulator
+Name: Topaz Montague
+Date: 6/4/24
+
+File Description & Approach:
+This Python script generates load for the fleet consumers. It synthesizes realistic smoker and food
+temperature curves for thousands of virtual devices, with preheat, lid-open drops, food stalls and
+sensor dropouts (see bbq/simulator.py), and publishes them to the fleet exchange at a fixed
+aggregate rate in readings per second, the same way the producer publishes with fleet_device set.
+With --csv it writes one CSV per device in the format of smoker-temps.csv instead, to replay with
+the producer or analyze offline with bbq-analyze.py. The same seed always gives the same readings.
+--dry-run publishes into an in-process fake broker to measure the generator without RabbitMQ.
+
+Usage: python bbq-simulator.py [--devices N] [--rate R] [--readings N] [--envelope] [--seed S] [--dry-run]
+       python bbq-simulator.py --csv DIR [--devices N] [--hours H] [--seed S]
+
+"""
+
+import argparse
+import sys
+import time
+
+import pika
+
+from bbq.fakes import FakeBroker
+from bbq.fleet import DEFAULT_SHARDS, declare_fleet
+from bbq.publisher import BlockingPublisher
+from bbq.simulator import Simulator, publish_fleet, write_csv
+
+# Declare variables
+devices = 1000  # virtual smokers
+rate = 10000.0  # aggregate readings per second across every device; 0 publishes as fast as possible
+seed = 6  # same seed, same readings
+interval = 5.0  # seconds of cook time between a device's rows (the real file is about 5 to 15)
+csv_hours = 12.0  # cook time written per device with --csv
+heartbeat = 30  # seconds between AMQP heartbeats
+spill_size = 100000  # messages held while the broker is unreachable; the oldest are dropped beyond this
+
+def main(hn: str = "localhost"):
+    """Publish or write the simulated fleet.
+
+    Parameters:
+        hn (str): the host name or IP address of the RabbitMQ server
+    """
+    parser = argparse.ArgumentParser(description="Simulate a fleet of smokers.")
+    parser.add_argument("--devices", type=int, default=devices, help=f"virtual devices (default: {devices})")
+    parser.add_argument("--rate", type=float, default=rate, help=f"readings per second (default: {rate:g})")
+    parser.add_argument("--readings", type=int, help="stop after this many readings (default: run until interrupted)")
+    parser.add_argument("--envelope", action="store_true", help="one envelope per device and tick")
+    parser.add_argument("--shards", type=int, default=DEFAULT_SHARDS, help="shard queues in the fleet")
+    parser.add_argument("--seed", type=int, default=seed, help=f"random seed (default: {seed})")
+    parser.add_argument("--csv", metavar="DIR", help="write one CSV per device to DIR instead of publishing")
+    parser.add_argument("--hours", type=float, default=csv_hours, help=f"cook hours per CSV (default: {csv_hours:g})")
+    parser.add_argument("--dry-run", action="store_true", help="publish into an in-process fake broker")
+    args = parser.parse_args()
+
+    simulator = Simulator(args.devices, args.seed, interval)
+    if args.csv:
+        start_time = time.perf_counter()
+        paths = write_csv(simulator, args.csv, args.hours)
+        print(f" [x] Wrote {len(paths)} CSV files to {args.csv} in {time.perf_counter() - start_time:.1f} seconds")
+        return
+
+    if args.dry_run:
+        channel = FakeBroker().channel()
+        declare_fleet(channel, args.shards)
+        publish = lambda exchange, key, body, properties: channel.basic_publish(exchange, key, body, properties)
+        sleep = time.sleep
+        link = None
+    else:
+        link = BlockingPublisher(hn, lambda ch: declare_fleet(ch, args.shards), spill_size, heartbeat)
+        try:
+            link.connect()
+        except pika.exceptions.AMQPConnectionError as e:
+            print()
+            print("ERROR: connection to RabbitMQ server failed.")
+            print(f"Verify the server is running on host={hn}.")
+            print(f"The error says: {e}")
+            print()
+            sys.exit(1)
+        publish = link.publish
+        sleep = link.sleep
+
+    stats = None
+    try:
+        print(f" [*] Simulating {args.devices} devices at {args.rate:g} readings/sec. To exit press CTRL+C")
+        stats = publish_fleet(simulator, publish, args.rate, args.readings, args.shards, args.envelope, sleep)
+    except KeyboardInterrupt:
+        print()
+        print(" User interrupted the simulation.")
+    finally:
+        if link is not None:
+            link.close()
+    if stats is not None:
+        print(f" [x] Sent {stats['readings']} readings in {stats['messages']} messages "
+              f"at {stats['rate']:.0f} readings/sec")
+
+if __name__ == "__main__":
+    main("localhost")
@@ -0,0 +1,7 @@
+"""
+BBQ Shared Modules
+
+File Description & Approach:
+Shared building blocks used by the BBQ producer and consumer scripts. The scripts in the
+repository root stay the entry points; the code they have in common lives in this package.
+"""
@@ -0,0 +1,381 @@
+"""
+BBQ Asyncio Transport
+
+File Description & Approach:
+Asyncio versions of the producer and consumer built on pika's AsyncioConnection adapter.
+The callback-style pika API is wrapped in small awaitable helpers, so a single event loop can
+multiplex every temperature queue, the replay timers, ack flush timers and email alerts.
+Consumers reuse ChannelMonitor and AckBatcher from bbq/consumer.py, so the window and alert rules
+are identical to the blocking engine. smtplib has no asyncio interface, so each alert is sent with
+asyncio.to_thread from a task on the loop; the callbacks themselves never wait on email.
+
+Both ride out broker outages like the blocking versions (see bbq/connection.py). The consumer
+watches the connection's close callback, and after a lost connection it reconnects with backoff,
+declares the queues again and re-registers every channel; readings that already reached a window
+are skipped when they are redelivered. AsyncPublisher spills messages into a bounded buffer while
+the broker is down (the oldest are dropped first), reconnects from a background task and publishes
+the spilled messages in order once it is back, so the replay keeps its pace.
+"""
+
+import asyncio
+from collections import deque
+import os
+import time
+
+import pika
+from pika.adapters.asyncio_connection import AsyncioConnection
+
+from bbq.alerts import AlertDispatcher
+from bbq.checkpoint import RingCheckpoint
+from bbq.connection import CONNECTION_ERRORS, DEFAULT_HEARTBEAT, Backoff, connection_log, connection_parameters
+from bbq.consumer import AckBatcher, ChannelMonitor
+from bbq.deadletter import (DEAD_LETTER_EXCHANGE, DEAD_LETTER_QUEUE, QUEUE_ARGUMENTS, DeadLetters, retry_arguments,
+                            retry_queue)
+from bbq.ingest import iter_row_chunks
+from bbq.messages import FOOD_A_ID, FOOD_B_ID, READINGS_EXCHANGE, SMOKER_ID, TEXT, message_properties
+from bbq.metrics import registry, stamp
+from bbq.replay import ReplayClock
+
+
+class AsyncAlertDispatcher(AlertDispatcher):
+    """AlertDispatcher whose worker is a task on the running event loop."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._async_queue = None
+        self._task = None
+
+    def _enqueue(self, subject: str, body: str, key: str):
+        if self._task is None:
+            self._async_queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run_async())
+        self._async_queue.put_nowait((subject, body, key))
+
+    async def _run_async(self):
+        """Send queued alerts one at a time without blocking the loop."""
+        while True:
+            item = await self._async_queue.get()
+            if item is None:
+                break
+            await asyncio.to_thread(self._deliver, *item)
+
+    async def aclose(self):
+        """Send whatever is queued, then close the SMTP session."""
+        if self._task is not None:
+            self._async_queue.put_nowait(None)
+            await self._task
+            self._task = None
+        if self._session is not None:
+            await asyncio.to_thread(self._session.close)
+
+
+class AsyncAMQP:
+    """Awaitable wrapper around one pika AsyncioConnection."""
+
+    def __init__(self, connection: AsyncioConnection, closed: asyncio.Future):
+        self.connection = connection
+        self._closed = closed
+
+    @classmethod
+    async def connect(cls, host: str, heartbeat: int = DEFAULT_HEARTBEAT) -> "AsyncAMQP":
+        """Open a connection on the running event loop."""
+        loop = asyncio.get_running_loop()
+        opened = loop.create_future()
+        closed = loop.create_future()
+
+        def on_open(connection):
+            opened.set_result(connection)
+
+        def on_open_error(connection, error):
+            if not opened.done():
+                opened.set_exception(pika.exceptions.AMQPConnectionError(error))
+
+        def on_close(connection, reason):
+            if not closed.done():
+                closed.set_result(reason)
+
+        connection = AsyncioConnection(
+            connection_parameters(host, heartbeat),
+            on_open_callback=on_open,
+            on_open_error_callback=on_open_error,
+            on_close_callback=on_close,
+            custom_ioloop=loop,
+        )
+        await opened
+        return cls(connection, closed)
+
+    async def channel(self):
+        """Open a new channel on the connection."""
+        future = asyncio.get_running_loop().create_future()
+        self.connection.channel(on_open_callback=future.set_result)
+        return await future
+
+    @staticmethod
+    async def call(method, *args, **kwargs):
+        """Await a pika channel method that reports completion through callback=."""
+        future = asyncio.get_running_loop().create_future()
+        method(*args, callback=future.set_result, **kwargs)
+        return await future
+
+    @property
+    def is_closed(self) -> bool:
+        return self._closed.done()
+
+    async def wait_closed(self, timeout: float) -> bool:
+        """Wait up to timeout seconds for the connection to close; return True if it has."""
+        try:
+            await asyncio.wait_for(asyncio.shield(self._closed), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def close(self):
+        """Close the connection and wait until the broker confirms it."""
+        if self.connection.is_open:
+            self.connection.close()
+        await self._closed
+
+
+async def reconnect_async(connect, backoff: Backoff, what: str):
+    """Await connect() until it succeeds, waiting for the backoff delay after each failure.
+
+    The asyncio counterpart of bbq.connection.reconnect(); connect is a coroutine function.
+    """
+    while True:
+        delay = backoff.next_delay()
+        connection_log.warning("Reconnecting %s in %.1f seconds", what, delay, extra={"delay": round(delay, 1)})
+        await asyncio.sleep(delay)
+        try:
+            result = await connect()
+        except CONNECTION_ERRORS as e:
+            connection_log.warning("Reconnecting %s failed: %s", what, e or type(e).__name__)
+            continue
+        backoff.reset()
+        connection_log.warning("Reconnected %s", what)
+        return result
+
+
+class AsyncPublisher:
+    """Publish on an AsyncioConnection channel, riding out broker outages.
+
+    Messages published while the broker is down go to a spill buffer of at most spill_size
+    messages (the oldest are dropped first, counted in dropped). The first lost publish starts a
+    background reconnect with backoff; once it succeeds, declare(amqp, channel) sets up the
+    topology again and the spilled messages are published first, in order.
+
+    Parameters:
+        host (str): the host name or IP address of the RabbitMQ server
+        declare (coroutine function): declare(amqp, channel) declares the exchanges and queues
+        spill_size (int): messages kept while disconnected
+        heartbeat (int): AMQP heartbeat interval in seconds
+    """
+
+    def __init__(self, host: str, declare, spill_size: int = 100000, heartbeat: int = DEFAULT_HEARTBEAT):
+        self.host = host
+        self.declare = declare
+        self.heartbeat = heartbeat
+        self.backoff = Backoff()
+        self.spill = deque(maxlen=spill_size)
+        self.published = 0
+        self.dropped = 0
+        self.reconnects = 0
+        self.amqp = None
+        self.channel = None
+        self._reconnecting = None
+
+    async def connect(self):
+        """Open the connection, declare the topology and publish any spilled messages."""
+        amqp = await AsyncAMQP.connect(self.host, self.heartbeat)
+        channel = await amqp.channel()
+        await self.declare(amqp, channel)
+        self.amqp, self.channel = amqp, channel
+        while self.spill:
+            exchange, routing_key, body, properties = self.spill.popleft()
+            channel.basic_publish(exchange=exchange, routing_key=routing_key, body=body, properties=properties)
+            self.published += 1
+
+    def publish(self, exchange: str, routing_key: str, body: bytes, properties=None) -> bool:
+        """Publish a message, or spill it while the broker is down; return True once it was sent."""
+        if self.channel is not None and not self.amqp.is_closed:
+            try:
+                self.channel.basic_publish(exchange=exchange, routing_key=routing_key, body=body,
+                                           properties=properties)
+                self.published += 1
+                return True
+            except CONNECTION_ERRORS as e:
+                self._lost(e)
+        elif self.channel is not None:
+            self._lost("connection closed")
+        if len(self.spill) == self.spill.maxlen:
+            self.dropped += 1
+        self.spill.append((exchange, routing_key, body, properties))
+        if self._reconnecting is None:
+            self._reconnecting = asyncio.get_running_loop().create_task(self._reconnect())
+        return False
+
+    def _lost(self, error):
+        connection_log.warning("Publisher connection lost: %s; spilling up to %d messages",
+                               error or type(error).__name__, self.spill.maxlen)
+        self.amqp = self.channel = None
+
+    async def _reconnect(self):
+        try:
+            await reconnect_async(self.connect, self.backoff, "producer")
+            self.reconnects += 1
+        finally:
+            self._reconnecting = None
+
+    async def close(self, timeout: float = 30.0):
+        """Wait up to timeout seconds for a reconnect to publish the spilled messages, then close."""
+        if self._reconnecting is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(self._reconnecting), timeout)
+            except asyncio.TimeoutError:
+                self._reconnecting.cancel()
+        if self.spill:
+            connection_log.error("Closing with %d spilled messages not published", len(self.spill))
+        if self.amqp is not None:
+            await self.amqp.close()
+        self.amqp = self.channel = None
+
+
+async def declare_readings(amqp: AsyncAMQP, ch, queues):
+    """Declare durable queues on the readings exchange, with the dead-letter exchange (see bbq/messages.py)."""
+    await amqp.call(ch.exchange_declare, DEAD_LETTER_EXCHANGE, exchange_type="fanout", durable=True)
+    await amqp.call(ch.queue_declare, DEAD_LETTER_QUEUE, durable=True)
+    await amqp.call(ch.queue_bind, DEAD_LETTER_QUEUE, DEAD_LETTER_EXCHANGE)
+    await amqp.call(ch.exchange_declare, READINGS_EXCHANGE, exchange_type="topic", durable=True)
+    for queue in queues:
+        await amqp.call(ch.queue_declare, queue, durable=True, arguments=QUEUE_ARGUMENTS)
+        await amqp.call(ch.queue_bind, queue, READINGS_EXCHANGE, routing_key=queue)
+
+
+async def produce(host: str, csv_file: str, queues, speed: float | None = 1.0,
+                  message_format: str = TEXT, spill_size: int = 100000,
+                  heartbeat: int = DEFAULT_HEARTBEAT) -> dict:
+    """Replay the CSV file onto the three temperature queues.
+
+    Parameters:
+        host (str): the host name or IP address of the RabbitMQ server
+        csv_file (str): the CSV file to read data from
+        queues (tuple[str, str, str]): smoker, food A and food B queue names
+        speed (float | None): replay multiplier for the CSV timestamps; None means unthrottled
+        message_format (str): "text" or "binary"
+        spill_size (int): messages held while the broker is unreachable
+        heartbeat (int): AMQP heartbeat interval in seconds
+
+    Returns a dict with the number of messages sent, the messages dropped while the broker was
+    down, the elapsed seconds (including the final flush) and msgs/sec.
+    """
+    publisher = AsyncPublisher(host, lambda amqp, ch: declare_readings(amqp, ch, queues), spill_size, heartbeat)
+    # The first connection is not retried, so a wrong host fails at startup
+    await publisher.connect()
+    start_time = time.perf_counter()
+    try:
+        clock = ReplayClock(speed)
+        properties = message_properties(message_format)
+        channel_ids = (SMOKER_ID, FOOD_A_ID, FOOD_B_ID)
+        with open(csv_file, "rb") as file:
+            for rows in iter_row_chunks(file, message_format, channel_ids):
+                for _, timestamp, readings in rows:
+                    if not clock.unthrottled:
+                        delay = clock.delay(timestamp)
+                        if delay > 0:
+                            await asyncio.sleep(delay)
+                    for column, temp, body in readings:
+                        message_props = stamp(properties) if registry.enabled else properties
+                        publisher.publish(READINGS_EXCHANGE, queues[column], body, message_props)
+                # Let the loop write out the transport buffer after each block
+                await asyncio.sleep(0)
+    finally:
+        # Closing waits for the broker, so the elapsed time covers every message written out
+        await publisher.close()
+    elapsed = time.perf_counter() - start_time
+    sent = publisher.published
+    return {"sent": sent, "dropped": publisher.dropped, "elapsed": elapsed,
+            "rate": sent / elapsed if elapsed > 0 else 0.0}
+
+
+async def consume(host: str, specs, prefetch_count: int = 1, ack_batch: int = 1,
+                  ack_interval: float = 0.5, duration: float | None = None,
+                  max_envelope: int | None = None, checkpoint_dir: str | None = None,
+                  max_retries: int = 3, retry_delay: float = 5.0, heartbeat: int = DEFAULT_HEARTBEAT) -> dict:
+    """Serve every channel on one event loop until cancelled (or for duration seconds).
+
+    Parameters:
+        host (str): the host name or IP address of the RabbitMQ server
+        specs (list[ChannelSpec]): channels to serve
+        prefetch_count (int): unacknowledged messages the broker may send per channel
+        ack_batch (int): processed messages per cumulative ack
+        ack_interval (float): max seconds before pending acks are flushed
+        duration (float | None): stop after this many seconds; None runs until cancelled
+        max_envelope (int | None): largest envelope (in readings) accepted from the producer
+        checkpoint_dir (str | None): directory for per-channel window checkpoints; None disables
+        max_retries (int): retries of a message whose processing fails before it is dead-lettered
+        retry_delay (float): seconds before a failed message is retried
+        heartbeat (int): AMQP heartbeat interval in seconds
+
+    Returns a dict with the number of readings processed, the elapsed seconds and readings/sec.
+    """
+    if ack_batch > prefetch_count:
+        raise ValueError(f"ack_batch ({ack_batch}) must not exceed prefetch_count ({prefetch_count})")
+    alerts = AsyncAlertDispatcher()
+    monitors = [ChannelMonitor(spec, alerts, max_envelope) for spec in specs]
+    if checkpoint_dir is not None:
+        for monitor in monitors:
+            monitor.attach_checkpoint(RingCheckpoint(os.path.join(checkpoint_dir, f"{monitor.spec.queue}.ring")))
+
+    async def connect() -> AsyncAMQP:
+        """Open the connection and register a consumer for every channel (again after a reconnect)."""
+        amqp = await AsyncAMQP.connect(host, heartbeat)
+        for monitor in monitors:
+            queue = monitor.spec.queue
+            ch = await amqp.channel()
+            await declare_readings(amqp, ch, (queue,))
+            await amqp.call(ch.queue_declare, retry_queue(queue), durable=True, arguments=retry_arguments(queue))
+            await amqp.call(ch.basic_qos, prefetch_count=prefetch_count)
+            monitor.acks = AckBatcher(ch, ack_batch, ack_interval)
+            monitor.dead_letters = DeadLetters(monitor.acks, queue, max_retries, retry_delay)
+            ch.basic_consume(queue, on_message_callback=monitor.on_message, auto_ack=False)
+        return amqp
+
+    amqp = await connect()
+    backoff = Backoff()
+    start_time = time.perf_counter()
+    try:
+        queues = ", ".join(monitor.spec.queue for monitor in monitors)
+        print(f" [*] Ready for work on {queues}. To exit press CTRL+C")
+
+        # Timer: flush acks that have waited for the interval, or reconnect once the connection is lost
+        loop = asyncio.get_running_loop()
+        stop_at = loop.time() + duration if duration is not None else None
+        while stop_at is None or loop.time() < stop_at:
+            try:
+                if await amqp.wait_closed(ack_interval):
+                    raise pika.exceptions.AMQPConnectionError("connection closed")
+                for monitor in monitors:
+                    monitor.acks.flush_if_due()
+                    if monitor.checkpoint is not None:
+                        monitor.checkpoint.flush_if_due()
+            except CONNECTION_ERRORS as e:
+                connection_log.warning("Consumer connection lost: %s", e or type(e).__name__)
+                if not amqp.is_closed:
+                    await amqp.close()
+                for monitor in monitors:
+                    # Unacknowledged messages are redelivered; their readings already in a window are skipped
+                    monitor.skip_processed()
+                amqp = await reconnect_async(connect, backoff, "consumer")
+    finally:
+        for monitor in monitors:
+            if monitor.acks is not None and monitor.acks.channel.is_open:
+                monitor.acks.flush()
+            if monitor.checkpoint is not None:
+                monitor.checkpoint.close()
+        elapsed = time.perf_counter() - start_time
+        processed = sum(monitor.processed for monitor in monitors)
+        rate = processed / elapsed if elapsed > 0 else 0.0
+        print(f" [x] Processed {processed} readings at {rate:.0f} readings/sec")
+        await amqp.close()
+        await alerts.aclose()
+
+    return {"processed": processed, "elapsed": elapsed, "rate": rate}
@@ -0,0 +1,217 @@
+"""
+BBQ Alert Dispatch
+
+File Description & Approach:
+Sends email alerts for the consumers without blocking their pika callbacks. The outgoing email
+settings are read from .env.toml once and cached (see bbq/runtime.py), and smtplib and email are
+only imported when the first alert is sent. A single SMTP session is opened on first use and
+reused for every alert, reconnecting if the server has dropped it. Alerts are handed to a
+background worker thread through a queue, so a callback only pays for a queue put.
+Each alert type (the subject by default) is rate limited: while a condition stays active only the
+first alert is sent, and a repeat is allowed again after min_interval seconds or once the consumer
+reports that the condition has cleared. An alert that fails to send does not count: its type is
+admitted again right away. While deduplicate is set (a consumer catching up on a
+backlog), each alert type is sent at most once and clears are ignored, so replaying an old
+cook does not send an email for every time a condition came and went.
+
+For local testing, point .env.toml at a stand-in server such as
+    python -m smtpd -n -c DebuggingServer localhost:1025
+with outgoing_email_port = 1025 and outgoing_email_tls = false.
+"""
+
+import logging
+import queue
+import threading
+import time
+
+from bbq.log import alerts_log
+from bbq.metrics import registry
+from bbq.runtime import EmailConfig, email_config
+
+
+class SMTPSession:
+    """Long-lived SMTP connection that reconnects when the server drops it.
+
+    Parameters:
+        config (EmailConfig): outgoing email settings
+        debug (bool): print the SMTP transcript
+    """
+
+    def __init__(self, config: EmailConfig, debug: bool = False):
+        self.config = config
+        self.debug = debug
+        self._server = None
+
+    def connect(self):
+        """Open the connection, start TLS and log in."""
+        import smtplib
+
+        host = self.config.host
+        port = self.config.port
+        use_tls = self.config.tls
+
+        if port == 465 and use_tls:
+            # Use SMTP_SSL for port 465
+            server = smtplib.SMTP_SSL(host, port)
+        else:
+            server = smtplib.SMTP(host, port)
+            if use_tls:
+                server.starttls()
+        if self.debug:
+            server.set_debuglevel(2)
+        # Local stand-in servers usually do not offer AUTH
+        server.ehlo_or_helo_if_needed()
+        if server.has_extn("auth"):
+            server.login(self.config.address, self.config.password)
+        self._server = server
+
+    def send(self, msg):
+        """Send an email.message.EmailMessage, reconnecting once if the session has gone stale."""
+        import smtplib
+
+        if self._server is None:
+            self.connect()
+        try:
+            self._server.send_message(msg)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            self._server = None
+            self.connect()
+            self._server.send_message(msg)
+
+    def close(self):
+        """Quit the session if one is open."""
+        if self._server is not None:
+            import smtplib
+
+            try:
+                self._server.quit()
+            except smtplib.SMTPException:
+                pass
+            self._server = None
+
+
+class AlertDispatcher:
+    """Queue email alerts for a background worker, with per-type rate limiting.
+
+    Parameters:
+        config_path (str): TOML file with the outgoing email settings
+        min_interval (float): seconds before an alert type that is still active may be sent again
+        session (SMTPSession | None): session to send with; built from config_path when None
+    """
+
+    def __init__(self, config_path: str = ".env.toml", min_interval: float = 600.0, session=None):
+        self.config_path = config_path
+        self.min_interval = min_interval
+        self._session = session
+        self._queue = queue.Queue()
+        self._last_sent = {}
+        self._worker = None
+        self._lock = threading.Lock()
+        self._config_error_logged = False
+        self.deduplicate = False
+
+        # Counters
+        self.sent = 0
+        self.suppressed = 0
+        self.failed = 0
+
+    def send(self, subject: str, body: str, key: str | None = None) -> bool:
+        """Queue an alert unless the same alert type was sent recently.
+
+        Returns True if the alert was queued and False if it was rate limited.
+        """
+        key = key or subject
+        if not self._admit(key):
+            return False
+        self._enqueue(subject, body, key)
+        return True
+
+    def clear(self, key: str):
+        """Mark an alert condition as cleared so its next occurrence is sent right away."""
+        if self.deduplicate:
+            return
+        with self._lock:
+            self._last_sent.pop(key, None)
+
+    def _admit(self, key: str) -> bool:
+        """Apply the rate limit for an alert type and record the send time."""
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_sent.get(key)
+            if last is not None and (self.deduplicate or now - last < self.min_interval):
+                self.suppressed += 1
+                return False
+            self._last_sent[key] = now
+            return True
+
+    def _enqueue(self, subject: str, body: str, key: str):
+        """Hand an alert to the worker thread, starting it on first use."""
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="alert-dispatcher", daemon=True)
+                self._worker.start()
+        self._queue.put((subject, body, key))
+
+    def close(self, timeout: float = 10.0):
+        """Send whatever is queued, then stop the worker and the SMTP session."""
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join(timeout)
+            self._worker = None
+
+    def _run(self):
+        """Worker thread: send queued alerts over the shared session."""
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                self._deliver(*item)
+        finally:
+            if self._session is not None:
+                self._session.close()
+
+    def _deliver(self, subject: str, body: str, key: str):
+        try:
+            # Imported with the first alert, not when the consumer starts
+            from email.message import EmailMessage
+
+            if self._session is None:
+                try:
+                    config = email_config(self.config_path)
+                except (OSError, ValueError) as e:
+                    self._fail(key)
+                    # The same error comes back for every alert, so it is logged once
+                    if not self._config_error_logged:
+                        self._config_error_logged = True
+                        alerts_log.error("Cannot send email alerts, %s is unusable: %s", self.config_path, e,
+                                         extra={"subject": subject})
+                    return
+                # The SMTP transcript is only shown when alert logging is at DEBUG
+                debug = alerts_log.isEnabledFor(logging.DEBUG)
+                self._session = SMTPSession(config, debug=debug)
+            outemail = self._session.config.address
+
+            # Create an instance of an EmailMessage
+            msg = EmailMessage()
+            msg["From"] = outemail
+            msg["To"] = outemail
+            msg["Reply-to"] = outemail
+            msg["Subject"] = subject
+            msg.set_content(body)
+
+            started = time.perf_counter()
+            self._session.send(msg)
+            if registry.enabled:
+                registry.histogram("smtp.send").observe(time.perf_counter() - started)
+            self.sent += 1
+            alerts_log.info("Email alert sent: %s", subject, extra={"subject": subject})
+        except Exception as e:
+            self._fail(key)
+            alerts_log.error("Failed to connect or send email: %s", e, extra={"subject": subject})
+
+    def _fail(self, key: str):
+        """Count a failed alert and forget its send time, so the rate limit does not hold it back."""
+        self.failed += 1
+        with self._lock:
+            self._last_sent.pop(key, None)
@@ -0,0 +1,126 @@
+"""
+BBQ Backtest
+
+File Description & Approach:
+Offline analysis of cook CSV files shaped like smoker-temps.csv. Each file is loaded into NumPy
+columns with pandas, and the smoker drop rule and food stall rule are evaluated for every reading
+at once: np.searchsorted finds where each reading's time window starts, so the window change is
+one vectorized subtraction instead of a replay through RabbitMQ.
+
+The results match the streaming consumers exactly. Windows use the same boundaries as TimeWindow
+(readings with timestamp >= now - span, checked only while the readings cover the whole span
+without a gap), and the change is rounded with Python's round() for the few readings near the
+threshold, so the float rounding is identical. replay_alerts() runs the streaming ChannelMonitor
+logic over the same data and is used by verify() to prove the two agree.
+
+NumPy and pandas are only needed for this module.
+"""
+
+from collections import namedtuple
+
+from bbq.consumer import DEFAULT_CHANNELS, ChannelMonitor
+from bbq.messages import BINARY, TEXT, binary_temp
+from bbq.windows import GAP_FRACTION
+
+TIME_COLUMN = "Time (UTC)"
+TIME_FORMAT = "%m/%d/%y %H:%M:%S"
+
+# One alert: which channel, when (CSV time text and epoch seconds), the temp and the window change
+Alert = namedtuple("Alert", ["channel", "time", "timestamp", "temp", "change"])
+
+
+def _require_pandas():
+    try:
+        import numpy as np
+        import pandas as pd
+    except ImportError as e:
+        raise ImportError("offline analysis requires numpy and pandas (pip install numpy pandas)") from e
+    return np, pd
+
+
+def load_csv(path: str):
+    """Load a cook CSV into a DataFrame with an epoch-seconds "timestamp" column."""
+    np, pd = _require_pandas()
+    # round_trip parses floats exactly like Python's float(), as the producer does
+    frame = pd.read_csv(path, dtype={TIME_COLUMN: str}, float_precision="round_trip")
+    times = pd.to_datetime(frame[TIME_COLUMN], format=TIME_FORMAT, utc=True)
+    frame["timestamp"] = (times - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
+    frame["timestamp"] = frame["timestamp"].astype(np.float64)
+    return frame
+
+
+def channel_readings(frame, spec, message_format: str = TEXT):
+    """Return the (times, timestamps, temps) arrays a channel's consumer would receive.
+
+    Blank cells are skipped, as the producer skips them. With message_format="binary" the
+    values go through the same float32 / millisecond rounding as decoded binary messages.
+    """
+    np, _ = _require_pandas()
+    column = frame[f"Channel{spec.channel_id}"]
+    present = column.notna().to_numpy()
+    times = frame[TIME_COLUMN].to_numpy()[present]
+    timestamps = frame["timestamp"].to_numpy()[present]
+    temps = column.to_numpy(dtype=np.float64)[present]
+    if message_format == BINARY:
+        temps = np.array([binary_temp(temp) for temp in temps.astype(np.float32).tolist()], dtype=np.float64)
+        timestamps = np.round(timestamps * 1000) / 1000
+    return times, timestamps, temps
+
+
+def rule_alerts(frame, spec, message_format: str = TEXT) -> list[Alert]:
+    """Evaluate a channel's window rule over the whole file with vectorized operations."""
+    np, _ = _require_pandas()
+    times, timestamps, temps = channel_readings(frame, spec, message_format)
+    if len(temps) == 0:
+        return []
+
+    # Index of the oldest reading still inside each reading's window
+    starts = np.searchsorted(timestamps, timestamps - spec.window_seconds, side="left")
+    changes = temps - temps[starts]
+    # Covered like TimeWindow.ready: a full span since the first reading after the last gap
+    gap = np.empty(len(timestamps), dtype=bool)
+    gap[0] = True
+    gap[1:] = np.diff(timestamps) > spec.window_seconds * GAP_FRACTION
+    coverage_start = timestamps[np.maximum.accumulate(np.where(gap, np.arange(len(timestamps)), 0))]
+    ready = timestamps - coverage_start >= spec.window_seconds
+
+    # round() moves a value by at most 0.05, so only these readings can pass the rounded check
+    candidates = np.flatnonzero(ready & (changes <= spec.threshold + 0.05 + 1e-9))
+    alerts = []
+    for i in candidates:
+        change = round(float(changes[i]), 1)
+        if change <= spec.threshold:
+            alerts.append(Alert(spec.name, times[i], float(timestamps[i]), float(temps[i]), change))
+    return alerts
+
+
+def replay_alerts(frame, spec, message_format: str = TEXT) -> list[Alert]:
+    """Evaluate the same rule one reading at a time with the streaming ChannelMonitor."""
+    times, timestamps, temps = channel_readings(frame, spec, message_format)
+    monitor = ChannelMonitor(spec, alerts=None)
+    alerts = []
+    for time_text, timestamp, temp in zip(times, timestamps.tolist(), temps.tolist()):
+        change = monitor.update(timestamp, temp)
+        if change is not None and change <= spec.threshold:
+            alerts.append(Alert(spec.name, time_text, timestamp, temp, change))
+    return alerts
+
+
+def analyze(paths, specs=DEFAULT_CHANNELS, message_format: str = TEXT) -> dict:
+    """Return {path: [Alert, ...]} for every file, channels in spec order."""
+    results = {}
+    for path in paths:
+        frame = load_csv(path)
+        results[path] = [alert for spec in specs for alert in rule_alerts(frame, spec, message_format)]
+    return results
+
+
+def verify(paths, specs=DEFAULT_CHANNELS, message_format: str = TEXT) -> bool:
+    """Check that the vectorized and streaming evaluations give identical alerts."""
+    for path in paths:
+        frame = load_csv(path)
+        for spec in specs:
+            if rule_alerts(frame, spec, message_format) != replay_alerts(frame, spec, message_format):
+                print(f"Mismatch for {spec.name} in {path}")
+                return False
+    return True
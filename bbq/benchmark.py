@@ -0,0 +1,246 @@
+"""
+BBQ Benchmark
+
+File Description & Approach:
+Reproducible throughput and latency benchmark for the smoker pipeline. The producer stage streams
+a workload CSV through the real ingestion, envelope and publish code into a FakeChannel; each
+consumer stage then feeds that queue's messages through the real ChannelMonitor callback (window,
+alert check, acks and console output). Every stage runs in its own spawned process so CPU time and
+peak memory are reported per process, as they would be for the separate producer and consumer
+scripts. Log output from the stages goes to os.devnull, but its cost is still measured. Consumer
+messages are stamped as they are published, and the fake channel holds deliveries to the prefetch
+window with acks taking ack_delay to come back, so consumer p50/p99 is publish-to-decision latency
+and --prefetch and --ack-batch change it the way they would against a broker.
+
+Workloads are the real smoker-temps.csv or a synthetic CSV of any length generated from a fixed
+seed, so two runs on the same machine are comparable.
+
+startup_times() measures cold start instead: each entry script is loaded in a fresh interpreter
+(without running its main()) several times, the fastest run is reported next to a bare
+interpreter, and one more run under python -X importtime names its slowest imports.
+"""
+
+import calendar
+import contextlib
+import multiprocessing
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+from bbq.alerts import AlertDispatcher
+from bbq.consumer import DEFAULT_CHANNELS, AckBatcher, ChannelMonitor
+from bbq.fakes import FakeBroker
+from bbq.ingest import iter_row_chunks
+from bbq.log import setup_logging, shutdown_logging
+from bbq.messages import TEXT, EnvelopePacker, message_properties
+from bbq.metrics import published_at, stamp
+from bbq.runtime import EmailConfig
+
+
+def write_synthetic_csv(path: str, rows: int, seed: int = 6) -> str:
+    """Write a cook CSV with rows readings every 5 seconds (deterministic for a seed)."""
+    rng = random.Random(seed)
+    start = calendar.timegm((2021, 5, 22, 12, 0, 0))
+    smoker, food_a, food_b = 225.0, 40.0, 38.0
+    with open(path, "w") as file:
+        file.write("Time (UTC),Channel1,Channel2,Channel3\n")
+        for row in range(rows):
+            stamp = time.strftime("%m/%d/%y %H:%M:%S", time.gmtime(start + 5 * row))
+            # Random walk around the set point, with an occasional lid-open drop
+            smoker += rng.uniform(-1.5, 1.5) + (225.0 - smoker) * 0.02
+            if rng.random() < 0.001:
+                smoker -= 25.0
+            food_a += max(0.0, rng.uniform(-0.05, 0.2)) if food_a < 203 else 0.0
+            food_b += max(0.0, rng.uniform(-0.05, 0.15)) if food_b < 203 else 0.0
+            # Food probes report every other row, like the blank cells in the real file
+            cells_a = f"{food_a:.1f}" if row % 2 == 0 else ""
+            cells_b = f"{food_b:.1f}" if row % 2 == 0 else ""
+            file.write(f"{stamp},{smoker:.1f},{cells_a},{cells_b}\n")
+    return path
+
+
+def _percentiles(samples_ns: list) -> tuple:
+    if not samples_ns:
+        return 0.0, 0.0
+    samples_ns.sort()
+    p50 = samples_ns[len(samples_ns) // 2]
+    p99 = samples_ns[min(len(samples_ns) - 1, int(len(samples_ns) * 0.99))]
+    return p50 / 1000, p99 / 1000
+
+
+def _usage() -> dict:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    # ru_maxrss is in kilobytes on Linux
+    return {"cpu": usage.ru_utime + usage.ru_stime, "max_rss_mb": usage.ru_maxrss / 1024}
+
+
+def producer_stage(csv_path: str, message_format: str = TEXT, envelope_size: int = 1) -> dict:
+    """Publish the workload into a FakeChannel and return stats plus the queued messages."""
+    broker = FakeBroker()
+    channel = broker.channel()
+    queues = tuple(spec.queue for spec in DEFAULT_CHANNELS)
+    channel_ids = tuple(spec.channel_id for spec in DEFAULT_CHANNELS)
+    properties = message_properties(message_format)
+    samples = []
+    clock = time.perf_counter_ns
+
+    def publish(queue, body, props=properties):
+        started = clock()
+        channel.basic_publish(exchange="", routing_key=queue, body=body, properties=props)
+        samples.append(clock() - started)
+
+    packer = EnvelopePacker(publish, envelope_size, linger=float("inf")) if envelope_size > 1 else None
+    readings = 0
+    started = time.perf_counter()
+    with open(csv_path, "rb") as file:
+        for rows in iter_row_chunks(file, message_format, channel_ids):
+            for _, timestamp, row_readings in rows:
+                for column, temp, body in row_readings:
+                    readings += 1
+                    if packer is not None:
+                        packer.add(queues[column], timestamp, temp, channel_ids[column])
+                    else:
+                        publish(queues[column], body)
+    if packer is not None:
+        packer.flush_all()
+    elapsed = time.perf_counter() - started
+
+    p50, p99 = _percentiles(samples)
+    stats = {"stage": "producer", "messages": channel.published, "readings": readings,
+             "rate": channel.published / elapsed if elapsed > 0 else 0.0, "p50_us": p50, "p99_us": p99}
+    stats.update(_usage())
+    return {"stats": stats, "queues": {name: list(messages) for name, messages in broker.queues.items()}}
+
+
+class _NullSession:
+    """SMTP session stand-in so alerts exercise the dispatcher without a mail server."""
+
+    config = EmailConfig("localhost", 25, "bench@example.com", "")
+
+    def send(self, msg):
+        pass
+
+    def close(self):
+        pass
+
+
+def consumer_stage(spec, messages: list, prefetch_count: int = 1, ack_batch: int = 1,
+                   log_level: str = "INFO", ack_delay: float = 0.0) -> dict:
+    """Feed one queue's messages through the ChannelMonitor callback and return stats.
+
+    Each message is stamped and published when the consumer can take it, so p50/p99 is the time
+    from publish to the callback's decision, including any wait for the prefetch window.
+    """
+    broker = FakeBroker()
+    channel = broker.channel()
+    channel.ack_delay = ack_delay
+    queue = broker.queue(spec.queue)
+    alerts = AlertDispatcher(session=_NullSession())
+    monitor = ChannelMonitor(spec, alerts)
+    channel.basic_qos(prefetch_count=prefetch_count)
+    monitor.acks = AckBatcher(channel, ack_batch, interval=float("inf"))
+    channel.basic_consume(spec.queue, on_message_callback=monitor.on_message)
+
+    samples = []
+
+    def timed(callback, ch, method, properties, body):
+        callback(ch, method, properties, body)
+        samples.append(int((time.time() - published_at(properties)) * 1e9))
+
+    delivered = 0
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        setup_logging(log_level, stream=devnull)
+        for body, properties, routing_key in messages:
+            queue.append((body, stamp(properties), routing_key))
+            delivered += channel.drain(spec.queue, on_delivery=timed)
+            while queue:
+                # Window full and the batch not yet due: the ack interval timer would flush it
+                monitor.acks.flush()
+                delivered += channel.drain(spec.queue, on_delivery=timed)
+        monitor.acks.flush()
+        channel.settle_acks(wait=True)
+        alerts.close()
+        shutdown_logging()
+    elapsed = time.perf_counter() - started
+
+    p50, p99 = _percentiles(samples)
+    stats = {"stage": f"consumer {spec.name}", "messages": delivered, "readings": monitor.processed,
+             "rate": delivered / elapsed if elapsed > 0 else 0.0, "p50_us": p50, "p99_us": p99,
+             "alerts": alerts.sent, "acked": channel.acked}
+    stats.update(_usage())
+    return stats
+
+
+def run_benchmark(csv_path: str, message_format: str = TEXT, envelope_size: int = 1,
+                  prefetch_count: int = 1, ack_batch: int = 1, log_level: str = "INFO",
+                  ack_delay: float = 0.0) -> list:
+    """Run the producer stage, then each consumer stage, each in a fresh process."""
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        produced = pool.apply(producer_stage, (csv_path, message_format, envelope_size))
+    results = [produced["stats"]]
+    for spec in DEFAULT_CHANNELS:
+        messages = produced["queues"].get(spec.queue, [])
+        with context.Pool(1, maxtasksperchild=1) as pool:
+            results.append(pool.apply(consumer_stage, (spec, messages, prefetch_count, ack_batch, log_level,
+                                                       ack_delay)))
+    return results
+
+
+def format_results(results: list) -> str:
+    """Format benchmark results as a table."""
+    lines = [f"{'stage':<18}{'messages':>10}{'readings':>10}{'msgs/sec':>12}{'p50 us':>9}{'p99 us':>9}"
+             f"{'cpu s':>8}{'rss MB':>8}"]
+    for r in results:
+        lines.append(f"{r['stage']:<18}{r['messages']:>10}{r['readings']:>10}{r['rate']:>12,.0f}"
+                     f"{r['p50_us']:>9.1f}{r['p99_us']:>9.1f}{r['cpu']:>8.2f}{r['max_rss_mb']:>8.1f}")
+    return "\n".join(lines)
+
+
+def _top_imports(importtime: str) -> list:
+    """Return (module, ms) for the imports made directly by the code that was run."""
+    imports = []
+    for line in importtime.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Nested imports are indented below the module that made them
+        if name.startswith("  ") or not cumulative.strip().isdigit():
+            continue
+        imports.append((name.strip(), int(cumulative) / 1000))
+    return imports
+
+
+def startup_times(scripts, repeat: int = 5) -> list:
+    """Load each entry script in fresh interpreters and return its cold-start time in ms."""
+    def run(code: str, *options) -> tuple[float, str]:
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, *options, "-c", code], capture_output=True, text=True, check=True)
+        return (time.perf_counter() - started) * 1000, result.stderr
+
+    # The baseline is the interpreter plus what loading a script with runpy costs
+    loader = "import runpy, pkgutil"
+    baseline = min(run(loader)[0] for _ in range(repeat))
+    preloaded = {name for name, _ in _top_imports(run(loader, "-X", "importtime")[1])}
+    results = [{"script": "(python + runpy)", "ms": baseline, "imports_ms": 0.0, "slowest": []}]
+    for script in scripts:
+        # A run_name other than "__main__" loads the script without running main()
+        code = f"{loader}; runpy.run_path({script!r}, run_name='bbq_startup')"
+        fastest = min(run(code)[0] for _ in range(repeat))
+        imports = [item for item in _top_imports(run(code, "-X", "importtime")[1]) if item[0] not in preloaded]
+        results.append({"script": script, "ms": fastest, "imports_ms": fastest - baseline,
+                        "slowest": sorted(imports, key=lambda item: item[1], reverse=True)[:3]})
+    return results
+
+
+def format_startup(results: list) -> str:
+    """Format startup times as a table."""
+    lines = [f"{'script':<26}{'cold ms':>9}{'imports ms':>12}  slowest imports"]
+    for r in results:
+        slowest = ", ".join(f"{name} {ms:.1f}" for name, ms in r["slowest"])
+        lines.append(f"{r['script']:<26}{r['ms']:>9.1f}{r['imports_ms']:>12.1f}  {slowest}")
+    return "\n".join(lines)
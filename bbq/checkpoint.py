@@ -0,0 +1,102 @@
+"""
+BBQ Window Checkpoints
+
+File Description & Approach:
+Durable window state so a restarted consumer alerts correctly from its first message. Each channel
+has a fixed-size ring buffer file that is memory-mapped: a small header (magic, version, capacity,
+next slot, count) followed by capacity (timestamp, temp) records. Every
+reading the monitor accepts is written into the map before its message is acknowledged, which is
+only a memory write; flush_if_due() msyncs the file every few seconds so the state also survives a
+machine crash. At startup the records are read back oldest first and replayed into the window,
+which takes milliseconds. The capacity must exceed the readings a window can hold (4096 covers a
+10 minute window at more than 6 readings per second).
+
+A checkpoint only describes the cook it was written during. When the first reading after a
+restart is more than a window span before or after the newest checkpointed one (the next day's
+cook, or the same CSV replayed again), the consumer logs it to "bbq.checkpoint" and starts over
+with an empty window and checkpoint (see ChannelMonitor.attach_checkpoint in bbq/consumer.py).
+"""
+
+import logging
+import mmap
+import os
+import struct
+import time
+
+MAGIC = b"BBQRING1"
+VERSION = 2
+# magic, version, capacity, next slot, count
+_HEADER = struct.Struct("<8sIIQQ")
+_RECORD = struct.Struct("<dd")
+
+checkpoint_log = logging.getLogger("bbq.checkpoint")
+
+
+class RingCheckpoint:
+    """Memory-mapped ring buffer of (timestamp, temp) readings for one channel.
+
+    Parameters:
+        path (str): checkpoint file, created if missing
+        capacity (int): readings kept in the ring
+        flush_interval (float): seconds between msyncs of the map
+    """
+
+    def __init__(self, path: str, capacity: int = 4096, flush_interval: float = 5.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        size = _HEADER.size + capacity * _RECORD.size
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fresh = os.fstat(fd).st_size != size
+            if fresh:
+                # New file, or one written with another capacity: start over
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+            self._map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+
+        magic, version, stored_capacity, self.head, self.count = _HEADER.unpack_from(self._map, 0)
+        if fresh or magic != MAGIC or version != VERSION or stored_capacity != capacity:
+            self.head, self.count = 0, 0
+            self._write_header(capacity)
+        self.capacity = capacity
+        self._last_flush = time.monotonic()
+
+    def _write_header(self, capacity: int | None = None):
+        _HEADER.pack_into(self._map, 0, MAGIC, VERSION, capacity or self.capacity, self.head, self.count)
+
+    def append(self, timestamp: float, temp: float):
+        """Write a reading into the next slot."""
+        _RECORD.pack_into(self._map, _HEADER.size + self.head * _RECORD.size, timestamp, temp)
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+        self._write_header()
+
+    def readings(self) -> list:
+        """Return the stored readings, oldest first."""
+        start = (self.head - self.count) % self.capacity
+        return [_RECORD.unpack_from(self._map, _HEADER.size + ((start + i) % self.capacity) * _RECORD.size)
+                for i in range(self.count)]
+
+    def reset(self):
+        """Forget every stored reading."""
+        self.head, self.count = 0, 0
+        self._write_header()
+
+    def flush_if_due(self):
+        """msync the map when the flush interval has passed."""
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval:
+            self._map.flush()
+            self._last_flush = now
+
+    def close(self):
+        """Flush and unmap the file."""
+        self._map.flush()
+        self._map.close()
@@ -0,0 +1,79 @@
+"""
+BBQ Connections
+
+File Description & Approach:
+Connection settings and the reconnect policy shared by the producer, consumers and dashboard.
+Every connection is opened with a heartbeat, so a dead TCP connection (a broker restart, a
+laptop waking from sleep, a dropped network) is noticed within a couple of heartbeat intervals
+instead of hanging. After a lost connection, clients reconnect with exponential backoff: the delay
+doubles after each failed attempt up to max_delay, with jitter so a fleet of clients does not
+retry in lockstep, and starts over once a connection succeeds.
+
+The first connection is not retried: a wrong host name should fail at startup with a clear
+message, not retry forever.
+"""
+
+import logging
+import random
+import time
+
+import pika
+
+DEFAULT_HEARTBEAT = 30  # seconds
+# Errors after which a new connection may succeed (a lost connection also closes its channels)
+CONNECTION_ERRORS = (pika.exceptions.AMQPConnectionError, pika.exceptions.ChannelWrongStateError)
+
+connection_log = logging.getLogger("bbq.connection")
+
+
+def connection_parameters(host: str, heartbeat: int = DEFAULT_HEARTBEAT) -> pika.ConnectionParameters:
+    """Return the parameters every BBQ connection is opened with."""
+    return pika.ConnectionParameters(host=host, heartbeat=heartbeat)
+
+
+class Backoff:
+    """Exponential reconnect delays with jitter.
+
+    Parameters:
+        initial (float): seconds before the first retry
+        max_delay (float): longest delay between retries
+        jitter (float): fraction of each delay that is randomized
+    """
+
+    def __init__(self, initial: float = 1.0, max_delay: float = 60.0, jitter: float = 0.2):
+        self.initial = initial
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.attempts = 0
+
+    def next_delay(self) -> float:
+        """Return the delay before the next attempt and double it for the one after."""
+        delay = min(self.initial * 2 ** self.attempts, self.max_delay)
+        self.attempts += 1
+        return delay * (1 - self.jitter * random.random())
+
+    def reset(self):
+        self.attempts = 0
+
+
+def reconnect(connect, backoff: Backoff, what: str, sleep=time.sleep):
+    """Call connect() until it succeeds, waiting for the backoff delay after each failure.
+
+    Parameters:
+        connect (callable): opens the connection and sets up channels, raising a CONNECTION_ERRORS error on failure
+        backoff (Backoff): delay policy, reset once connect() succeeds
+        what (str): description for the log, e.g. "consumer"
+        sleep (callable): sleeps between attempts
+    """
+    while True:
+        delay = backoff.next_delay()
+        connection_log.warning("Reconnecting %s in %.1f seconds", what, delay, extra={"delay": round(delay, 1)})
+        sleep(delay)
+        try:
+            result = connect()
+        except CONNECTION_ERRORS as e:
+            connection_log.warning("Reconnecting %s failed: %s", what, e or type(e).__name__)
+            continue
+        backoff.reset()
+        connection_log.warning("Reconnected %s", what)
+        return result
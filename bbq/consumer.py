@@ -0,0 +1,630 @@
+"""
+BBQ Consumer Engine
+
+File Description & Approach:
+One consumer engine serves any number of temperature channels over a single RabbitMQ connection,
+with one pika channel per queue. Each channel is declared with a ChannelSpec (queue, window,
+threshold, alert text, extra rules and forecast target) and kept by a ChannelMonitor:
+
+- a TimeWindow keyed by the reading timestamps (see bbq/windows.py); the channel alerts through
+  the shared AlertDispatcher when the newest minus the oldest reading of a window that covers its
+  span is at or below the threshold
+- the channel's extra rules (see bbq/rules.py) and, for channels with a target, an O(1) ETA
+  forecast published as JSON on the results queue (see bbq/forecast.py)
+- optionally a memory-mapped checkpoint of the window that is restored at startup (see
+  bbq/checkpoint.py), and the reading history with rollups for charting (see bbq/tsdb.py)
+
+A message holds one reading or an envelope of many, and each reading goes through the window and
+alert check in order before the message is acknowledged. Acks can be batched into cumulative acks
+flushed by count or age; they only ever cover fully processed messages. A message that cannot be
+decoded is dead-lettered, and one whose processing fails is retried later (see bbq/deadletter.py).
+A lost connection is reopened with backoff (see bbq/connection.py), and redelivered readings that
+already reached a window are skipped. While the queues hold a backlog, CatchUp switches to a large
+prefetch and ack batch and sends each alert once until the backlog is drained.
+"""
+
+from dataclasses import dataclass
+import logging
+import os
+import struct
+import sys
+import time
+
+import pika
+
+from bbq.alerts import AlertDispatcher
+from bbq.checkpoint import RingCheckpoint, checkpoint_log
+from bbq.connection import CONNECTION_ERRORS, DEFAULT_HEARTBEAT, Backoff, connection_log, connection_parameters, reconnect
+from bbq.deadletter import DeadLetters, declare_retry, retry_count
+from bbq.forecast import FORECAST_PROPERTIES, RESULTS_ARGUMENTS, RESULTS_QUEUE, EtaForecaster, forecast_message
+from bbq.log import alerts_log, readings_log, setup_logging
+from bbq.messages import FOOD_A_ID, FOOD_B_ID, SMOKER_ID, declare_readings, decode_messages
+from bbq.metrics import published_at, registry
+from bbq.tsdb import HistoryStore
+from bbq.rules import compile_rules, describe
+from bbq.windows import TimeWindow
+
+
+@dataclass(frozen=True)
+class ChannelSpec:
+    """Declarative description of one temperature channel.
+
+    Parameters:
+        queue (str): RabbitMQ queue the readings arrive on
+        channel_id (int): channel id used in binary messages
+        name (str): name used in console output, e.g. "smoker" or "food A"
+        window_seconds (float): length of the time window in seconds
+        window_text (str): window length for console output, e.g. "2.5 minutes"
+        threshold (float): alert when newest minus oldest reading is at or below this value
+        alert_label (str): console prefix for alerts, e.g. "SMOKER ALERT"
+        subject (str): email subject
+        content (str): email body
+        rules (tuple[Rule, ...]): extra alert rules evaluated on every reading
+        target (float | None): target temperature for the cook-completion forecast; None disables
+    """
+    queue: str
+    channel_id: int
+    name: str
+    window_seconds: float
+    window_text: str
+    threshold: float
+    alert_label: str
+    subject: str
+    content: str
+    rules: tuple = ()
+    target: float | None = None
+
+
+SMOKER_CHANNEL = ChannelSpec(
+    queue="01-smoker",
+    channel_id=SMOKER_ID,
+    name="smoker",
+    window_seconds=150,  # 2.5 minutes
+    window_text="2.5 minutes",
+    threshold=-15,
+    alert_label="SMOKER ALERT",
+    subject="SMOKER ALERT",
+    content="SMOKER ALERT: Smoker temp has decreased by 15 degrees or more in the last 2.5 minutes.",
+)
+FOOD_A_CHANNEL = ChannelSpec(
+    queue="02-food-A",
+    channel_id=FOOD_A_ID,
+    name="food A",
+    window_seconds=600,  # 10 minutes
+    window_text="10 minutes",
+    threshold=1,
+    alert_label="FOOD STALL",
+    subject="FOOD A STALL",
+    content="FOOD A STALL: Food A temp has changed by 1 degree or less in the last 10 minutes.",
+    target=203,
+)
+FOOD_B_CHANNEL = ChannelSpec(
+    queue="03-food-B",
+    channel_id=FOOD_B_ID,
+    name="food B",
+    window_seconds=600,  # 10 minutes
+    window_text="10 minutes",
+    threshold=1,
+    alert_label="FOOD STALL",
+    subject="FOOD B STALL",
+    content="FOOD B STALL: Food B temp has changed by 1 degree or less in the last 10 minutes.",
+    target=203,
+)
+DEFAULT_CHANNELS = (SMOKER_CHANNEL, FOOD_A_CHANNEL, FOOD_B_CHANNEL)
+
+
+class AckBatcher:
+    """Collect delivery tags on one channel and acknowledge them cumulatively.
+
+    Parameters:
+        channel: the pika channel the deliveries arrived on
+        batch_size (int): pending acks that trigger a flush
+        interval (float): max seconds an ack may stay pending
+    """
+
+    def __init__(self, channel, batch_size: int = 1, interval: float = 0.5):
+        self.channel = channel
+        self.batch_size = batch_size
+        self.interval = interval
+        self.pending = 0
+        self.last_tag = None
+        self.first_pending_at = None
+
+    def ack(self, delivery_tag: int):
+        """Record a processed delivery, flushing when the batch is full."""
+        self.last_tag = delivery_tag
+        if self.pending == 0:
+            self.first_pending_at = time.monotonic()
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.flush()
+
+    def flush_if_due(self):
+        """Flush when the oldest pending ack has waited for the interval."""
+        if self.pending and time.monotonic() - self.first_pending_at >= self.interval:
+            self.flush()
+
+    def flush(self):
+        """Acknowledge every processed delivery up to the last tag."""
+        if self.pending:
+            # Deliveries are processed in order, so one cumulative ack covers them all
+            self.channel.basic_ack(delivery_tag=self.last_tag, multiple=True)
+            self.pending = 0
+
+
+class CatchUp:
+    """Throughput settings for draining a backlog, with deduplicated alerts.
+
+    The queue depths are checked every check_interval seconds. Above threshold queued messages,
+    every channel switches to the catch-up prefetch and ack batch, and each alert type is emailed
+    at most once until caught up (the conditions being replayed may be long over). Once the
+    backlog falls below a tenth of threshold, the normal settings come back. RabbitMQ applies a
+    prefetch count to consumers registered after it is set, so each switch re-registers the
+    consumers; messages prefetched but not yet dispatched are requeued by pika.
+
+    Parameters:
+        alerts (AlertDispatcher): alert sender whose deduplication is switched on while catching up
+        threshold (int): queued messages that start catch-up mode
+        prefetch_count (int): unacknowledged messages per channel while catching up
+        ack_batch (int): messages per cumulative ack while catching up
+        check_interval (float): seconds between queue depth checks
+    """
+
+    def __init__(self, alerts: AlertDispatcher, threshold: int = 1000, prefetch_count: int = 1000,
+                 ack_batch: int = 500, check_interval: float = 5.0):
+        if ack_batch > prefetch_count:
+            raise ValueError(f"catch-up ack_batch ({ack_batch}) must not exceed prefetch_count ({prefetch_count})")
+        self.alerts = alerts
+        self.threshold = threshold
+        self.prefetch_count = prefetch_count
+        self.ack_batch = ack_batch
+        self.check_interval = check_interval
+        self.active = False
+        self.caught_up = 0  # backlogs drained so far
+        self._next_check = 0.0
+
+    @staticmethod
+    def backlog(lanes) -> int:
+        """Messages waiting in the queues of (queue, AckBatcher, callback) lanes."""
+        return sum(acks.channel.queue_declare(queue, passive=True).method.message_count for queue, acks, _ in lanes)
+
+    def check(self, lanes, prefetch_count: int, ack_batch: int, force: bool = False):
+        """Enter or leave catch-up mode for the lanes, going back to prefetch_count and ack_batch when done."""
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        backlog = self.backlog(lanes)
+        if not self.active and backlog > self.threshold:
+            connection_log.warning("Catching up on a backlog of %d messages", backlog, extra={"backlog": backlog})
+            self._apply(lanes, self.prefetch_count, self.ack_batch, True)
+        elif self.active and backlog < self.threshold / 10:
+            connection_log.warning("Caught up; back to low-latency delivery", extra={"backlog": backlog})
+            self.caught_up += 1
+            self._apply(lanes, prefetch_count, ack_batch, False)
+
+    def _apply(self, lanes, prefetch_count: int, ack_batch: int, active: bool):
+        for queue, acks, callback in lanes:
+            acks.flush()
+            channel = acks.channel
+            for consumer_tag in list(channel.consumer_tags):
+                channel.basic_cancel(consumer_tag)
+            channel.basic_qos(prefetch_count=prefetch_count)
+            channel.basic_consume(queue, auto_ack=False, on_message_callback=callback)
+            acks.batch_size = ack_batch
+        self.alerts.deduplicate = active
+        self.active = active
+
+    def reset(self):
+        """Forget the mode after a lost connection (new channels start with the normal settings)."""
+        self.alerts.deduplicate = False
+        self.active = False
+        self._next_check = 0.0
+
+
+class ChannelMonitor:
+    """Window state and message callback for one channel."""
+
+    def __init__(self, spec: ChannelSpec, alerts: AlertDispatcher, max_envelope: int | None = None):
+        self.spec = spec
+        self.alerts = alerts
+        self.max_envelope = max_envelope
+        self._new_state()
+        # Set by the engine when forecasts are published: publish_forecast(spec, forecast)
+        self.publish_forecast = None
+        # Set by the engine once the channel is open
+        self.acks = None
+        self.dead_letters = None
+        self.checkpoint = None
+        self.history = None
+        self._resume_after = None
+        self._restored = False
+        self.processed = 0
+        # Metric names, built once
+        self._latency_name = f"latency.{spec.queue}"
+        self._callback_name = f"callback.{spec.queue}"
+        self._messages_name = f"messages.{spec.queue}"
+        self._readings_name = f"readings.{spec.queue}"
+
+    def _new_state(self):
+        """Start with an empty window, rules and forecast."""
+        spec = self.spec
+        self.window = TimeWindow(spec.window_seconds)
+        # Rules over the same span read the built-in window instead of keeping a copy
+        self.rules = compile_rules(spec.rules, {spec.window_seconds: self.window})
+        self.forecaster = EtaForecaster(spec.target) if spec.target is not None else None
+
+    def attach_checkpoint(self, checkpoint):
+        """Restore the window from a checkpoint and mirror new readings into it.
+
+        The first reading that arrives afterwards decides whether the checkpoint is kept: within
+        a window span of the newest checkpointed reading it continues the same cook, otherwise
+        (a new cook, or the same file replayed again) the window and checkpoint start over.
+        """
+        readings = checkpoint.readings()
+        self.window.restore(readings)
+        if self.rules is not None:
+            self.rules.restore(readings)
+        if self.forecaster is not None:
+            for timestamp, temp in readings:
+                self.forecaster.update(timestamp, temp)
+        self.checkpoint = checkpoint
+        if readings:
+            # Redelivered messages that were already checkpointed must not be counted twice
+            self._resume_after = readings[-1][0]
+            self._restored = True
+
+    def start_over(self, timestamp: float):
+        """Drop restored history that belongs to another cook."""
+        checkpoint_log.warning("Checkpoint of %s ends at %.0f but the next reading is at %.0f; starting a new window",
+                               self.spec.queue, self._resume_after, timestamp,
+                               extra={"queue": self.spec.queue, "checkpoint_end": self._resume_after,
+                                      "timestamp": timestamp})
+        self._new_state()
+        if self.checkpoint is not None:
+            self.checkpoint.reset()
+        self._resume_after = None
+
+    def skip_processed(self):
+        """Skip readings up to the newest one in the window, e.g. in a retried message.
+
+        Readings of a retried message that newer readings have overtaken are skipped too, since
+        the window only moves forward; on_message reports them to DeadLetters.skip().
+        """
+        newest = self.window.last_timestamp
+        if newest is not None:
+            self._resume_after = newest
+
+    def already_processed(self, timestamp: float) -> bool:
+        """Return True for a reading that reached the window before a restart, reconnect or retry."""
+        if self._restored:
+            self._restored = False
+            if abs(timestamp - self._resume_after) > self.spec.window_seconds:
+                self.start_over(timestamp)
+                return False
+        if timestamp <= self._resume_after:
+            return True
+        self._resume_after = None
+        return False
+
+    def update(self, timestamp: float, temp: float) -> float | None:
+        """Add a reading and return the window change once the window covers its span."""
+        self.window.append(timestamp, temp)
+        if self.checkpoint is not None:
+            self.checkpoint.append(timestamp, temp)
+        if self.history is not None:
+            self.history.append(timestamp, temp)
+        if self.rules is not None:
+            self.rules.update(timestamp, temp)
+        if self.forecaster is not None:
+            forecast = self.forecaster.update(timestamp, temp)
+            if forecast is not None and self.publish_forecast is not None:
+                self.publish_forecast(self.spec, forecast)
+        if not self.window.ready:
+            return None
+        # Difference in most recent temp and oldest temp in the window
+        return round(float(self.window.change), 1)
+
+    def process(self, timestamp: float, temp: float) -> bool:
+        """Run one reading through the window and alert check; return False if it was already processed."""
+        if self._resume_after is not None and self.already_processed(timestamp):
+            return False
+        spec = self.spec
+        temp_check = self.update(timestamp, temp)
+
+        if temp_check is not None and temp_check <= spec.threshold:
+            alerts_log.warning("%s: Current %s temp is: %s ; %s temp change in last %s is: %s degrees",
+                               spec.alert_label, spec.name, temp, spec.name.capitalize(), spec.window_text,
+                               temp_check, extra={"queue": spec.queue, "temp": temp, "change": temp_check})
+            # Queue an email alert (rate limited while the condition lasts)
+            self.alerts.send(spec.subject, spec.content)
+        else:
+            if temp_check is not None:
+                # The condition has cleared, so the next occurrence alerts right away
+                self.alerts.clear(spec.subject)
+            # Let user know current temp (sampled, and skipped entirely below INFO)
+            if readings_log.isEnabledFor(logging.INFO):
+                readings_log.info("Current %s temp is: %s", spec.name, temp,
+                                  extra={"queue": spec.queue, "temp": temp})
+        if self.rules is not None and self.rules.events:
+            self.process_rule_events(temp)
+        self.processed += 1
+        return True
+
+    def process_rule_events(self, temp: float):
+        """Alert on rules that have started firing and reset the ones that have cleared."""
+        spec = self.spec
+        for event in self.rules.drain():
+            rule = event.rule
+            key = f"{spec.queue}:{rule.name}"
+            label = rule.label or f"{spec.name.upper()} {rule.name.upper().replace('-', ' ')}"
+            text = describe(event, spec.name)
+            if event.active:
+                alerts_log.warning("%s: %s", label, text,
+                                   extra={"queue": spec.queue, "rule": rule.name, "temp": temp, "value": event.value})
+                self.alerts.send(rule.subject or label, rule.content or f"{label}: {text}", key=key)
+            else:
+                alerts_log.info("%s cleared: %s", label, text,
+                                extra={"queue": spec.queue, "rule": rule.name, "temp": temp, "value": event.value})
+                self.alerts.clear(key)
+
+    def on_message(self, ch, method, properties, body):
+        """Define behavior on getting a message for this channel."""
+        instrumented = registry.enabled
+        if instrumented:
+            started = time.perf_counter()
+            sent_at = published_at(properties)
+            if sent_at is not None:
+                registry.histogram(self._latency_name).observe(time.time() - sent_at)
+
+        # A message holds one reading (text or binary) or an envelope of many, oldest first
+        try:
+            readings = decode_messages(body, properties, self.max_envelope)
+        except (ValueError, struct.error) as e:
+            if self.dead_letters is None:
+                raise
+            # A malformed body fails the same way every time, so it is not retried
+            self.dead_letters.reject(method, e)
+            return
+        try:
+            retried = retry_count(properties)
+            if retried:
+                self.skip_processed()
+            skipped = 0
+            for timestamp, temp, _ in readings:
+                if not self.process(timestamp, temp):
+                    skipped += 1
+            if retried and skipped and self.dead_letters is not None:
+                self.dead_letters.skip(skipped)
+        except Exception as e:
+            if self.dead_letters is None:
+                raise
+            self.dead_letters.retry(method, properties, body, e)
+            return
+
+        # Acknowledge the message was received and processed (possibly batched)
+        self.acks.ack(method.delivery_tag)
+
+        if instrumented:
+            registry.histogram(self._callback_name).observe(time.perf_counter() - started)
+            registry.counter(self._messages_name).inc()
+            registry.counter(self._readings_name).inc(len(readings))
+
+
+def results_publisher(channel, queue: str):
+    """Declare the capped results queue and return a publish_forecast(spec, forecast, device=None) function."""
+    channel.queue_declare(queue, durable=True, arguments=RESULTS_ARGUMENTS)
+
+    def publish_forecast(spec, forecast, device=None):
+        channel.basic_publish(exchange="", routing_key=queue, body=forecast_message(spec, forecast, device),
+                              properties=FORECAST_PROPERTIES)
+    return publish_forecast
+
+
+class ConsumerEngine:
+    """Consume many channels over one connection, one pika channel per queue.
+
+    Parameters:
+        host (str): the host name or IP address of the RabbitMQ server
+        specs (list[ChannelSpec]): channels to serve
+        alerts (AlertDispatcher | None): alert sender shared by every channel
+        prefetch_count (int): unacknowledged messages the broker may send per channel
+        ack_batch (int): processed messages per cumulative ack
+        ack_interval (float): max seconds before pending acks are flushed
+        max_envelope (int | None): largest envelope (in readings) accepted from the producer
+        checkpoint_dir (str | None): directory for per-channel window checkpoints; None disables
+        reset_queues (bool): delete each queue on startup (drops any backlog)
+        results_queue (str | None): queue the ETA forecasts are published on; None disables
+        history_dir (str | None): directory of the reading history store; None disables
+        max_retries (int): retries of a message whose processing fails before it is dead-lettered
+        retry_delay (float): seconds before a failed message is retried
+        heartbeat (int): AMQP heartbeat interval in seconds
+        catchup_threshold (int | None): queued messages that start catch-up mode; None disables
+        catchup_prefetch (int): unacknowledged messages per channel while catching up
+        catchup_ack_batch (int): messages per cumulative ack while catching up
+    """
+
+    def __init__(self, host: str, specs, alerts: AlertDispatcher | None = None,
+                 prefetch_count: int = 1, ack_batch: int = 1, ack_interval: float = 0.5,
+                 max_envelope: int | None = None, checkpoint_dir: str | None = None,
+                 reset_queues: bool = False, results_queue: str | None = RESULTS_QUEUE,
+                 history_dir: str | None = None, max_retries: int = 3, retry_delay: float = 5.0,
+                 heartbeat: int = DEFAULT_HEARTBEAT, catchup_threshold: int | None = 1000,
+                 catchup_prefetch: int = 1000, catchup_ack_batch: int = 500):
+        if ack_batch > prefetch_count:
+            # The broker would stop delivering before a batch could fill up
+            raise ValueError(f"ack_batch ({ack_batch}) must not exceed prefetch_count ({prefetch_count})")
+        self.host = host
+        self.prefetch_count = prefetch_count
+        self.ack_batch = ack_batch
+        self.ack_interval = ack_interval
+        self.checkpoint_dir = checkpoint_dir
+        self.reset_queues = reset_queues
+        self.results_queue = results_queue
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.alerts = alerts or AlertDispatcher()
+        self.monitors = [ChannelMonitor(spec, self.alerts, max_envelope) for spec in specs]
+        self.history = HistoryStore(history_dir) if history_dir is not None else None
+        self.heartbeat = heartbeat
+        self.backoff = Backoff()
+        self.catch_up = (CatchUp(self.alerts, catchup_threshold, catchup_prefetch, catchup_ack_batch)
+                         if catchup_threshold is not None else None)
+        self.connection = None
+
+    def start(self):
+        """Restore the checkpoints, connect and register a consumer for every channel."""
+        if self.checkpoint_dir is not None:
+            # Restore window history before any message arrives
+            for monitor in self.monitors:
+                path = os.path.join(self.checkpoint_dir, f"{monitor.spec.queue}.ring")
+                monitor.attach_checkpoint(RingCheckpoint(path))
+        if self.history is not None:
+            for monitor in self.monitors:
+                monitor.history = self.history.series(monitor.spec.queue)
+        self.connect()
+
+    def connect(self):
+        """Open the connection and register a consumer for every channel (again after a reconnect)."""
+        self.connection = pika.BlockingConnection(connection_parameters(self.host, self.heartbeat))
+        if self.results_queue is not None and any(monitor.forecaster for monitor in self.monitors):
+            publish = results_publisher(self.connection.channel(), self.results_queue)
+            for monitor in self.monitors:
+                monitor.publish_forecast = publish
+        for monitor in self.monitors:
+            queue = monitor.spec.queue
+            # Each queue gets its own channel on the shared connection
+            channel = self.connection.channel()
+            if self.reset_queues:
+                # Use the channel to clear the queue
+                channel.queue_delete(queue)
+            # Use the channel to declare a durable queue bound to the readings exchange
+            declare_readings(channel, (queue,))
+            # Limit the number of unacknowledged messages in flight on this channel
+            channel.basic_qos(prefetch_count=self.prefetch_count)
+            monitor.acks = AckBatcher(channel, self.ack_batch, self.ack_interval)
+            declare_retry(channel, queue)
+            monitor.dead_letters = DeadLetters(monitor.acks, queue, self.max_retries, self.retry_delay)
+            channel.basic_consume(queue, auto_ack=False, on_message_callback=monitor.on_message)
+        # Queues are only ever cleared on the first connection
+        self.reset_queues = False
+        if self.catch_up is not None:
+            self.catch_up.check(self.lanes(), self.prefetch_count, self.ack_batch, force=True)
+
+    def lanes(self) -> list:
+        """(queue, AckBatcher, callback) of every channel."""
+        return [(monitor.spec.queue, monitor.acks, monitor.on_message) for monitor in self.monitors]
+
+    def poll(self):
+        """Dispatch messages for up to ack_interval seconds, reconnecting with backoff after a lost connection."""
+        try:
+            self._dispatch()
+        except CONNECTION_ERRORS as e:
+            connection_log.warning("Consumer connection lost: %s", e or type(e).__name__)
+            self.disconnected()
+            reconnect(self.connect, self.backoff, "consumer")
+
+    def _dispatch(self):
+        """Process deliveries, then flush due acks, checkpoints and history and check the backlog."""
+        self.connection.process_data_events(time_limit=self.ack_interval)
+        for monitor in self.monitors:
+            monitor.acks.flush_if_due()
+            if monitor.checkpoint is not None:
+                monitor.checkpoint.flush_if_due()
+        if self.history is not None:
+            self.history.flush_if_due()
+        if self.catch_up is not None:
+            self.catch_up.check(self.lanes(), self.prefetch_count, self.ack_batch)
+
+    def run_forever(self):
+        """Dispatch messages until interrupted."""
+        while True:
+            self.poll()
+
+    def disconnected(self):
+        """Drop the lost connection; unacknowledged messages will be redelivered."""
+        try:
+            self.connection.close()
+        except CONNECTION_ERRORS:
+            pass
+        for monitor in self.monitors:
+            # Readings that reached the window before the connection was lost are not counted twice
+            monitor.skip_processed()
+        if self.catch_up is not None:
+            self.catch_up.reset()
+
+    def flush_acks(self):
+        """Acknowledge every message that has been fully processed."""
+        for monitor in self.monitors:
+            if monitor.acks is not None and monitor.acks.channel.is_open:
+                monitor.acks.flush()
+
+    def close(self):
+        """Flush pending acks, close the connection and finish sending queued alerts."""
+        if self.connection is not None and self.connection.is_open:
+            self.flush_acks()
+            self.connection.close()
+        for monitor in self.monitors:
+            if monitor.checkpoint is not None:
+                monitor.checkpoint.close()
+                monitor.checkpoint = None
+        if self.history is not None:
+            self.history.close()
+        self.alerts.close()
+
+
+def run(host: str, specs, prefetch_count: int = 1, ack_batch: int = 1, ack_interval: float = 0.5,
+        max_envelope: int | None = None, checkpoint_dir: str | None = "checkpoints",
+        results_queue: str | None = RESULTS_QUEUE, history_dir: str | None = None,
+        max_retries: int = 3, retry_delay: float = 5.0, catchup_threshold: int | None = 1000,
+        heartbeat: int = DEFAULT_HEARTBEAT):
+    """Continuously listen for temperature messages on the given channels.
+
+    Parameters:
+        host (str): the host name or IP address of the RabbitMQ server
+        specs (list[ChannelSpec]): channels to serve
+        prefetch_count (int): unacknowledged messages the broker may send per channel
+        ack_batch (int): processed messages per cumulative ack
+        ack_interval (float): max seconds before pending acks are flushed
+        max_envelope (int | None): largest envelope (in readings) accepted from the producer
+        checkpoint_dir (str | None): directory for per-channel window checkpoints; None disables
+        results_queue (str | None): queue the ETA forecasts are published on; None disables
+        history_dir (str | None): directory of the reading history store; None disables
+        max_retries (int): retries of a message whose processing fails before it is dead-lettered
+        retry_delay (float): seconds before a failed message is retried
+        catchup_threshold (int | None): queued messages that start catch-up mode; None disables
+        heartbeat (int): AMQP heartbeat interval in seconds
+    """
+    # Keeps any logging set up by the entry script, otherwise logs every line at INFO
+    setup_logging()
+    engine = ConsumerEngine(host, specs, prefetch_count=prefetch_count, ack_batch=ack_batch,
+                            ack_interval=ack_interval, max_envelope=max_envelope,
+                            checkpoint_dir=checkpoint_dir, results_queue=results_queue,
+                            history_dir=history_dir, max_retries=max_retries, retry_delay=retry_delay,
+                            catchup_threshold=catchup_threshold, heartbeat=heartbeat)
+    try:
+        engine.start()
+    except pika.exceptions.AMQPConnectionError as e:
+        print()
+        print("ERROR: connection to RabbitMQ server failed.")
+        print(f"Verify the server is running on host={host}.")
+        print(f"The error says: {e}")
+        print()
+        sys.exit(1)
+
+    try:
+        queues = ", ".join(monitor.spec.queue for monitor in engine.monitors)
+        print(f" [*] Ready for work on {queues}. To exit press CTRL+C")
+        engine.run_forever()
+    except Exception as e:
+        print()
+        print("ERROR: something went wrong.")
+        print(f"The error says: {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print()
+        print(" User interrupted continuous listening process.")
+        sys.exit(0)
+    finally:
+        print("\nClosing connection. Goodbye.\n")
+        engine.close()
@@ -0,0 +1,314 @@
+"""
+BBQ Live Dashboard
+
+File Description & Approach:
+A local HTTP service that pushes live temperatures to any number of browsers. DashboardFeed reads
+a copy of every reading from its own exclusive queue, bound with "#" to the readings exchange
+(the three temperature queues) and the fleet exchange (every device), so it never takes messages
+from the alerting consumers. The queue is capped at max_backlog messages and drops the oldest
+when full, and messages are auto-acked, so a dashboard that falls behind never holds up the
+producer or the consumers. After a lost connection the feed reconnects with backoff and binds a
+fresh queue; readings published while it was away are missed, the live table fills in again.
+
+Readings go into a LiveState: a ring buffer of recent readings per series ("01-smoker", or
+"<device>/01-smoker" in fleet mode) that serves the initial state, plus the order in which series
+last changed. Each browser is served by its own thread over Server-Sent Events: it gets a snapshot
+of the ring buffers first, then at most max_rate updates per second, each holding only the newest
+reading of every series that changed since its previous update. A slow browser therefore gets
+fewer, coalesced updates instead of a growing backlog, and a stalled one is dropped after
+send_timeout seconds; neither ever blocks the feed or the other browsers.
+
+Routes: / (live table), /events (SSE), /state (JSON snapshot) and /history (rollups from the
+history store, see bbq/tsdb.py). /events and /state take ?prefix= to follow one device; /history
+covers the last ?hours= up to the newest stored reading, or an explicit ?start= and ?end=.
+"""
+
+from collections import OrderedDict, deque
+import http.server
+import json
+import os
+import struct
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import pika
+
+from bbq.connection import CONNECTION_ERRORS, DEFAULT_HEARTBEAT, Backoff, connection_log, connection_parameters, reconnect
+from bbq.consumer import DEFAULT_CHANNELS
+from bbq.fleet import DEVICE_HEADER, DEVICE_PATTERN, FLEET_EXCHANGE, message_device
+from bbq.messages import READINGS_EXCHANGE, decode_messages
+from bbq.tsdb import HistoryStore
+
+PAGE = b"""<!doctype html>
+<meta charset="utf-8">
+<title>BBQ Live</title>
+<style>body { font-family: sans-serif } td { padding: 2px 12px }</style>
+<h1>BBQ Live</h1>
+<table id="readings"></table>
+<script>
+const rows = {};
+function show(series, reading) {
+  let row = rows[series];
+  if (!row) {
+    row = rows[series] = document.getElementById("readings").insertRow();
+    row.insertCell().textContent = series;
+    row.insertCell();
+    row.insertCell();
+  }
+  row.cells[1].textContent = reading[1].toFixed(1);
+  row.cells[2].textContent = new Date(reading[0] * 1000).toLocaleString();
+}
+const events = new EventSource("events" + location.search);
+events.addEventListener("snapshot", event => {
+  const series = JSON.parse(event.data);
+  for (const name in series) if (series[name].length) show(name, series[name][series[name].length - 1]);
+});
+events.addEventListener("update", event => {
+  const series = JSON.parse(event.data);
+  for (const name in series) show(name, series[name]);
+});
+</script>
+"""
+
+
+class LiveState:
+    """Recent readings of every series, shared by the feed and the browser threads.
+
+    Parameters:
+        ring_size (int): readings kept per series for the initial state
+    """
+
+    def __init__(self, ring_size: int = 600):
+        self.ring_size = ring_size
+        self.rings = {}  # series -> deque of (timestamp, temp)
+        self.version = 0  # bumped once per batch of readings
+        self._changed = OrderedDict()  # series -> version of its newest reading, most recent last
+        self._condition = threading.Condition()
+
+    def add(self, readings):
+        """Add (series, timestamp, temp) readings and wake the waiting browsers once."""
+        with self._condition:
+            self.version += 1
+            version = self.version
+            for series, timestamp, temp in readings:
+                ring = self.rings.get(series)
+                if ring is None:
+                    ring = self.rings[series] = deque(maxlen=self.ring_size)
+                ring.append((timestamp, temp))
+                self._changed[series] = version
+                self._changed.move_to_end(series)
+            self._condition.notify_all()
+
+    def snapshot(self, prefix: str = "") -> tuple[int, dict]:
+        """Return (version, {series: [(timestamp, temp), ...]}) of the buffered readings."""
+        with self._condition:
+            return self.version, {series: list(ring) for series, ring in self.rings.items()
+                                  if series.startswith(prefix)}
+
+    def changes(self, since: int, prefix: str = "", timeout: float | None = None) -> tuple[int, dict]:
+        """Return (version, {series: (timestamp, temp)}) for the series changed after version since.
+
+        Only the newest reading of each series is returned, and only the series that changed are
+        visited. Waits up to timeout seconds when nothing has changed.
+        """
+        with self._condition:
+            if self.version <= since:
+                self._condition.wait_for(lambda: self.version > since, timeout)
+            latest = {}
+            for series, version in reversed(self._changed.items()):
+                if version <= since:
+                    break
+                if series.startswith(prefix):
+                    latest[series] = self.rings[series][-1]
+            return self.version, latest
+
+
+class DashboardFeed:
+    """Copy every reading from the readings and fleet exchanges into a LiveState.
+
+    Parameters:
+        host (str): the host name or IP address of the RabbitMQ server
+        state (LiveState): where readings are kept
+        specs (list[ChannelSpec]): channels, used to name fleet readings by their channel id
+        max_backlog (int): messages waiting at the broker before the oldest are dropped
+        heartbeat (int): AMQP heartbeat interval in seconds
+    """
+
+    def __init__(self, host: str, state: LiveState, specs=DEFAULT_CHANNELS, max_backlog: int = 10000,
+                 heartbeat: int = DEFAULT_HEARTBEAT):
+        self.host = host
+        self.heartbeat = heartbeat
+        self.backoff = Backoff()
+        self.state = state
+        self.queues = {spec.channel_id: spec.queue for spec in specs}
+        self.max_backlog = max_backlog
+        self.received = 0
+        self.invalid = 0
+        self.connection = None
+
+    def start(self):
+        """Connect and bind an exclusive queue to every reading."""
+        self.connection = pika.BlockingConnection(connection_parameters(self.host, self.heartbeat))
+        self.subscribe(self.connection.channel())
+
+    def subscribe(self, channel):
+        """Declare the dashboard's queue on channel and start consuming from it."""
+        # Server-named and deleted with the connection; when full the broker drops the oldest messages
+        result = channel.queue_declare("", exclusive=True, auto_delete=True,
+                                       arguments={"x-max-length": self.max_backlog, "x-overflow": "drop-head"})
+        queue = result.method.queue
+        for exchange in (READINGS_EXCHANGE, FLEET_EXCHANGE):
+            channel.exchange_declare(exchange, exchange_type="topic", durable=True)
+            channel.queue_bind(queue, exchange, routing_key="#")
+        # Auto-ack: the broker never waits on the dashboard
+        channel.basic_consume(queue, on_message_callback=self.on_message, auto_ack=True)
+
+    def on_message(self, ch, method, properties, body):
+        """Add every reading in a message to the live state."""
+        fleet = properties is not None and properties.headers and DEVICE_HEADER in properties.headers
+        try:
+            readings = decode_messages(body, properties)
+            device = message_device(method, properties) if fleet else None
+        except (ValueError, struct.error):
+            self.invalid += 1
+            return
+        if fleet:
+            # Fleet readings are named "<device>/<queue>" by their channel id
+            self.state.add([(f"{device}/{self.queues[channel_id]}", timestamp, round(temp, 1))
+                            for timestamp, temp, channel_id in readings if channel_id in self.queues])
+        else:
+            # The readings exchange routes by queue name
+            self.state.add([(method.routing_key, timestamp, round(temp, 1)) for timestamp, temp, _ in readings])
+        self.received += len(readings)
+
+    def run_forever(self):
+        """Receive readings until interrupted, reconnecting when the connection is lost."""
+        while True:
+            try:
+                self.connection.process_data_events(time_limit=1.0)
+            except CONNECTION_ERRORS as e:
+                connection_log.warning("Dashboard connection lost: %s", e or type(e).__name__)
+                self.close()
+                reconnect(self.start, self.backoff, "dashboard")
+
+    def close(self):
+        if self.connection is not None and self.connection.is_open:
+            try:
+                self.connection.close()
+            except CONNECTION_ERRORS:
+                pass
+
+
+def check_series(history: HistoryStore, name: str) -> str:
+    """Return a /history series name, raising ValueError unless it names a directory under the store root.
+
+    Series are "<queue>" or "<device>/<queue>", and every part follows the device id rule of
+    bbq/fleet.py, so a name can never be an absolute path or climb out of the root.
+    """
+    parts = name.split("/")
+    if len(parts) > 2 or not all(DEVICE_PATTERN.fullmatch(part) for part in parts):
+        raise ValueError("invalid series name")
+    root = os.path.realpath(history.root)
+    if os.path.commonpath([root, os.path.realpath(os.path.join(root, *parts))]) != root:
+        raise ValueError("invalid series name")
+    return name
+
+
+def serve(state: LiveState, port: int, host: str = "127.0.0.1", max_rate: float = 2.0,
+          keepalive: float = 15.0, send_timeout: float = 10.0, max_clients: int = 200,
+          history: HistoryStore | None = None) -> http.server.ThreadingHTTPServer:
+    """Serve the dashboard on http://host:port/ from daemon threads, one per browser.
+
+    Parameters:
+        state (LiveState): readings to serve
+        port (int): port to listen on
+        host (str): address to listen on
+        max_rate (float): most updates per second sent to one browser
+        keepalive (float): seconds without updates before a keepalive comment is sent
+        send_timeout (float): seconds a browser may stall a write before it is dropped
+        max_clients (int): browsers streaming at once; more get 503 until one leaves
+        history (HistoryStore | None): store that /history reads from; None disables the route
+    """
+    streams = threading.BoundedSemaphore(max_clients)
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        timeout = send_timeout
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            try:
+                self._route(url.path, params)
+            except ValueError as e:
+                self.send_error(400, str(e))
+
+        def _route(self, path: str, params: dict):
+            if path == "/":
+                self._send(PAGE, "text/html; charset=utf-8")
+            elif path == "/events":
+                if not streams.acquire(blocking=False):
+                    self.send_error(503, "too many dashboard clients")
+                    return
+                try:
+                    self._stream(params.get("prefix", ""), float(params.get("rate", max_rate)))
+                except (ConnectionError, TimeoutError):
+                    pass  # the browser left or stalled
+                finally:
+                    streams.release()
+            elif path == "/state":
+                version, rings = state.snapshot(params.get("prefix", ""))
+                self._send(json.dumps({"version": version, "series": rings}).encode(), "application/json")
+            elif path == "/history" and history is not None and "series" in params:
+                series = check_series(history, params["series"])
+                # Cooks are often replayed from old CSV files, so by default the range ends at the newest reading
+                end = float(params["end"]) if "end" in params else history.latest(series)
+                if end is None:
+                    resolution, points = 0, []
+                else:
+                    start = float(params["start"]) if "start" in params else end - float(params.get("hours", 12)) * 3600
+                    resolution, points = history.query(series, start, end, int(params.get("points", 1000)))
+                self._send(json.dumps({"resolution": resolution, "points": points}).encode(), "application/json")
+            else:
+                self.send_error(404)
+
+        def _send(self, body: bytes, content_type: str):
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _event(self, event: str, version: int, data: dict):
+            self.wfile.write(f"event: {event}\nid: {version}\ndata: {json.dumps(data)}\n\n".encode())
+
+        def _stream(self, prefix: str, rate: float):
+            """Send a snapshot, then coalesced updates at most rate times per second."""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            interval = 1 / min(max(rate, 0.01), max_rate)
+            version, rings = state.snapshot(prefix)
+            self._event("snapshot", version, rings)
+            self.wfile.flush()
+            last_write = time.monotonic()
+            while True:
+                # Everything that changes while this browser waits for its next slot is coalesced
+                time.sleep(max(0.0, last_write + interval - time.monotonic()))
+                version, latest = state.changes(version, prefix, keepalive)
+                if latest:
+                    self._event("update", version, latest)
+                elif time.monotonic() - last_write >= keepalive:
+                    self.wfile.write(b": keepalive\n\n")
+                else:
+                    continue
+                self.wfile.flush()
+                last_write = time.monotonic()
+
+        def log_message(self, format, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="dashboard-http", daemon=True).start()
+    return server
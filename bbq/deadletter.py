@@ -0,0 +1,146 @@
+"""
+BBQ Dead Letters
+
+File Description & Approach:
+Per-message error isolation for the consumer callbacks. A message that fails is settled on its
+own and the consumer carries on with the next one, instead of exiting and getting the same
+message redelivered on restart:
+
+- a body that cannot be decoded (blank temperature, malformed line, bad envelope) will never
+  parse, so it is rejected at once with basic_nack(requeue=False); the work queues are declared
+  with DEAD_LETTER_EXCHANGE as their dead-letter exchange, so the broker moves it to
+  DEAD_LETTER_QUEUE for inspection
+- any other error while processing is retried: a copy with the RETRY_HEADER count incremented is
+  published to "<queue>.retry" with a per-message expiration of retry_delay, and the retry queue
+  dead-letters it back to the original queue when it expires; the original is acknowledged.
+  After max_retries attempts the message is rejected to the dead-letter queue as well
+
+Readings are applied to a window in timestamp order, so a retried message only gets its readings
+that are newer than the window. The others either reached the window before the failure or were
+overtaken by newer readings while the copy waited, and can no longer be applied in order; they are
+skipped, counted (skipped.<queue>) and logged, so a retry that comes back too late is visible
+instead of silently lost.
+
+Each settled message costs one nack or one publish and a counter increment (dead_lettered.<queue>
+or retried.<queue> in the metrics registry). Errors are logged to "bbq.errors" at most once per
+log_interval seconds per queue, with the number of failures since the previous line, so a burst
+of bad messages does not turn into a burst of log lines.
+"""
+
+import logging
+import time
+
+import pika
+
+from bbq.metrics import registry
+
+DEAD_LETTER_EXCHANGE = "bbq.dead-letter"
+DEAD_LETTER_QUEUE = "bbq.dead-letter"
+RETRY_HEADER = "x-retry-count"
+# Arguments every work queue is declared with
+QUEUE_ARGUMENTS = {"x-dead-letter-exchange": DEAD_LETTER_EXCHANGE}
+
+errors_log = logging.getLogger("bbq.errors")
+
+
+def retry_queue(queue: str) -> str:
+    """Name of the queue that holds a queue's messages between retries."""
+    return f"{queue}.retry"
+
+
+def retry_arguments(queue: str) -> dict:
+    """Arguments of a retry queue: expired messages go back to the original queue."""
+    return {"x-dead-letter-exchange": "", "x-dead-letter-routing-key": queue}
+
+
+def declare_dead_letters(channel):
+    """Declare the dead-letter exchange and the durable queue that collects rejected messages."""
+    channel.exchange_declare(DEAD_LETTER_EXCHANGE, exchange_type="fanout", durable=True)
+    channel.queue_declare(DEAD_LETTER_QUEUE, durable=True)
+    channel.queue_bind(DEAD_LETTER_QUEUE, DEAD_LETTER_EXCHANGE)
+
+
+def declare_retry(channel, queue: str):
+    """Declare the retry queue of one work queue."""
+    channel.queue_declare(retry_queue(queue), durable=True, arguments=retry_arguments(queue))
+
+
+def retry_count(properties) -> int:
+    """Return how many times a message has been retried."""
+    if properties is None or not properties.headers:
+        return 0
+    return properties.headers.get(RETRY_HEADER, 0)
+
+
+class DeadLetters:
+    """Reject or retry failed messages of one queue.
+
+    Parameters:
+        acks (AckBatcher): ack batcher of the channel the messages arrive on
+        queue (str): the work queue
+        max_retries (int): retries before a failing message is dead-lettered; 0 never retries
+        retry_delay (float): seconds a message waits in the retry queue
+        log_interval (float): min seconds between error log lines
+    """
+
+    def __init__(self, acks, queue: str, max_retries: int = 3, retry_delay: float = 5.0,
+                 log_interval: float = 1.0):
+        self.acks = acks
+        self.queue = queue
+        self.max_retries = max_retries
+        self.expiration = str(round(retry_delay * 1000))
+        self.retry_queue = retry_queue(queue)
+        self.log_interval = log_interval
+        self.dead_lettered = 0
+        self.retried = 0
+        self.skipped = 0
+        self._next_log = 0.0
+        self._unlogged = 0
+        self._dead_lettered_name = f"dead_lettered.{queue}"
+        self._retried_name = f"retried.{queue}"
+        self._skipped_name = f"skipped.{queue}"
+
+    def reject(self, method, error: Exception):
+        """Send a message that can never be processed to the dead-letter queue."""
+        self.acks.channel.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+        self.dead_lettered += 1
+        if registry.enabled:
+            registry.counter(self._dead_lettered_name).inc()
+        self._log(logging.ERROR, "Dead-lettered message on %s: %s", error)
+
+    def retry(self, method, properties, body: bytes, error: Exception):
+        """Requeue a failed message after retry_delay, or dead-letter it once its retries are used up."""
+        attempts = retry_count(properties)
+        if attempts >= self.max_retries:
+            self.reject(method, error)
+            return
+        headers = dict(properties.headers or {}) if properties is not None else {}
+        headers[RETRY_HEADER] = attempts + 1
+        copy = pika.BasicProperties(content_type=properties.content_type if properties is not None else None,
+                                    headers=headers, delivery_mode=2, expiration=self.expiration)
+        self.acks.channel.basic_publish(exchange="", routing_key=self.retry_queue, body=body, properties=copy)
+        # The copy is queued, so the original is done
+        self.acks.ack(method.delivery_tag)
+        self.retried += 1
+        if registry.enabled:
+            registry.counter(self._retried_name).inc()
+        self._log(logging.WARNING, f"Retrying message on %s (attempt {attempts + 1} of {self.max_retries}): %s", error)
+
+    def skip(self, count: int):
+        """Record readings of a retried message that were skipped as not newer than the window."""
+        self.skipped += count
+        if registry.enabled:
+            registry.counter(self._skipped_name).inc(count)
+        self._log(logging.WARNING, f"Skipped {count} reading(s) of a retried message on %s: %s",
+                  "not newer than the window (applied before the failure, or overtaken by newer readings)")
+
+    def _log(self, level: int, message: str, error: Exception | str):
+        now = time.monotonic()
+        if now < self._next_log:
+            self._unlogged += 1
+            return
+        self._next_log = now + self.log_interval
+        if self._unlogged:
+            message += f" ({self._unlogged} more failures not logged)"
+            self._unlogged = 0
+        errors_log.log(level, message, self.queue, error, extra={"queue": self.queue, "error": str(error)})
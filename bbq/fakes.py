@@ -0,0 +1,159 @@
+"""
+BBQ Fakes
+
+File Description & Approach:
+An in-process stand-in for the parts of a pika channel the producer and consumers use. FakeBroker
+holds one deque of (body, properties, routing key) per queue; FakeChannel publishes into it and
+delivers to registered consumers when drain() is called, with per-channel delivery tags and ack
+tracking (including multiple=True), nack counting and consumer cancels. drain() honors
+basic_qos(prefetch_count): it stops delivering while that many messages are unacked, and an ack only
+frees its slots ack_delay seconds after basic_ack, like the round trip to a real broker. Topic
+exchanges and queue bindings are routed in process as well. It lets the benchmark drive the real publish and callback
+code paths without a RabbitMQ server.
+"""
+
+from collections import deque
+import re
+import time
+from types import SimpleNamespace
+
+
+class FakeBroker:
+    """Queues shared by every FakeChannel created from it."""
+
+    def __init__(self):
+        self.queues = {}
+        self.bindings = {}  # exchange -> list of (compiled pattern, queue)
+
+    def channel(self) -> "FakeChannel":
+        return FakeChannel(self)
+
+    def queue(self, name: str) -> deque:
+        return self.queues.setdefault(name, deque())
+
+    def bind(self, exchange: str, queue: str, pattern: str):
+        # Topic patterns: "*" matches one word, "#" any number of words
+        words = [r"[^.]+" if word == "*" else r".*" if word == "#" else re.escape(word)
+                 for word in pattern.split(".")]
+        binding = (re.compile(r"\.".join(words) + "$"), queue)
+        bindings = self.bindings.setdefault(exchange, [])
+        # Binding twice is a no-op, as on a broker
+        if binding not in bindings:
+            bindings.append(binding)
+
+    def route(self, exchange: str, routing_key: str) -> list:
+        """Return the queues a message published to exchange with routing_key goes to."""
+        if not exchange:
+            return [routing_key]
+        return [queue for pattern, queue in self.bindings.get(exchange, ()) if pattern.match(routing_key)]
+
+
+class FakeChannel:
+    """Just enough of pika's BlockingChannel for publishing and consuming."""
+
+    def __init__(self, broker: FakeBroker, ack_delay: float = 0.0):
+        self.broker = broker
+        self.ack_delay = ack_delay  # seconds before an ack reaches the broker
+        self.is_open = True
+        self.prefetch_count = 0
+        self.consumers = {}
+        self.unacked = set()
+        self.acked = 0
+        self.nacked = 0
+        self.published = 0
+        self._next_tag = 1
+        self._acks_in_flight = deque()  # (due, delivery_tag, multiple)
+
+    def queue_declare(self, queue: str, durable: bool = False, **kwargs):
+        queue_messages = self.broker.queue(queue)
+        return SimpleNamespace(method=SimpleNamespace(queue=queue, message_count=len(queue_messages)))
+
+    def exchange_declare(self, exchange: str, exchange_type: str = "direct", **kwargs):
+        self.broker.bindings.setdefault(exchange, [])
+
+    def queue_bind(self, queue: str, exchange: str, routing_key: str | None = None, **kwargs):
+        self.broker.bind(exchange, queue, routing_key or queue)
+
+    def queue_delete(self, queue: str, **kwargs):
+        self.broker.queues.pop(queue, None)
+
+    def basic_qos(self, prefetch_count: int = 0, **kwargs):
+        self.prefetch_count = prefetch_count
+
+    def basic_publish(self, exchange: str, routing_key: str, body: bytes, properties=None, mandatory: bool = False):
+        for queue in self.broker.route(exchange, routing_key):
+            self.broker.queue(queue).append((body, properties, routing_key))
+        self.published += 1
+
+    def basic_consume(self, queue: str, on_message_callback, auto_ack: bool = False, **kwargs):
+        self.consumers[queue] = on_message_callback
+        return f"ctag-{queue}"
+
+    @property
+    def consumer_tags(self) -> list:
+        return [f"ctag-{queue}" for queue in self.consumers]
+
+    def basic_cancel(self, consumer_tag: str):
+        self.consumers.pop(consumer_tag.removeprefix("ctag-"), None)
+        return []
+
+    def basic_ack(self, delivery_tag: int, multiple: bool = False):
+        if self.ack_delay > 0:
+            self._acks_in_flight.append((time.perf_counter() + self.ack_delay, delivery_tag, multiple))
+        else:
+            self._settle_ack(delivery_tag, multiple)
+
+    def _settle_ack(self, delivery_tag: int, multiple: bool):
+        if multiple:
+            settled = {tag for tag in self.unacked if tag <= delivery_tag}
+        else:
+            settled = {delivery_tag} & self.unacked
+        self.unacked -= settled
+        self.acked += len(settled)
+
+    def basic_nack(self, delivery_tag: int, multiple: bool = False, requeue: bool = True):
+        # Only settles and counts; dead-lettering is left to a real broker
+        settled = {tag for tag in self.unacked if tag <= delivery_tag} if multiple else {delivery_tag} & self.unacked
+        self.unacked -= settled
+        self.nacked += len(settled)
+
+    def settle_acks(self, wait: bool = False):
+        """Apply the acks that have reached the broker; with wait, every ack still in flight."""
+        if wait and self._acks_in_flight:
+            time.sleep(max(0.0, self._acks_in_flight[-1][0] - time.perf_counter()))
+        now = time.perf_counter()
+        while self._acks_in_flight and self._acks_in_flight[0][0] <= now:
+            _, delivery_tag, multiple = self._acks_in_flight.popleft()
+            self._settle_ack(delivery_tag, multiple)
+
+    def _window_full(self) -> bool:
+        return 0 < self.prefetch_count <= len(self.unacked)
+
+    def drain(self, queue: str, on_delivery=None) -> int:
+        """Deliver the messages waiting on queue to its consumer within the prefetch window.
+
+        When the window is full, waits for acks still in flight; returns how many were delivered
+        once the queue is empty or the window is full with no ack on its way (the consumer is
+        holding its acks, so the caller must flush them before draining again).
+        """
+        callback = self.consumers[queue]
+        messages = self.broker.queue(queue)
+        delivered = 0
+        while messages:
+            self.settle_acks()
+            if self._window_full():
+                if not self._acks_in_flight:
+                    break
+                time.sleep(max(0.0, self._acks_in_flight[0][0] - time.perf_counter()))
+                continue
+            body, properties, routing_key = messages.popleft()
+            tag = self._next_tag
+            self._next_tag += 1
+            self.unacked.add(tag)
+            method = SimpleNamespace(delivery_tag=tag, routing_key=routing_key, redelivered=False)
+            if on_delivery is not None:
+                on_delivery(callback, self, method, properties, body)
+            else:
+                callback(self, method, properties, body)
+            delivered += 1
+        return delivered
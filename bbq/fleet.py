@@ -0,0 +1,418 @@
+"""
+BBQ Fleet
+
+File Description & Approach:
+Fleet mode for many smokers at once. Every message carries the id of the device it came from in
+the DEVICE_HEADER header, and all of a device's channels are published to the FLEET_EXCHANGE topic
+exchange with routing key "<shard>.<device>", where the shard is a stable crc32 hash of the device
+id. Each shard has one durable queue bound with "<shard>.*", so a device always lands on the same
+queue and its readings stay in order. Workers split the shards between them (shard % workers ==
+worker), so detection scales across cores and hosts by starting more workers; other consumers
+(e.g. a dashboard) can bind their own queue with "#" to see every device.
+
+A FleetMonitor serves one shard queue. Readings are binary (the channel id says which probe they
+are from) and are dispatched to a ChannelMonitor per (device, channel), created on the device's
+first reading with the device id added to its names and alert text, so window state, alert rate
+limits and checkpoints are all per device. A failing message is dead-lettered or retried like on
+the three queues (see bbq/deadletter.py), so one bad device cannot stop the shard; readings of a
+retried message that newer ones have overtaken are counted as skipped rather than applied.
+Devices that send nothing for idle_timeout seconds have their monitors dropped, with their
+checkpoints unmapped and history series released, so a long-running worker only holds state for
+devices that are still reporting; a device that comes back restores its windows from its checkpoint.
+
+Device ids name checkpoint directories and history series, so both the producer (routing_key())
+and the consumers (message_device()) only accept ids of letters, digits, "-" and "_". A message
+with any other device id is dead-lettered without being processed.
+"""
+
+from dataclasses import replace
+from functools import lru_cache, partial
+import os
+import re
+import struct
+import time
+import zlib
+
+import pika
+
+from bbq.alerts import AlertDispatcher
+from bbq.checkpoint import RingCheckpoint
+from bbq.connection import CONNECTION_ERRORS, DEFAULT_HEARTBEAT, Backoff, connection_log, connection_parameters, reconnect
+from bbq.consumer import DEFAULT_CHANNELS, AckBatcher, CatchUp, ChannelMonitor, results_publisher
+from bbq.deadletter import QUEUE_ARGUMENTS, DeadLetters, declare_dead_letters, declare_retry, retry_count
+from bbq.forecast import RESULTS_QUEUE
+from bbq.messages import SCHEMA_HEADER, SCHEMA_VERSION, decode_messages
+from bbq.metrics import published_at, registry
+from bbq.tsdb import HistoryStore
+
+FLEET_EXCHANGE = "bbq.fleet"
+DEVICE_HEADER = "x-bbq-device"
+DEFAULT_SHARDS = 8
+# Device ids are used in routing keys, file paths and series names
+DEVICE_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+def shard_for(device: str, shards: int = DEFAULT_SHARDS) -> int:
+    """Return the shard a device belongs to (stable across processes and hosts)."""
+    return zlib.crc32(device.encode()) % shards
+
+
+def shard_queue(shard: int) -> str:
+    """Name of the durable queue for one shard."""
+    return f"{FLEET_EXCHANGE}.shard-{shard:02d}"
+
+
+def check_device(device: str) -> str:
+    """Return a device id, raising ValueError unless it is 1 to 64 letters, digits, '-' or '_'."""
+    if not isinstance(device, str) or DEVICE_PATTERN.fullmatch(device) is None:
+        raise ValueError(f"invalid device id {device!r} (must be 1 to 64 letters, digits, '-' or '_')")
+    return device
+
+
+def routing_key(device: str, shards: int = DEFAULT_SHARDS) -> str:
+    """Routing key for a device's messages on the fleet exchange."""
+    return f"{shard_for(check_device(device), shards)}.{device}"
+
+
+def owned_shards(worker: int, workers: int, shards: int = DEFAULT_SHARDS) -> list[int]:
+    """Shards served by one worker out of workers."""
+    if not 0 <= worker < workers:
+        raise ValueError(f"worker must be in 0..{workers - 1}, got {worker}")
+    return [shard for shard in range(shards) if shard % workers == worker]
+
+
+def declare_fleet(channel, shards: int = DEFAULT_SHARDS):
+    """Declare the fleet exchange and bind one durable queue per shard."""
+    declare_dead_letters(channel)
+    channel.exchange_declare(FLEET_EXCHANGE, exchange_type="topic", durable=True)
+    for shard in range(shards):
+        channel.queue_declare(shard_queue(shard), durable=True, arguments=QUEUE_ARGUMENTS)
+        channel.queue_bind(shard_queue(shard), FLEET_EXCHANGE, routing_key=f"{shard}.*")
+
+
+@lru_cache(maxsize=65536)
+def _device_properties(device: str, content_type: str | None):
+    return pika.BasicProperties(content_type=content_type,
+                                headers={SCHEMA_HEADER: SCHEMA_VERSION, DEVICE_HEADER: device})
+
+
+def device_properties(device: str, properties=None):
+    """Return properties for a device's message, keeping the content type of properties."""
+    return _device_properties(device, properties.content_type if properties is not None else None)
+
+
+def message_device(method, properties) -> str:
+    """Return the device id of a fleet message (header first, then the routing key).
+
+    Raises ValueError when the id is not one routing_key() accepts.
+    """
+    if properties is not None and properties.headers:
+        device = properties.headers.get(DEVICE_HEADER)
+        if device is not None:
+            if isinstance(device, bytes):
+                device = device.decode(errors="replace")
+            return check_device(device)
+    return check_device(method.routing_key.partition(".")[2])
+
+
+def device_spec(spec, device: str):
+    """Copy a ChannelSpec with the device id added to its queue label, names and alert text."""
+    return replace(spec, queue=f"{device}/{spec.queue}", name=f"{device} {spec.name}",
+                   alert_label=f"{spec.alert_label} [{device}]", subject=f"{spec.subject} [{device}]",
+                   content=f"[{device}] {spec.content}")
+
+
+class FleetMonitor:
+    """Per-device window state and message callback for one shard queue.
+
+    Parameters:
+        queue (str): the shard queue
+        specs (list[ChannelSpec]): channels every device reports, matched by channel id
+        alerts (AlertDispatcher): alert sender shared by every device
+        max_envelope (int | None): largest envelope (in readings) accepted from a producer
+        checkpoint_dir (str | None): directory for per-device window checkpoints; None disables
+        checkpoint_capacity (int): readings kept per device channel checkpoint
+        history (HistoryStore | None): store every device channel's readings are kept in
+        idle_timeout (float | None): seconds without a message before a device's monitors are dropped;
+            None keeps every device
+    """
+
+    def __init__(self, queue: str, specs, alerts: AlertDispatcher, max_envelope: int | None = None,
+                 checkpoint_dir: str | None = None, checkpoint_capacity: int = 1024,
+                 history: HistoryStore | None = None, idle_timeout: float | None = 3600.0):
+        self.queue = queue
+        self.specs = {spec.channel_id: spec for spec in specs}
+        self.alerts = alerts
+        self.max_envelope = max_envelope
+        self.checkpoint_dir = checkpoint_dir
+        self.checkpoint_capacity = checkpoint_capacity
+        self.history = history
+        self.devices = {}  # (device, channel id) -> ChannelMonitor
+        self.idle_timeout = idle_timeout
+        self._last_seen = {}  # device -> monotonic time of its last message
+        self._next_sweep = 0.0
+        self.evicted = 0
+        self.acks = None
+        self.dead_letters = None
+        # Set by the engine when forecasts are published: publish_forecast(spec, forecast, device)
+        self.publish_forecast = None
+        self.processed = 0
+        self.unknown = 0
+        self._latency_name = f"latency.{queue}"
+        self._callback_name = f"callback.{queue}"
+        self._messages_name = f"messages.{queue}"
+        self._readings_name = f"readings.{queue}"
+
+    def monitor(self, device: str, channel_id: int) -> ChannelMonitor | None:
+        """Return the monitor for one device channel, creating it on first use."""
+        key = (device, channel_id)
+        monitor = self.devices.get(key)
+        if monitor is None:
+            spec = self.specs.get(channel_id)
+            if spec is None:
+                return None
+            monitor = ChannelMonitor(device_spec(spec, device), self.alerts, self.max_envelope)
+            if self.checkpoint_dir is not None:
+                path = os.path.join(self.checkpoint_dir, device, f"{spec.queue}.ring")
+                monitor.attach_checkpoint(RingCheckpoint(path, self.checkpoint_capacity))
+            if self.history is not None:
+                # Series are named "<device>/<queue>"
+                monitor.history = self.history.series(monitor.spec.queue)
+            if monitor.forecaster is not None and self.publish_forecast is not None:
+                monitor.publish_forecast = partial(self.forward_forecast, device=device)
+            self.devices[key] = monitor
+        return monitor
+
+    def forward_forecast(self, spec, forecast, device: str):
+        # Looked up on every call, so device monitors use the publisher of the current connection
+        self.publish_forecast(spec, forecast, device)
+
+    def on_message(self, ch, method, properties, body):
+        """Dispatch every reading in a message to its device channel monitor."""
+        instrumented = registry.enabled
+        if instrumented:
+            started = time.perf_counter()
+            sent_at = published_at(properties)
+            if sent_at is not None:
+                registry.histogram(self._latency_name).observe(time.time() - sent_at)
+
+        try:
+            device = message_device(method, properties)
+            readings = decode_messages(body, properties, self.max_envelope)
+        except (ValueError, struct.error) as e:
+            if self.dead_letters is None:
+                raise
+            # An invalid device id or body fails the same way every time, so it is not retried
+            self.dead_letters.reject(method, e)
+            return
+        if self.idle_timeout is not None:
+            self._last_seen[device] = time.monotonic()
+        try:
+            retried = retry_count(properties)
+            skipped = 0
+            if retried:
+                for monitor in {self.monitor(device, channel_id) for _, _, channel_id in readings} - {None}:
+                    monitor.skip_processed()
+            for timestamp, temp, channel_id in readings:
+                monitor = self.monitor(device, channel_id)
+                if monitor is None:
+                    # Text readings have no channel id, and unknown probes have no rule
+                    self.unknown += 1
+                    continue
+                if monitor.process(timestamp, temp):
+                    self.processed += 1
+                else:
+                    skipped += 1
+            if retried and skipped and self.dead_letters is not None:
+                self.dead_letters.skip(skipped)
+        except Exception as e:
+            if self.dead_letters is None:
+                raise
+            self.dead_letters.retry(method, properties, body, e)
+            return
+
+        self.acks.ack(method.delivery_tag)
+
+        if instrumented:
+            registry.histogram(self._callback_name).observe(time.perf_counter() - started)
+            registry.counter(self._messages_name).inc()
+            registry.counter(self._readings_name).inc(len(readings))
+
+    def flush_checkpoints(self):
+        """msync the checkpoints whose flush interval has passed."""
+        for monitor in self.devices.values():
+            if monitor.checkpoint is not None:
+                monitor.checkpoint.flush_if_due()
+
+    def evict_idle(self):
+        """Drop the monitors of devices idle for longer than idle_timeout (swept every tenth of it)."""
+        if self.idle_timeout is None:
+            return
+        now = time.monotonic()
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.idle_timeout / 10
+        idle = {device for device, seen in self._last_seen.items() if now - seen > self.idle_timeout}
+        if not idle:
+            return
+        for key in [key for key in self.devices if key[0] in idle]:
+            monitor = self.devices.pop(key)
+            if monitor.checkpoint is not None:
+                monitor.checkpoint.close()
+                monitor.checkpoint = None
+            if self.history is not None:
+                self.history.release(monitor.spec.queue)
+        for device in idle:
+            del self._last_seen[device]
+        self.evicted += len(idle)
+
+    def skip_processed(self):
+        """Skip redelivered readings that already reached the device windows."""
+        for monitor in self.devices.values():
+            monitor.skip_processed()
+
+    def close_checkpoints(self):
+        for monitor in self.devices.values():
+            if monitor.checkpoint is not None:
+                monitor.checkpoint.close()
+                monitor.checkpoint = None
+
+
+class FleetEngine:
+    """Consume a set of fleet shards over one connection, one pika channel per shard queue.
+
+    Parameters:
+        host (str): the host name or IP address of the RabbitMQ server
+        shards (list[int]): shards this worker owns
+        total_shards (int): shards in the whole fleet topology
+        specs (list[ChannelSpec]): channels every device reports
+        alerts (AlertDispatcher | None): alert sender shared by every device
+        prefetch_count (int): unacknowledged messages the broker may send per shard
+        ack_batch (int): processed messages per cumulative ack
+        ack_interval (float): max seconds before pending acks are flushed
+        max_envelope (int | None): largest envelope (in readings) accepted from a producer
+        checkpoint_dir (str | None): directory for per-device window checkpoints; None disables
+        results_queue (str | None): queue the ETA forecasts are published on; None disables
+        history_dir (str | None): directory of the reading history store; None disables
+        max_retries (int): retries of a message whose processing fails before it is dead-lettered
+        retry_delay (float): seconds before a failed message is retried
+        heartbeat (int): AMQP heartbeat interval in seconds
+        catchup_threshold (int | None): queued messages that start catch-up mode; None disables
+        catchup_prefetch (int): unacknowledged messages per shard while catching up
+        catchup_ack_batch (int): messages per cumulative ack while catching up
+        device_idle_timeout (float | None): seconds without a message before a device's state is
+            dropped (restored from its checkpoint if it returns); None keeps every device
+    """
+
+    def __init__(self, host: str, shards, total_shards: int = DEFAULT_SHARDS, specs=DEFAULT_CHANNELS,
+                 alerts: AlertDispatcher | None = None, prefetch_count: int = 100, ack_batch: int = 50,
+                 ack_interval: float = 0.5, max_envelope: int | None = None,
+                 checkpoint_dir: str | None = None, results_queue: str | None = RESULTS_QUEUE,
+                 history_dir: str | None = None, max_retries: int = 3, retry_delay: float = 5.0,
+                 heartbeat: int = DEFAULT_HEARTBEAT, catchup_threshold: int | None = 10000,
+                 catchup_prefetch: int = 1000, catchup_ack_batch: int = 500,
+                 device_idle_timeout: float | None = 3600.0):
+        if ack_batch > prefetch_count:
+            # The broker would stop delivering before a batch could fill up
+            raise ValueError(f"ack_batch ({ack_batch}) must not exceed prefetch_count ({prefetch_count})")
+        self.host = host
+        self.total_shards = total_shards
+        self.specs = specs
+        self.results_queue = results_queue
+        self.prefetch_count = prefetch_count
+        self.ack_batch = ack_batch
+        self.ack_interval = ack_interval
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.alerts = alerts or AlertDispatcher()
+        self.history = HistoryStore(history_dir) if history_dir is not None else None
+        self.monitors = [FleetMonitor(shard_queue(shard), specs, self.alerts, max_envelope, checkpoint_dir,
+                                      history=self.history, idle_timeout=device_idle_timeout)
+                         for shard in shards]
+        self.heartbeat = heartbeat
+        self.backoff = Backoff()
+        self.catch_up = (CatchUp(self.alerts, catchup_threshold, catchup_prefetch, catchup_ack_batch)
+                         if catchup_threshold is not None else None)
+        self.connection = None
+
+    def start(self):
+        """Connect, declare the fleet topology and register a consumer per owned shard (again after a reconnect)."""
+        self.connection = pika.BlockingConnection(connection_parameters(self.host, self.heartbeat))
+        declare_fleet(self.connection.channel(), self.total_shards)
+        if self.results_queue is not None and any(spec.target is not None for spec in self.specs):
+            publish = results_publisher(self.connection.channel(), self.results_queue)
+            for monitor in self.monitors:
+                monitor.publish_forecast = publish
+        for monitor in self.monitors:
+            channel = self.connection.channel()
+            channel.basic_qos(prefetch_count=self.prefetch_count)
+            monitor.acks = AckBatcher(channel, self.ack_batch, self.ack_interval)
+            declare_retry(channel, monitor.queue)
+            monitor.dead_letters = DeadLetters(monitor.acks, monitor.queue, self.max_retries, self.retry_delay)
+            # One consumer per shard queue keeps each device's readings in order
+            channel.basic_consume(monitor.queue, auto_ack=False, on_message_callback=monitor.on_message)
+        if self.catch_up is not None and self.monitors:
+            self.catch_up.check(self.lanes(), self.prefetch_count, self.ack_batch, force=True)
+
+    def lanes(self) -> list:
+        """(queue, AckBatcher, callback) of every owned shard."""
+        return [(monitor.queue, monitor.acks, monitor.on_message) for monitor in self.monitors]
+
+    def poll(self):
+        """Dispatch messages for up to ack_interval seconds, reconnecting with backoff after a lost connection."""
+        try:
+            self._dispatch()
+        except CONNECTION_ERRORS as e:
+            connection_log.warning("Fleet connection lost: %s", e or type(e).__name__)
+            self.disconnected()
+            reconnect(self.start, self.backoff, "fleet worker")
+
+    def _dispatch(self):
+        """Process deliveries, then flush due acks, checkpoints and history and check the backlog."""
+        self.connection.process_data_events(time_limit=self.ack_interval)
+        for monitor in self.monitors:
+            monitor.acks.flush_if_due()
+            monitor.flush_checkpoints()
+            monitor.evict_idle()
+        if self.history is not None:
+            self.history.flush_if_due()
+        if self.catch_up is not None and self.monitors:
+            self.catch_up.check(self.lanes(), self.prefetch_count, self.ack_batch)
+
+    def run_forever(self):
+        """Dispatch messages until interrupted."""
+        while True:
+            self.poll()
+
+    def disconnected(self):
+        """Drop the lost connection; unacknowledged messages will be redelivered."""
+        try:
+            self.connection.close()
+        except CONNECTION_ERRORS:
+            pass
+        for monitor in self.monitors:
+            monitor.skip_processed()
+        if self.catch_up is not None:
+            self.catch_up.reset()
+
+    def close(self):
+        """Flush pending acks, close the connection and finish sending queued alerts."""
+        if self.connection is not None and self.connection.is_open:
+            for monitor in self.monitors:
+                if monitor.acks is not None and monitor.acks.channel.is_open:
+                    monitor.acks.flush()
+            self.connection.close()
+        for monitor in self.monitors:
+            monitor.close_checkpoints()
+        if self.history is not None:
+            self.history.close()
+        self.alerts.close()
+
+    def stats(self) -> dict:
+        """Devices, readings and failed messages per shard queue."""
+        return {monitor.queue: {"devices": len({device for device, _ in monitor.devices}),
+                                "readings": monitor.processed, "unknown": monitor.unknown,
+                                "dead_lettered": monitor.dead_letters.dead_lettered if monitor.dead_letters else 0,
+                                "retried": monitor.dead_letters.retried if monitor.dead_letters else 0,
+                                "skipped": monitor.dead_letters.skipped if monitor.dead_letters else 0}
+                for monitor in self.monitors}
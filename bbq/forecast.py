@@ -0,0 +1,113 @@
+"""
+BBQ Cook-Completion Forecast
+
+File Description & Approach:
+Rolling estimate of when a food reaches its target temperature. EtaForecaster fits a line to the
+time-stamped readings by exponentially weighted least squares: older readings fade with a
+half-life, so the fit follows the current phase of the cook (a stall flattens it, the climb after
+it steepens it again). The fit is kept as five running weighted sums (weight, t, temp, t*t,
+t*temp) with the time origin at the newest reading; each reading decays and shifts the sums and
+adds itself, so an update is O(1) with no refit over the history. The ETA is the time for the
+fitted temperature to reach the target at the fitted slope (None while the food is not warming).
+
+Forecasts are emitted every publish_every seconds of reading time and published as JSON on the
+RESULTS_QUEUE queue, so a scheduler or dashboard can subscribe instead of polling consumers.
+The queue is capped with RESULTS_ARGUMENTS: forecasts expire after an hour, and beyond
+RESULTS_MAX_LENGTH messages the oldest are dropped, so nobody subscribing never fills the broker.
+"""
+
+from collections import namedtuple
+import json
+import math
+
+import pika
+
+RESULTS_QUEUE = "04-eta"
+RESULTS_MAX_LENGTH = 10000  # forecasts kept for subscribers; the oldest are dropped beyond this
+RESULTS_TTL = 3600  # seconds a forecast is kept
+# Arguments the results queue is declared with
+RESULTS_ARGUMENTS = {"x-max-length": RESULTS_MAX_LENGTH, "x-overflow": "drop-head",
+                     "x-message-ttl": RESULTS_TTL * 1000}
+FORECAST_CONTENT_TYPE = "application/json"
+FORECAST_PROPERTIES = pika.BasicProperties(content_type=FORECAST_CONTENT_TYPE, delivery_mode=2)
+
+# level is the fitted temp at timestamp, rate is degrees per minute, eta is seconds (0 once done)
+Forecast = namedtuple("Forecast", ["timestamp", "temp", "level", "rate", "eta", "done_at"])
+
+
+class EtaForecaster:
+    """Exponentially weighted linear fit of temp over time with an ETA to a target.
+
+    Parameters:
+        target (float): target temperature
+        half_life (float): seconds after which a reading counts half as much
+        min_span (float): seconds of readings needed before the first forecast
+        publish_every (float): seconds of reading time between forecasts
+    """
+
+    def __init__(self, target: float, half_life: float = 600.0, min_span: float = 300.0,
+                 publish_every: float = 60.0):
+        self.target = target
+        self.min_span = min_span
+        self.publish_every = publish_every
+        self._decay = math.log(2) / half_life
+        # Weighted sums with the time origin at the newest reading
+        self._s0 = self._st = self._sy = self._stt = self._sty = 0.0
+        self._first = None
+        self._last = None
+        self._next_forecast = 0.0
+
+    def update(self, timestamp: float, temp: float) -> Forecast | None:
+        """Add a reading and return a forecast when one is due."""
+        last = self._last
+        if last is None:
+            self._first = timestamp
+            self._next_forecast = timestamp + self.min_span
+        elif timestamp < last:
+            # Out of order readings would corrupt the sums
+            return None
+        elif timestamp > last:
+            dt = timestamp - last
+            weight = math.exp(-self._decay * dt)
+            s0, st = self._s0, self._st
+            # Move the origin to the new reading, then fade every older reading
+            self._stt = weight * (self._stt - 2 * dt * st + dt * dt * s0)
+            self._sty = weight * (self._sty - dt * self._sy)
+            self._st = weight * (st - dt * s0)
+            self._sy *= weight
+            self._s0 = weight * s0
+        self._last = timestamp
+        # The new reading sits at t = 0, so only the weight and temp sums change
+        self._s0 += 1.0
+        self._sy += temp
+
+        if timestamp < self._next_forecast:
+            return None
+        self._next_forecast = timestamp + self.publish_every
+        return self.forecast(temp)
+
+    def forecast(self, temp: float) -> Forecast | None:
+        """Return the forecast at the newest reading."""
+        if self._last is None or self._last - self._first < self.min_span:
+            return None
+        s0, st, sy = self._s0, self._st, self._sy
+        spread = s0 * self._stt - st * st
+        slope = (s0 * self._sty - st * sy) / spread if spread > 0 else 0.0  # degrees per second
+        level = (sy - slope * st) / s0
+        if max(level, temp) >= self.target:
+            eta = 0.0
+        elif slope > 0:
+            eta = (self.target - level) / slope
+        else:
+            eta = None
+        return Forecast(self._last, round(temp, 1), round(level, 1), round(slope * 60, 3),
+                        None if eta is None else round(eta), None if eta is None else round(self._last + eta))
+
+
+def forecast_message(spec, forecast: Forecast, device: str | None = None) -> bytes:
+    """Encode a channel's forecast as a JSON results message."""
+    message = {"queue": spec.queue, "name": spec.name, "target": spec.target}
+    if device is not None:
+        message["device"] = device
+    message.update(forecast._asdict())
+    return json.dumps(message).encode()
@@ -0,0 +1,110 @@
+"""
+BBQ Logging
+
+File Description & Approach:
+Structured, buffered logging for the producer and consumers in place of print() on the hot path.
+Log calls only put the record on an in-memory queue (QueueHandler); formatting and writing to
+stdout happen on a QueueListener thread, so a slow terminal never stalls a callback. Records are
+not formatted before they are queued, so a dropped or sampled line costs almost nothing.
+
+Per-message lines go to the "bbq.readings" logger, which can be sampled to one line in every N.
+Alerts go to "bbq.alerts" at WARNING or above; the sampler always passes WARNING and above, and
+the queue is unbounded and drained on exit, so alert events are always emitted. Dead-lettered and
+retried messages are logged to "bbq.errors" (see bbq/deadletter.py), and readings the history
+store cannot take to "bbq.history" (see bbq/tsdb.py).
+Lines are plain text by default or key=value pairs with structured=True, including any fields
+passed with extra=.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+
+readings_log = logging.getLogger("bbq.readings")
+alerts_log = logging.getLogger("bbq.alerts")
+
+# Fields of a LogRecord that are not user extras
+_STANDARD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+_listener = None
+_handler = None
+_sampler = None
+
+
+class SampleFilter(logging.Filter):
+    """Pass one record in every `every`, and always pass WARNING and above."""
+
+    def __init__(self, every: int = 1):
+        super().__init__()
+        self.every = max(1, every)
+        self._seen = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.every == 1:
+            return True
+        self._seen += 1
+        return self._seen % self.every == 1
+
+
+class KeyValueFormatter(logging.Formatter):
+    """Format records as ts=... level=... logger=... msg="..." plus extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        fields.update((key, value) for key, value in vars(record).items() if key not in _STANDARD_FIELDS)
+        return " ".join(f"{key}={value!r}" if isinstance(value, str) and " " in value else f"{key}={value}"
+                        for key, value in fields.items())
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging(level: str = "INFO", sample_every: int = 1, structured: bool = False, stream=None):
+    """Route the "bbq" loggers through a queue to stdout (only the first call takes effect).
+
+    Parameters:
+        level (str): minimum level, e.g. "DEBUG", "INFO" or "WARNING"
+        sample_every (int): log one per-message line in every sample_every
+        structured (bool): key=value lines instead of plain messages
+        stream: where lines are written (default sys.stdout)
+    """
+    global _listener, _handler, _sampler
+    if _listener is not None:
+        return
+    root = logging.getLogger("bbq")
+    root.setLevel(level)
+    root.propagate = False
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(KeyValueFormatter() if structured else logging.Formatter("%(message)s"))
+    records = queue.SimpleQueue()
+    _handler = _DeferredQueueHandler(records)
+    root.addHandler(_handler)
+    _sampler = SampleFilter(sample_every)
+    readings_log.addFilter(_sampler)
+
+    _listener = logging.handlers.QueueListener(records, output)
+    _listener.start()
+    # Drain the queue on exit so no alert line is lost
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Write out everything still queued and stop the listener thread."""
+    global _listener, _handler, _sampler
+    if _listener is not None:
+        _listener.stop()
+        logging.getLogger("bbq").removeHandler(_handler)
+        readings_log.removeFilter(_sampler)
+        _listener = _handler = _sampler = None
@@ -0,0 +1,186 @@
+"""
+BBQ Messages
+
+File Description & Approach:
+Encoding and decoding of temperature reading messages. Two formats are supported:
+
+- text (legacy): "<Time (UTC)>, <temp>", e.g. b"05/22/21 12:20:15, 84.2"
+- binary: 13 bytes packed little-endian as epoch milliseconds (int64), temperature (float32)
+  and channel id (uint8), sent with content type BINARY_CONTENT_TYPE and the schema version in
+  the SCHEMA_HEADER message header
+- envelope: any number of binary readings back to back in one message, sent with content type
+  ENVELOPE_CONTENT_TYPE, so the broker overhead is paid once per envelope instead of per reading
+
+decode_messages() looks at the message properties to pick the format, so consumers keep accepting
+legacy text bodies from older producers. Every format gives the consumer the reading's timestamp.
+Binary temperatures are rounded to the 7 significant digits a float32 holds when decoded, so
+215.6 comes back as 215.6 rather than 215.60000610351562 in log lines and alert emails.
+EnvelopePacker collects readings per queue and publishes an envelope when it reaches its size or
+its oldest reading has waited for the max linger time.
+
+The producer publishes readings to the READINGS_EXCHANGE topic exchange with the queue name as the
+routing key, and declare_readings() binds each temperature queue to its own name. Other consumers,
+such as the dashboard, can bind their own queue with "#" and get a copy of every reading without
+taking messages from the alerting consumers.
+"""
+
+from collections import namedtuple
+import struct
+import time
+
+import pika
+
+from bbq.deadletter import QUEUE_ARGUMENTS, declare_dead_letters
+from bbq.replay import parse_csv_time
+
+TEXT = "text"
+BINARY = "binary"
+BINARY_CONTENT_TYPE = "application/vnd.bbq.reading"
+ENVELOPE_CONTENT_TYPE = "application/vnd.bbq.envelope"
+SCHEMA_HEADER = "x-bbq-schema"
+SCHEMA_VERSION = 1
+READINGS_EXCHANGE = "bbq.readings"
+
+# Channel ids carried in binary messages
+SMOKER_ID = 1
+FOOD_A_ID = 2
+FOOD_B_ID = 3
+
+_READING = struct.Struct("<qfB")  # epoch ms, temp, channel id
+BINARY_PROPERTIES = pika.BasicProperties(content_type=BINARY_CONTENT_TYPE,
+                                         headers={SCHEMA_HEADER: SCHEMA_VERSION})
+ENVELOPE_PROPERTIES = pika.BasicProperties(content_type=ENVELOPE_CONTENT_TYPE,
+                                           headers={SCHEMA_HEADER: SCHEMA_VERSION})
+
+# timestamp is epoch seconds; channel_id is None for legacy text messages
+Reading = namedtuple("Reading", ["timestamp", "temp", "channel_id"])
+
+
+def encode_text(time_text: str, temp: float) -> bytes:
+    """Build a text body, e.g. b"05/22/21 12:20:15, 84.2"."""
+    return f"{time_text}, {temp}".encode()
+
+
+def encode_binary(timestamp: float, temp: float, channel_id: int) -> bytes:
+    """Pack a reading into the 13-byte binary format."""
+    return _READING.pack(round(timestamp * 1000), temp, channel_id)
+
+
+def encode_envelope(readings) -> bytes:
+    """Pack (timestamp, temp, channel_id) readings into one envelope body."""
+    return b"".join(encode_binary(timestamp, temp, channel_id) for timestamp, temp, channel_id in readings)
+
+
+def message_properties(message_format: str = TEXT):
+    """Return the BasicProperties to publish a format with (None for legacy text)."""
+    return BINARY_PROPERTIES if message_format == BINARY else None
+
+
+def declare_readings(channel, queues):
+    """Declare the readings exchange and a durable queue bound to it for each queue name."""
+    declare_dead_letters(channel)
+    channel.exchange_declare(READINGS_EXCHANGE, exchange_type="topic", durable=True)
+    for queue in queues:
+        # Rejected messages go to the dead-letter exchange (see bbq/deadletter.py)
+        channel.queue_declare(queue, durable=True, arguments=QUEUE_ARGUMENTS)
+        channel.queue_bind(queue, READINGS_EXCHANGE, routing_key=queue)
+
+
+def decode_reading(body: bytes) -> tuple[float, float]:
+    """Return (timestamp, temp) from a text body."""
+    # Split timestamp and temp
+    time_text, _, temp_text = body.decode().rpartition(",")
+    return parse_csv_time(time_text), float(temp_text)
+
+
+def binary_temp(temp: float) -> float:
+    """Return a temperature as decoded from a binary message (float32, to 7 significant digits)."""
+    return float(f"{temp:.7g}")
+
+
+def _check_version(properties):
+    version = (properties.headers or {}).get(SCHEMA_HEADER, SCHEMA_VERSION)
+    if version != SCHEMA_VERSION:
+        raise ValueError(f"unsupported binary schema version {version}")
+
+
+def decode_message(body: bytes, properties=None) -> Reading:
+    """Decode a single-reading message in either format using its content type."""
+    if properties is not None and properties.content_type == BINARY_CONTENT_TYPE:
+        _check_version(properties)
+        millis, temp, channel_id = _READING.unpack(body)
+        return Reading(millis / 1000, binary_temp(temp), channel_id)
+    timestamp, temp = decode_reading(body)
+    return Reading(timestamp, temp, None)
+
+
+def decode_messages(body: bytes, properties=None, max_readings: int | None = None) -> list[Reading]:
+    """Decode any message format into its list of readings, oldest first."""
+    if properties is not None and properties.content_type == ENVELOPE_CONTENT_TYPE:
+        _check_version(properties)
+        if len(body) % _READING.size:
+            raise ValueError(f"envelope length {len(body)} is not a multiple of {_READING.size}")
+        count = len(body) // _READING.size
+        if max_readings is not None and count > max_readings:
+            raise ValueError(f"envelope holds {count} readings (limit {max_readings})")
+        return [Reading(millis / 1000, binary_temp(temp), channel_id)
+                for millis, temp, channel_id in _READING.iter_unpack(body)]
+    return [decode_message(body, properties)]
+
+
+class EnvelopePacker:
+    """Collect readings per queue and publish them as envelopes.
+
+    Parameters:
+        publish (callable): publish(queue, body, properties) sends one envelope
+        size (int): readings per envelope
+        linger (float): max seconds the oldest reading in an envelope may wait
+        sleep (callable): sleeps between flushes (e.g. one that keeps a connection's heartbeats going)
+    """
+
+    def __init__(self, publish, size: int = 100, linger: float = 1.0, sleep=time.sleep):
+        self.publish = publish
+        self.size = size
+        self.linger = linger
+        self._sleep = sleep
+        self._pending = {}  # queue -> list of (timestamp, temp, channel_id)
+        self._oldest = {}   # queue -> monotonic time of the oldest pending reading
+
+    def add(self, queue: str, timestamp: float, temp: float, channel_id: int):
+        """Add a reading, publishing the queue's envelope once it is full."""
+        readings = self._pending.setdefault(queue, [])
+        if not readings:
+            self._oldest[queue] = time.monotonic()
+        readings.append((timestamp, temp, channel_id))
+        if len(readings) >= self.size:
+            self.flush(queue)
+
+    def flush(self, queue: str):
+        """Publish the pending envelope for one queue."""
+        readings = self._pending.get(queue)
+        if readings:
+            self.publish(queue, encode_envelope(readings), ENVELOPE_PROPERTIES)
+            self._pending[queue] = []
+
+    def flush_due(self):
+        """Publish every envelope whose oldest reading has waited for the linger time."""
+        now = time.monotonic()
+        for queue, readings in self._pending.items():
+            if readings and now - self._oldest[queue] >= self.linger:
+                self.flush(queue)
+
+    def flush_all(self):
+        """Publish every pending envelope."""
+        for queue in list(self._pending):
+            self.flush(queue)
+
+    def sleep(self, seconds: float):
+        """Sleep, waking up to publish envelopes whose linger time runs out meanwhile."""
+        deadline = time.monotonic() + seconds
+        while True:
+            self.flush_due()
+            now = time.monotonic()
+            if now >= deadline:
+                return
+            waits = [self._oldest[queue] + self.linger - now for queue, readings in self._pending.items() if readings]
+            self._sleep(max(0.0, min([deadline - now] + waits)))
@@ -0,0 +1,193 @@
+"""
+BBQ Metrics
+
+File Description & Approach:
+Lightweight latency and throughput instrumentation for the producer and consumers. The producer
+stamps each message with its publish time in the PUBLISHED_HEADER header; consumers record the
+end-to-end latency per queue, the callback processing time and message counters, and the alert
+dispatcher records SMTP send time separately (it runs on its own thread, so it never counts toward
+callback time).
+
+Histograms use fixed log-spaced buckets, so observe() is a bisect and an increment. Everything
+goes through the module-level registry, which is disabled by default: hot paths check
+registry.enabled first, so instrumentation costs one attribute lookup when it is off.
+The registry can be served over HTTP (serve()) or printed periodically (start_dump()).
+"""
+
+import bisect
+import json
+import threading
+import time
+
+import pika
+
+PUBLISHED_HEADER = "x-published-at"
+
+# Bucket upper bounds in seconds: 1 us to ~100 s, four per decade
+BUCKETS = [10 ** (exponent / 4) for exponent in range(-24, 9)]
+
+
+class Histogram:
+    """Fixed-bucket histogram of durations in seconds."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile (0-100)."""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return BUCKETS[index] if index < len(BUCKETS) else self.max
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+
+class Counter:
+    """Monotonic counter with a rate since the registry was enabled."""
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: int = 1):
+        self.value += amount
+
+
+class Registry:
+    """Named histograms and counters, all no-ops unless enabled."""
+
+    def __init__(self):
+        self.enabled = False
+        self.histograms = {}
+        self.counters = {}
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+        self._started = time.monotonic()
+
+    def histogram(self, name: str) -> Histogram:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, Histogram())
+        return histogram
+
+    def counter(self, name: str) -> Counter:
+        counter = self.counters.get(name)
+        if counter is None:
+            with self._lock:
+                counter = self.counters.setdefault(name, Counter())
+        return counter
+
+    def snapshot(self) -> dict:
+        """Return every metric as plain data, with counters as totals and per-second rates."""
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        return {
+            "elapsed": elapsed,
+            "counters": {name: {"total": c.value, "per_sec": c.value / elapsed}
+                         for name, c in sorted(self.counters.items())},
+            "histograms": {name: h.summary() for name, h in sorted(self.histograms.items())},
+        }
+
+    def render_text(self) -> str:
+        """Format the snapshot for the console."""
+        snap = self.snapshot()
+        lines = [f"metrics after {snap['elapsed']:.1f} s"]
+        for name, c in snap["counters"].items():
+            lines.append(f"  {name}: {c['total']} ({c['per_sec']:.1f}/sec)")
+        for name, h in snap["histograms"].items():
+            lines.append(f"  {name}: n={h['count']} mean={h['mean'] * 1000:.3f} ms "
+                         f"p50<={h['p50'] * 1000:.3f} ms p99<={h['p99'] * 1000:.3f} ms "
+                         f"max={h['max'] * 1000:.3f} ms")
+        return "\n".join(lines)
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> "http.server.ThreadingHTTPServer":
+        """Serve the snapshot as JSON on http://host:port/metrics from a daemon thread."""
+        # Only runs that serve metrics pay for importing the HTTP server
+        import http.server
+
+        registry = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = json.dumps(registry.snapshot(), indent=2).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+    def start_dump(self, interval: float):
+        """Print the metrics every interval seconds from a daemon thread."""
+        def dump():
+            while True:
+                time.sleep(interval)
+                print(self.render_text())
+
+        threading.Thread(target=dump, name="metrics-dump", daemon=True).start()
+
+
+# Shared registry; call registry.enable() to turn instrumentation on
+registry = Registry()
+
+
+def configure(port: int | None = None, interval: float | None = None):
+    """Enable the registry and expose it on an HTTP port and/or a periodic dump."""
+    if port is None and interval is None:
+        return
+    registry.enable()
+    if port is not None:
+        registry.serve(port)
+        print(f" [*] Metrics at http://127.0.0.1:{port}/metrics")
+    if interval is not None:
+        registry.start_dump(interval)
+
+
+def stamp(properties=None):
+    """Return properties carrying the current time in the PUBLISHED_HEADER header."""
+    if properties is None:
+        return pika.BasicProperties(headers={PUBLISHED_HEADER: time.time()})
+    headers = dict(properties.headers or {})
+    headers[PUBLISHED_HEADER] = time.time()
+    return pika.BasicProperties(content_type=properties.content_type, headers=headers)
+
+
+def published_at(properties) -> float | None:
+    """Return the publish time stamped on a message, if any."""
+    if properties is None or not properties.headers:
+        return None
+    return properties.headers.get(PUBLISHED_HEADER)
@@ -0,0 +1,398 @@
+"""
+BBQ Publishers
+
+File Description & Approach:
+ConfirmPublisher publishes messages to RabbitMQ with publisher confirms turned on. Messages are
+collected into batches that are flushed when they reach a configured size or when the oldest
+message has waited longer than the configured linger time. The broker's acks and nacks are handled
+asynchronously on a pika SelectConnection I/O loop running in a background thread, so the caller
+never waits for a round trip per message. Nacked messages are published again until their retry
+budget is used up.
+
+Both publishers keep the producer running while the broker is down. ConfirmPublisher reconnects
+with exponential backoff (see bbq/connection.py) and publishes every unconfirmed message again;
+while it is disconnected its buffer is a bounded spill buffer that drops the oldest message when
+full. BlockingPublisher, used for one message per round trip, spills messages it cannot publish
+into a bounded deque and publishes them in order once a reconnect succeeds.
+"""
+
+from collections import deque
+import logging
+import threading
+import time
+
+import pika
+
+from bbq.connection import CONNECTION_ERRORS, DEFAULT_HEARTBEAT, Backoff, connection_parameters
+
+log = logging.getLogger("bbq.publisher")
+
+
+class ConfirmPublisher:
+    """Batched publisher that tracks broker confirms asynchronously.
+
+    Parameters:
+        host (str): the host name or IP address of the RabbitMQ server
+        batch_size (int): number of buffered messages that triggers a flush
+        linger (float): max seconds a message waits in a partial batch
+        max_retries (int): times a nacked message is published again before it is dropped
+        max_outstanding (int): buffered plus unconfirmed messages allowed before publish() blocks
+            (while disconnected, the oldest buffered message is dropped instead)
+        heartbeat (int): AMQP heartbeat interval in seconds
+    """
+
+    def __init__(self, host: str, batch_size: int = 100, linger: float = 0.05,
+                 max_retries: int = 5, max_outstanding: int = 10000, heartbeat: int = DEFAULT_HEARTBEAT):
+        self.host = host
+        self.heartbeat = heartbeat
+        self.backoff = Backoff()
+        self.batch_size = batch_size
+        self.linger = linger
+        self.max_retries = max_retries
+        self.max_outstanding = max_outstanding
+
+        # Messages waiting to be published: (exchange, routing_key, body, properties, attempts)
+        self._buffer = deque()
+        # Published messages waiting for a confirm, keyed by delivery tag (in publish order)
+        self._unconfirmed = {}
+        self._next_tag = 1
+        self._flush_scheduled = False
+        self._lock = threading.Condition()
+
+        self._connection = None
+        self._channel = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._error = None
+        self._closing = False
+        self._stop = threading.Event()
+
+        # Counters reported by stats()
+        self.published = 0
+        self.confirmed = 0
+        self.nacked = 0
+        self.retried = 0
+        self.failed = 0
+        self.dropped = 0
+        self.reconnects = 0
+        self._started_at = None
+        self._finished_at = None
+
+    def start(self, timeout: float = 10.0):
+        """Open the connection and channel and wait until confirms are enabled."""
+        # Run the I/O loop in a background thread so publish() can be called from the main thread
+        self._thread = threading.Thread(target=self._run, name="confirm-publisher", daemon=True)
+        self._thread.start()
+
+        if not self._ready.wait(timeout):
+            raise pika.exceptions.AMQPConnectionError("timed out waiting for the confirm channel")
+        if self._error is not None:
+            raise pika.exceptions.AMQPConnectionError(self._error)
+        self._started_at = time.perf_counter()
+
+    def publish(self, routing_key: str, body: bytes, exchange: str = "", properties=None):
+        """Add a message to the current batch, blocking while too many are in flight."""
+        with self._lock:
+            while (len(self._buffer) + len(self._unconfirmed) >= self.max_outstanding
+                   and self._error is None):
+                if self._channel is None and self._buffer:
+                    # The broker is down: make room by dropping the oldest spilled message
+                    self._buffer.popleft()
+                    self.dropped += 1
+                    break
+                self._lock.wait()
+            if self._error is not None:
+                raise pika.exceptions.AMQPConnectionError(self._error)
+            self._buffer.append((exchange, routing_key, body, properties, 0))
+            if len(self._buffer) >= self.batch_size:
+                self._schedule_flush()
+
+    def close(self, timeout: float = 30.0):
+        """Flush the last batch, wait for every confirm and close the connection."""
+        with self._lock:
+            self._schedule_flush()
+            deadline = time.monotonic() + timeout
+            while (self._buffer or self._unconfirmed) and self._error is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._lock.wait(remaining)
+            self._finished_at = time.perf_counter()
+            self._closing = True
+            if self._buffer or self._unconfirmed:
+                log.error("Closing with %d messages not confirmed", len(self._buffer) + len(self._unconfirmed))
+        self._stop.set()
+        self._connection.ioloop.add_callback_threadsafe(self._shutdown)
+        self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        """Return publish counters and the sustained confirmed messages per second."""
+        end = self._finished_at or time.perf_counter()
+        elapsed = end - self._started_at if self._started_at else 0.0
+        return {
+            "published": self.published,
+            "confirmed": self.confirmed,
+            "nacked": self.nacked,
+            "retried": self.retried,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "reconnects": self.reconnects,
+            "elapsed": elapsed,
+            "rate": self.confirmed / elapsed if elapsed > 0 else 0.0,
+        }
+
+    # ----- I/O loop side (everything below runs on the background thread) -----
+
+    def _run(self):
+        """Run the connection's I/O loop, reconnecting with backoff until closed."""
+        while True:
+            self._connection = pika.SelectConnection(
+                connection_parameters(self.host, self.heartbeat),
+                on_open_callback=self._on_connection_open,
+                on_open_error_callback=self._on_connection_error,
+                on_close_callback=self._on_connection_closed,
+            )
+            self._connection.ioloop.start()
+            if self._closing or self._error is not None:
+                return
+            delay = self.backoff.next_delay()
+            log.warning("Reconnecting publisher in %.1f seconds", delay)
+            if self._stop.wait(delay):
+                return
+
+    def _shutdown(self):
+        if self._connection.is_open:
+            # The close callback stops the loop
+            self._connection.close()
+        elif not self._connection.is_closing:
+            self._connection.ioloop.stop()
+
+    def _schedule_flush(self):
+        """Ask the I/O loop to publish the buffer (caller holds the lock)."""
+        if not self._flush_scheduled and self._channel is not None:
+            self._flush_scheduled = True
+            self._connection.ioloop.add_callback_threadsafe(self._flush)
+
+    def _flush(self):
+        """Publish everything in the buffer on the confirm channel."""
+        with self._lock:
+            self._flush_scheduled = False
+            if self._channel is None:
+                return
+            batch, self._buffer = self._buffer, deque()
+            for exchange, routing_key, body, properties, attempts in batch:
+                self._channel.basic_publish(exchange=exchange, routing_key=routing_key,
+                                            body=body, properties=properties)
+                self._unconfirmed[self._next_tag] = (exchange, routing_key, body, properties, attempts)
+                self._next_tag += 1
+                self.published += 1
+
+    def _on_linger(self):
+        """Flush a partial batch once it has waited for the linger time."""
+        if self._closing:
+            return
+        with self._lock:
+            if self._buffer:
+                self._schedule_flush()
+        self._connection.ioloop.call_later(self.linger, self._on_linger)
+
+    def _on_confirm(self, frame):
+        """Settle the delivery tags covered by a Basic.Ack or Basic.Nack."""
+        method = frame.method
+        acked = isinstance(method, pika.spec.Basic.Ack)
+        with self._lock:
+            if method.multiple:
+                # The dict is in tag order, so the scan stops at the first tag this confirm does not cover
+                tags = []
+                for tag in self._unconfirmed:
+                    if tag > method.delivery_tag:
+                        break
+                    tags.append(tag)
+            else:
+                tags = [method.delivery_tag] if method.delivery_tag in self._unconfirmed else []
+
+            for tag in tags:
+                exchange, routing_key, body, properties, attempts = self._unconfirmed.pop(tag)
+                if acked:
+                    self.confirmed += 1
+                    continue
+                self.nacked += 1
+                # Send the message again unless its retry budget is used up
+                if attempts < self.max_retries:
+                    self.retried += 1
+                    self._buffer.append((exchange, routing_key, body, properties, attempts + 1))
+                else:
+                    self.failed += 1
+                    log.error("Giving up on message to %s after %d nacks", routing_key, attempts + 1)
+
+            if not acked and self._buffer:
+                self._schedule_flush()
+            self._lock.notify_all()
+
+    def _on_connection_open(self, connection):
+        connection.channel(on_open_callback=self._on_channel_open)
+
+    def _on_channel_open(self, channel):
+        # The channel is only used for publishing once confirms are on
+        channel.confirm_delivery(ack_nack_callback=self._on_confirm,
+                                 callback=lambda frame: self._on_confirm_select_ok(channel))
+
+    def _on_confirm_select_ok(self, channel):
+        self._connection.ioloop.call_later(self.linger, self._on_linger)
+        with self._lock:
+            self._channel = channel
+            if self._ready.is_set():
+                self.reconnects += 1
+                self.backoff.reset()
+                log.warning("Publisher reconnected; sending %d buffered messages", len(self._buffer))
+                self._schedule_flush()
+        self._ready.set()
+
+    def _on_connection_error(self, connection, error):
+        if not self._ready.is_set():
+            # The first connection is not retried
+            self._fail(f"Connection to RabbitMQ server failed: {error}")
+        else:
+            log.warning("Publisher reconnect failed: %s", error)
+        connection.ioloop.stop()
+
+    def _on_connection_closed(self, connection, reason):
+        if not self._closing:
+            self._lost(reason)
+        connection.ioloop.stop()
+
+    def _lost(self, reason):
+        """Move unconfirmed messages back to the buffer so they are published again after a reconnect."""
+        with self._lock:
+            self._channel = None
+            self._flush_scheduled = False
+            # Unconfirmed messages go first, in publish order (they may be delivered twice)
+            self._buffer.extendleft(reversed(self._unconfirmed.values()))
+            self._unconfirmed.clear()
+            # Delivery tags start over on the next channel
+            self._next_tag = 1
+            self._lock.notify_all()
+        log.warning("Publisher connection lost: %s; buffering up to %d messages", reason, self.max_outstanding)
+
+    def _fail(self, message: str):
+        """Record a fatal error and wake up any thread waiting on the publisher."""
+        with self._lock:
+            self._error = message
+            self._lock.notify_all()
+        self._ready.set()
+
+
+class BlockingPublisher:
+    """Publish one message per call on a BlockingConnection, riding out broker outages.
+
+    Messages that cannot be published while the broker is down go to a spill buffer of at most
+    spill_size messages (the oldest are dropped first, counted in dropped). Reconnects are tried
+    from publish() and sleep() once the backoff delay has passed, so the producer keeps pacing the
+    CSV instead of exiting; after a reconnect declare(channel) sets up the topology again and the
+    spilled messages are published first, in order.
+
+    Parameters:
+        host (str): the host name or IP address of the RabbitMQ server
+        declare (callable | None): declare(channel) declares the exchanges and queues on each connection
+        spill_size (int): messages kept while disconnected
+        heartbeat (int): AMQP heartbeat interval in seconds
+    """
+
+    def __init__(self, host: str, declare=None, spill_size: int = 100000, heartbeat: int = DEFAULT_HEARTBEAT):
+        self.host = host
+        self.declare = declare
+        self.heartbeat = heartbeat
+        self.backoff = Backoff()
+        self.spill = deque(maxlen=spill_size)
+        self.published = 0
+        self.dropped = 0
+        self.reconnects = 0
+        self.connection = None
+        self.channel = None
+        self._retry_at = 0.0
+
+    def connect(self):
+        """Open the connection and declare the topology (the first call raises if the broker is unreachable)."""
+        self.connection = pika.BlockingConnection(connection_parameters(self.host, self.heartbeat))
+        self.channel = self.connection.channel()
+        if self.declare is not None:
+            self.declare(self.channel)
+
+    def publish(self, exchange: str, routing_key: str, body: bytes, properties=None) -> bool:
+        """Publish a message, or spill it while the broker is down; return True once it was sent."""
+        message = (exchange, routing_key, body, properties)
+        if self.channel is None and not self._reconnect():
+            self._spill(message)
+            return False
+        try:
+            self.channel.basic_publish(exchange=exchange, routing_key=routing_key, body=body, properties=properties)
+        except CONNECTION_ERRORS as e:
+            self._lost(e)
+            self._spill(message)
+            return False
+        self.published += 1
+        return True
+
+    def sleep(self, seconds: float):
+        """Sleep while servicing heartbeats, and try to reconnect when messages are spilled."""
+        deadline = time.monotonic() + seconds
+        if self.channel is None and self.spill:
+            self._reconnect()
+        if self.connection is not None:
+            try:
+                self.connection.sleep(seconds)
+                return
+            except CONNECTION_ERRORS as e:
+                self._lost(e)
+        time.sleep(max(0.0, deadline - time.monotonic()))
+
+    def close(self, timeout: float = 30.0):
+        """Keep trying to publish spilled messages for up to timeout seconds, then close the connection."""
+        deadline = time.monotonic() + timeout
+        while self.spill and time.monotonic() < deadline:
+            if not self._reconnect():
+                time.sleep(min(max(0.0, self._retry_at - time.monotonic()), max(0.0, deadline - time.monotonic())))
+        if self.spill:
+            log.error("Closing with %d spilled messages not published", len(self.spill))
+        if self.connection is not None and self.connection.is_open:
+            try:
+                self.connection.close()
+            except CONNECTION_ERRORS:
+                pass
+        self.connection = self.channel = None
+
+    def _spill(self, message):
+        if len(self.spill) == self.spill.maxlen:
+            self.dropped += 1
+        self.spill.append(message)
+
+    def _lost(self, error):
+        log.warning("Publisher connection lost: %s; spilling up to %d messages", error or type(error).__name__,
+                    self.spill.maxlen)
+        self.connection = self.channel = None
+        self._retry_at = time.monotonic() + self.backoff.next_delay()
+
+    def _reconnect(self) -> bool:
+        """Reconnect once the backoff delay has passed and publish the spilled messages."""
+        if time.monotonic() < self._retry_at:
+            return False
+        try:
+            self.connect()
+        except CONNECTION_ERRORS as e:
+            self.connection = self.channel = None
+            self._retry_at = time.monotonic() + self.backoff.next_delay()
+            log.warning("Publisher reconnect failed: %s", e or type(e).__name__)
+            return False
+        self.backoff.reset()
+        self.reconnects += 1
+        log.warning("Publisher reconnected; sending %d spilled messages", len(self.spill))
+        while self.spill:
+            exchange, routing_key, body, properties = self.spill[0]
+            try:
+                self.channel.basic_publish(exchange=exchange, routing_key=routing_key, body=body, properties=properties)
+            except CONNECTION_ERRORS as e:
+                self._lost(e)
+                return False
+            self.spill.popleft()
+            self.published += 1
+        return True
@@ -0,0 +1,57 @@
+"""
+BBQ Replay Clock
+
+File Description & Approach:
+Paces a CSV replay using the timestamps in the "Time (UTC)" column instead of a fixed sleep.
+Each row is given an absolute deadline on the monotonic clock, computed from its offset to the
+first row divided by the speed multiplier. Waiting for an absolute deadline (rather than sleeping
+for a relative interval) means time spent publishing never accumulates as drift.
+"""
+
+import calendar
+import time
+
+# Format of the "Time (UTC)" column, e.g. 05/22/21 12:20:15
+CSV_TIME_FORMAT = "%m/%d/%y %H:%M:%S"
+
+
+def parse_csv_time(text: str) -> float:
+    """Convert a "Time (UTC)" value to epoch seconds."""
+    return float(calendar.timegm(time.strptime(text.strip(), CSV_TIME_FORMAT)))
+
+
+class ReplayClock:
+    """Schedule readings relative to the first timestamp seen.
+
+    Parameters:
+        speed (float | None): replay multiplier (1.0 is real time, 60.0 is 60x);
+            None or 0 replays as fast as possible
+    """
+
+    def __init__(self, speed: float | None = 1.0):
+        self.speed = speed
+        self._first_timestamp = None
+        self._start = None
+
+    @property
+    def unthrottled(self) -> bool:
+        return not self.speed
+
+    def delay(self, timestamp: float) -> float:
+        """Return how many seconds remain until the reading at timestamp is due."""
+        if self.unthrottled:
+            return 0.0
+        now = time.monotonic()
+        # The first reading anchors the replay to the current moment
+        if self._first_timestamp is None:
+            self._first_timestamp = timestamp
+            self._start = now
+            return 0.0
+        deadline = self._start + (timestamp - self._first_timestamp) / self.speed
+        return max(0.0, deadline - now)
+
+    def wait(self, timestamp: float, sleep=time.sleep):
+        """Sleep until the reading at timestamp is due."""
+        remaining = self.delay(timestamp)
+        if remaining > 0:
+            sleep(remaining)
@@ -0,0 +1,271 @@
+"""
+BBQ Alert Rules
+
+File Description & Approach:
+Alert conditions declared as data instead of code. Each channel keeps its built-in window rule
+(ChannelSpec threshold) and can add any number of Rules, loaded from a TOML file:
+
+- delta: newest minus oldest reading over a time window, e.g. a smoker drop of 15 degrees
+- rate: degrees per minute over a time window
+- threshold: the current temperature, e.g. smoker above 275
+- target: the food has reached a target temperature, or will within lead seconds at the rate over
+  the window (the estimated time of arrival is reported with the alert)
+
+Every rule fires when its value is at or above `above` or at or below `below`. With `clear` set
+the rule has hysteresis: once active it stays active until the value crosses back past clear,
+so a reading bouncing around the limit alerts once.
+
+compile_rules() turns the rules of a channel into a RuleSet of incremental evaluators. Rules with
+the same window length share one TimeWindow, so each reading is appended once per distinct window
+(O(1) amortized). Rules that read the same value (same kind and window) are grouped, so the value
+is computed once per reading in O(1) from the window ends and each rule only adds a comparison.
+Rules only report transitions (active or cleared), so the consumer logs and emails once per
+episode.
+"""
+
+from collections import namedtuple
+from dataclasses import dataclass, replace
+
+from bbq.windows import TimeWindow
+
+KINDS = ("delta", "rate", "threshold", "target")
+
+
+@dataclass(frozen=True)
+class Rule:
+    """Declarative alert condition for one channel.
+
+    Parameters:
+        name (str): rule name, unique per channel (used as the alert rate-limit key)
+        kind (str): "delta", "rate", "threshold" or "target"
+        window (float): window length in seconds (delta, rate, and the ETA of target)
+        above (float | None): fire when the value is at or above this
+        below (float | None): fire when the value is at or below this
+        clear (float | None): hysteresis; stay active until the value crosses back past this
+        target (float | None): target temperature (target rules)
+        lead (float | None): also fire when the target is this many seconds away (target rules)
+        label (str): console prefix for alerts; defaults to the channel and rule name, e.g. "SMOKER TOO HOT"
+        subject (str): email subject; defaults to the label
+        content (str): email body; defaults to a description of the reading
+    """
+    name: str
+    kind: str
+    window: float = 0.0
+    above: float | None = None
+    below: float | None = None
+    clear: float | None = None
+    target: float | None = None
+    lead: float | None = None
+    label: str = ""
+    subject: str = ""
+    content: str = ""
+
+    def __post_init__(self):
+        if self.kind not in KINDS:
+            raise ValueError(f"rule {self.name!r}: kind must be one of {', '.join(KINDS)}")
+        if self.kind == "target":
+            if self.target is None:
+                raise ValueError(f"rule {self.name!r}: target rules need a target")
+            if self.above is not None or self.below is not None:
+                raise ValueError(f"rule {self.name!r}: target rules use target instead of above/below")
+        elif (self.above is None) == (self.below is None):
+            raise ValueError(f"rule {self.name!r}: set exactly one of above or below")
+        if self.kind in ("delta", "rate") or self.lead is not None:
+            if self.window <= 0:
+                raise ValueError(f"rule {self.name!r}: {self.kind} rules need a window in seconds")
+
+
+# A transition of one rule: active is True when it fires and False when it clears
+RuleEvent = namedtuple("RuleEvent", ["rule", "active", "value", "eta"])
+
+
+def window_text(seconds: float) -> str:
+    """Format a duration for console output, e.g. 150 -> "2.5 minutes"."""
+    if seconds < 60:
+        return f"{seconds:g} second{'' if seconds == 1 else 's'}"
+    minutes = round(seconds / 60, 1)
+    return f"{minutes:g} minute{'' if minutes == 1 else 's'}"
+
+
+def describe(event: RuleEvent, name: str) -> str:
+    """Describe a rule event for console output and email, e.g. "Smoker temp is: 281.0"."""
+    rule = event.rule
+    name = name[:1].upper() + name[1:]
+    if rule.kind == "delta":
+        return f"{name} temp change in last {window_text(rule.window)} is: {event.value} degrees"
+    if rule.kind == "rate":
+        return f"{name} temp is changing at {event.value:+.1f} degrees per minute over the last {window_text(rule.window)}"
+    if rule.kind == "target":
+        if event.value >= rule.target:
+            return f"{name} temp is: {event.value} ; the {rule.target:g} degree target has been reached"
+        if event.eta is not None:
+            return (f"{name} temp is: {event.value} ; expected to reach the {rule.target:g} degree target "
+                    f"in about {window_text(round(event.eta / 60) * 60)}")
+    return f"{name} temp is: {event.value}"
+
+
+def _value_function(rule: Rule, window: TimeWindow | None):
+    """Build the O(1) function returning (value, eta) for the newest reading, or (None, None)."""
+    if rule.kind == "threshold" or window is None:
+        # A target rule without a window reports the temperature with no ETA
+        return lambda temp: (temp, None)
+
+    if rule.kind == "delta":
+        def delta(temp):
+            if not window.ready:
+                return None, None
+            # Difference in most recent temp and oldest temp in the window
+            return round(window.change, 1), None
+        return delta
+
+    def slope() -> float:
+        """Degrees per second from the oldest to the newest reading in the window."""
+        elapsed = window.last_timestamp - window.first_timestamp
+        return window.change / elapsed if elapsed > 0 else 0.0
+
+    if rule.kind == "rate":
+        def rate(temp):
+            if not window.ready:
+                return None, None
+            return round(slope() * 60, 2), None
+        return rate
+
+    target = rule.target
+
+    def eta(temp):
+        # Time to reach the target at the current rate, if rising
+        if temp >= target or not window.ready:
+            return temp, None
+        per_second = slope()
+        return temp, ((target - temp) / per_second if per_second > 0 else None)
+    return eta
+
+
+def _transition_function(rule: Rule):
+    """Build the function that tracks whether a rule is active and returns a RuleEvent on a change."""
+    above = rule.target if rule.kind == "target" else rule.above
+    below, clear, lead = rule.below, rule.clear, rule.lead
+    active = False
+
+    def step(value: float, eta: float | None) -> RuleEvent | None:
+        nonlocal active
+        firing = value >= above if above is not None else value <= below
+        if lead is not None and eta is not None and eta <= lead:
+            firing = True
+        if not active:
+            if firing:
+                active = True
+                return RuleEvent(rule, True, value, eta)
+            return None
+        if clear is None:
+            cleared = not firing
+        else:
+            # Hysteresis: only clear once the value has moved back past the clear level
+            cleared = value < clear if above is not None else value > clear
+        if cleared:
+            active = False
+            return RuleEvent(rule, False, value, eta)
+        return None
+    return step
+
+
+class RuleSet:
+    """Compiled rules of one channel with shared time windows.
+
+    Parameters:
+        rules (list[Rule]): the channel's rules
+        shared (dict | None): windows by length that the caller already appends to, e.g. the
+            channel's built-in window; rules with that window length read it instead of their own
+    """
+
+    def __init__(self, rules, shared: dict | None = None):
+        names = [rule.name for rule in rules]
+        if len(set(names)) != len(names):
+            raise ValueError(f"rule names must be unique per channel: {names}")
+        shared = shared or {}
+        self.windows = dict(shared)  # window length -> TimeWindow shared by every rule with that length
+        groups = {}        # (kind, window, target) -> (value function, [transition functions])
+        for rule in rules:
+            window = None
+            if rule.window > 0:
+                window = self.windows.setdefault(rule.window, TimeWindow(rule.window))
+            # Rules that read the same value compute it once per reading
+            key = (rule.kind, rule.window if rule.kind != "threshold" else 0.0, rule.target)
+            if key not in groups:
+                groups[key] = (_value_function(rule, window), [])
+            groups[key][1].append(_transition_function(rule))
+        # Only the windows this rule set owns are appended to and restored here
+        self._windows = [window for span, window in self.windows.items() if span not in shared]
+        self._groups = list(groups.values())
+        self._count = len(rules)
+        self.events = []
+
+    def __len__(self) -> int:
+        return self._count
+
+    def update(self, timestamp: float, temp: float):
+        """Add a reading to every window and evaluate every rule, collecting transitions."""
+        for window in self._windows:
+            window.append(timestamp, temp)
+        for value_function, steps in self._groups:
+            value, eta = value_function(temp)
+            if value is None:
+                continue
+            for step in steps:
+                event = step(value, eta)
+                if event is not None:
+                    self.events.append(event)
+
+    def drain(self) -> list:
+        """Return and clear the transitions since the last drain."""
+        events, self.events = self.events, []
+        return events
+
+    def restore(self, readings):
+        """Rebuild the windows from saved (timestamp, temp) readings, oldest first."""
+        for window in self._windows:
+            window.restore(readings)
+
+
+def compile_rules(rules, shared: dict | None = None) -> RuleSet | None:
+    """Compile a channel's rules, or return None when it has none."""
+    return RuleSet(rules, shared) if rules else None
+
+
+def load_rules(path: str) -> dict:
+    """Read rules from a TOML file into {queue: tuple of Rules}.
+
+    Each rule is a [[rules]] table with a channel (queue name) and the Rule fields, e.g.
+
+        [[rules]]
+        channel = "01-smoker"
+        name = "too-hot"
+        kind = "threshold"
+        above = 275
+        clear = 265
+    """
+    import tomllib  # requires Python 3.11
+
+    with open(path, "rb") as file_object:
+        config = tomllib.load(file_object)
+    by_queue = {}
+    for index, entry in enumerate(config.get("rules", [])):
+        entry = dict(entry)
+        queue = entry.pop("channel", None)
+        if queue is None:
+            raise ValueError(f"{path}: rule {index + 1} has no channel")
+        try:
+            rule = Rule(**entry)
+        except TypeError as e:
+            raise ValueError(f"{path}: rule {index + 1}: {e}") from None
+        by_queue.setdefault(queue, []).append(rule)
+    return {queue: tuple(rules) for queue, rules in by_queue.items()}
+
+
+def apply_rules(specs, rules_by_queue: dict) -> list:
+    """Return the ChannelSpecs with the loaded rules added to their channels."""
+    known = {spec.queue for spec in specs}
+    unknown = sorted(set(rules_by_queue) - known)
+    if unknown:
+        raise ValueError(f"rules for unknown channels: {', '.join(unknown)}")
+    return [replace(spec, rules=spec.rules + rules_by_queue.get(spec.queue, ())) for spec in specs]
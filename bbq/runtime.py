@@ -0,0 +1,88 @@
+"""
+BBQ Runtime
+
+File Description & Approach:
+Runtime settings shared by the entry scripts, and the import policy that keeps them quick to
+start. Short replay jobs and respawned fleet workers pay for every module imported at load time,
+so modules that only some runs need are imported where they are first used instead:
+
+- smtplib and email when the first alert is sent (bbq/alerts.py)
+- tomllib when .env.toml or a rules file is read (here and in bbq/rules.py)
+- http.server when a metrics port is served (bbq/metrics.py)
+- webbrowser when the producer opens the RabbitMQ admin site
+- numpy and pandas for offline analysis (bbq/backtest.py)
+
+pika is still imported up front by the modules that talk to RabbitMQ, since every run of them
+needs it. The startup benchmark (python bbq-benchmark.py --startup) shows the cold-start time of
+each entry script and its slowest imports.
+
+The outgoing email settings in .env.toml are parsed and validated once per path into a frozen
+EmailConfig, shared by every alert sender in the process. A file that is missing or invalid is not
+re-parsed for every alert either: the error is kept and raised again.
+"""
+
+from dataclasses import dataclass
+import functools
+
+# .env.toml key -> (EmailConfig field, type)
+EMAIL_KEYS = {
+    "outgoing_email_host": ("host", str),
+    "outgoing_email_port": ("port", int),
+    "outgoing_email_address": ("address", str),
+    "outgoing_email_password": ("password", str),
+}
+
+
+@dataclass(frozen=True)
+class EmailConfig:
+    """Outgoing email settings.
+
+    Parameters:
+        host (str): SMTP server (outgoing_email_host)
+        port (int): SMTP port (outgoing_email_port); 465 with tls uses implicit TLS
+        address (str): sender and recipient of the alerts (outgoing_email_address)
+        password (str): login password (outgoing_email_password)
+        tls (bool): use TLS (outgoing_email_tls, default true)
+    """
+    host: str
+    port: int
+    address: str
+    password: str
+    tls: bool = True
+
+
+# path -> error raised when reading it (lru_cache does not cache exceptions)
+_email_config_errors = {}
+
+
+def email_config(path: str = ".env.toml") -> EmailConfig:
+    """Read and validate the outgoing email settings (parsed once per path, errors included)."""
+    error = _email_config_errors.get(path)
+    if error is not None:
+        raise error
+    try:
+        return _read_email_config(path)
+    except (OSError, ValueError) as e:
+        _email_config_errors[path] = e
+        raise
+
+
+@functools.lru_cache(maxsize=None)
+def _read_email_config(path: str) -> EmailConfig:
+    import tomllib  # requires Python 3.11
+
+    with open(path, "rb") as file_object:
+        config = tomllib.load(file_object)
+    missing = [key for key in EMAIL_KEYS if key not in config]
+    if missing:
+        raise ValueError(f"{path} is missing {', '.join(missing)}")
+    fields = {}
+    for key, (field, kind) in EMAIL_KEYS.items():
+        value = config[key]
+        if not isinstance(value, kind) or isinstance(value, bool):
+            raise ValueError(f"{path}: {key} must be {'an integer' if kind is int else 'a string'}")
+        fields[field] = value
+    tls = config.get("outgoing_email_tls", True)
+    if not isinstance(tls, bool):
+        raise ValueError(f"{path}: outgoing_email_tls must be true or false")
+    return EmailConfig(tls=tls, **fields)
@@ -0,0 +1,206 @@
+"""
+BBQ Simulator
+
+File Description & Approach:
+Synthetic smoker and food temperature curves for any number of virtual devices, for load tests
+that smoker-temps.csv (one cook, about 2,460 rows) is far too small for. Each SimulatedCook
+models one smoker reporting every interval seconds:
+
+- the pit preheats from ambient towards its set point, swings around it with the controller and
+  some sensor noise, and drops 30-60 degrees when the lid is opened, recovering over a few minutes
+- each food probe is inserted a few minutes into the cook and heats towards the pit temperature
+  (Newton's law of heating), with an evaporative stall of one to three hours around 150-170 F,
+  and is pulled (blank from then on) once the food is done at 195-205 F
+- probes drop out now and then for 30 seconds to 5 minutes, and food probes skip some rows, so
+  the output has blank cells like the real file
+
+Every device draws from its own random.Random seeded with (seed, device index), so a device's
+curve is the same whatever the number of devices, and two runs with the same seed produce the
+same readings. The same model feeds both outputs: publish_fleet() streams the readings to the
+fleet exchange at a fixed aggregate rate through the fleet routing and binary messages of
+bbq/fleet.py, and write_csv() writes one CSV per device in the format of smoker-temps.csv, for
+the producer (csv_file) and bbq-analyze.py.
+"""
+
+import calendar
+import math
+import os
+import random
+import time
+
+from bbq.fleet import FLEET_EXCHANGE, device_properties, routing_key
+from bbq.messages import (BINARY_PROPERTIES, ENVELOPE_PROPERTIES, FOOD_A_ID, FOOD_B_ID, SMOKER_ID, encode_binary,
+                          encode_envelope)
+from bbq.replay import CSV_TIME_FORMAT
+
+DEFAULT_START = calendar.timegm((2021, 5, 22, 12, 0, 0))  # the day of the recorded cook
+CSV_HEADER = "Time (UTC),Channel1,Channel2,Channel3\n"
+SET_POINTS = (225.0, 250.0, 275.0)
+
+
+class SimulatedCook:
+    """Temperatures of one virtual smoker and its two food probes.
+
+    Parameters:
+        device (str): the device id
+        rng (random.Random): this device's random source
+        interval (float): seconds between rows
+    """
+
+    def __init__(self, device: str, rng: random.Random, interval: float = 5.0):
+        self.device = device
+        self.rng = rng
+        self.interval = interval
+        self.ambient = rng.uniform(55.0, 85.0)
+        self.set_point = rng.choice(SET_POINTS)
+        self.pit = self.ambient
+        self.lid_drop = 0.0  # degrees below the controller curve after a lid opening, decaying
+        self.phase = rng.uniform(0.0, 2 * math.pi)
+        self.swing = rng.uniform(2.0, 8.0)  # controller swing amplitude
+        self.elapsed = 0.0
+        # Per food probe: [temp, seconds until inserted, stall seconds left, heating time constant, done temp]
+        self.food = [[rng.uniform(34.0, 45.0), rng.uniform(60.0, 1800.0), rng.uniform(3600.0, 10800.0),
+                      rng.uniform(5400.0, 10800.0), rng.uniform(195.0, 205.0)] for _ in range(2)]
+        self.dropout = [0.0, 0.0, 0.0]  # seconds each probe stays silent
+
+    def step(self) -> tuple:
+        """Advance one interval and return (smoker, food A, food B); None for a blank cell."""
+        rng = self.rng
+        dt = self.interval
+        self.elapsed += dt
+
+        # Preheat with a 15 minute time constant, then hold with the controller swing
+        self.pit += (self.set_point - self.pit) * (1 - math.exp(-dt / 900.0))
+        self.lid_drop *= math.exp(-dt / 180.0)
+        if rng.random() < dt / 10800.0:  # about one lid opening every 3 hours
+            self.lid_drop += rng.uniform(30.0, 60.0)
+        smoker = (self.pit + self.swing * math.sin(self.phase + self.elapsed / 600.0 * 2 * math.pi)
+                  - self.lid_drop + rng.gauss(0.0, 0.7))
+
+        values = [smoker, None, None]
+        for index, probe in enumerate(self.food):
+            temp, insert_in, stall_left, tau, done = probe
+            if insert_in > 0:
+                probe[1] = insert_in - dt
+                continue
+            if temp >= done:
+                # Pulled off the smoker
+                continue
+            heating = (smoker - temp) * (1 - math.exp(-dt / tau))
+            if stall_left > 0 and 150.0 <= temp <= 170.0:
+                # Evaporative cooling holds the meat almost still
+                heating *= 0.05
+                probe[2] = stall_left - dt
+            probe[0] = temp + heating
+            # Food probes skip about a third of the rows
+            if rng.random() < 0.67:
+                values[index + 1] = probe[0] + rng.gauss(0.0, 0.1)
+
+        for index in range(3):
+            if self.dropout[index] > 0:
+                self.dropout[index] -= dt
+                values[index] = None
+            elif rng.random() < dt / 7200.0:  # about one dropout per probe every 2 hours
+                self.dropout[index] = rng.uniform(30.0, 300.0)
+        return tuple(None if value is None else round(value, 1) for value in values)
+
+
+class Simulator:
+    """A fleet of SimulatedCooks sharing one clock.
+
+    Parameters:
+        devices (int): virtual devices
+        seed (int): seed of every device's random source
+        interval (float): seconds of cook time between rows
+        start (float): epoch seconds of the first row
+        prefix (str): device ids are "<prefix>-00000", "<prefix>-00001", ...
+    """
+
+    def __init__(self, devices: int = 1000, seed: int = 6, interval: float = 5.0,
+                 start: float = DEFAULT_START, prefix: str = "sim"):
+        self.interval = interval
+        self.start = start
+        self.cooks = [SimulatedCook(f"{prefix}-{index:05d}", random.Random(f"{seed}:{index}"), interval)
+                      for index in range(devices)]
+
+    def readings(self):
+        """Yield (timestamp, cook, (smoker, food A, food B)) for every device, one tick at a time, forever."""
+        timestamp = self.start
+        while True:
+            timestamp += self.interval
+            for cook in self.cooks:
+                yield timestamp, cook, cook.step()
+
+
+def publish_fleet(simulator: Simulator, publish, rate: float | None, readings: int | None = None,
+                  shards: int = 8, envelope: bool = False, sleep=time.sleep, check_every: int = 256) -> dict:
+    """Publish simulated readings to the fleet exchange at rate readings per second.
+
+    Parameters:
+        simulator (Simulator): the devices to publish
+        publish (callable): publish(exchange, routing_key, body, properties), e.g. BlockingPublisher.publish
+        rate (float): aggregate readings per second; None or 0 publishes as fast as possible
+        readings (int | None): stop after this many readings; None runs until interrupted
+        shards (int): shard queues in the fleet topology
+        envelope (bool): send each device's readings of a tick as one envelope instead of one message each
+        sleep (callable): sleeps while pacing (e.g. one that keeps a connection's heartbeats going)
+        check_every (int): readings between pacing checks
+
+    Returns a dict with the readings and messages sent, the elapsed seconds and readings/sec.
+    """
+    channel_ids = (SMOKER_ID, FOOD_A_ID, FOOD_B_ID)
+    # Routing keys and properties are worked out once per device
+    routes = {cook.device: (routing_key(cook.device, shards),
+                            device_properties(cook.device, ENVELOPE_PROPERTIES if envelope else BINARY_PROPERTIES))
+              for cook in simulator.cooks}
+    sent = messages = 0
+    next_check = check_every
+    started = time.perf_counter()
+    for timestamp, cook, values in simulator.readings():
+        key, properties = routes[cook.device]
+        tick = [(timestamp, temp, channel_id) for temp, channel_id in zip(values, channel_ids) if temp is not None]
+        if not tick:
+            continue
+        if envelope:
+            publish(FLEET_EXCHANGE, key, encode_envelope(tick), properties)
+            messages += 1
+        else:
+            for reading in tick:
+                publish(FLEET_EXCHANGE, key, encode_binary(*reading), properties)
+            messages += len(tick)
+        sent += len(tick)
+        if readings is not None and sent >= readings:
+            break
+        if rate and sent >= next_check:
+            next_check = sent + check_every
+            # Hold the aggregate rate: sleep until the readings sent so far are due
+            ahead = started + sent / rate - time.perf_counter()
+            if ahead > 0:
+                sleep(ahead)
+    elapsed = time.perf_counter() - started
+    return {"readings": sent, "messages": messages, "elapsed": elapsed,
+            "rate": sent / elapsed if elapsed > 0 else 0.0}
+
+
+def write_csv(simulator: Simulator, directory: str, hours: float = 12.0) -> list[str]:
+    """Write hours of cook time per device to "<directory>/<device>.csv"; return the paths.
+
+    Devices are independent, so each file is written in turn and only one is open at a time.
+    """
+    os.makedirs(directory, exist_ok=True)
+    rows = int(hours * 3600 / simulator.interval)
+    # Every device shares the clock, so the time cells are formatted once
+    stamps = [time.strftime(CSV_TIME_FORMAT, time.gmtime(simulator.start + (row + 1) * simulator.interval))
+              for row in range(rows)]
+    paths = []
+    for cook in simulator.cooks:
+        path = os.path.join(directory, f"{cook.device}.csv")
+        lines = [CSV_HEADER]
+        for stamp in stamps:
+            smoker, food_a, food_b = cook.step()
+            lines.append(f"{stamp},{'' if smoker is None else smoker},{'' if food_a is None else food_a},"
+                         f"{'' if food_b is None else food_b}\n")
+        with open(path, "w") as file:
+            file.writelines(lines)
+        paths.append(path)
+    return paths
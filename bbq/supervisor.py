@@ -0,0 +1,214 @@
+"""
+BBQ Worker Supervisor
+
+File Description & Approach:
+Runs a pool of fleet consumer worker processes so one box uses all of its cores. Each worker is a
+separate process (spawned, so no pika connection or thread is inherited) that owns the shards
+where shard % workers == worker (see bbq/fleet.py) and keeps the window state for the devices on
+them; since a device always hashes to the same shard, its state never moves between workers.
+
+The supervisor waits on the worker process sentinels. A worker that exits with an error is
+restarted after an exponential backoff (reset once it has stayed up for a while), and a worker
+that exits cleanly is left alone. Workers send their stats over a queue every stats_interval
+seconds and the supervisor prints the fleet totals. On CTRL+C or SIGTERM every worker is sent
+SIGTERM, flushes its acks and checkpoints and exits.
+"""
+
+import multiprocessing
+import multiprocessing.connection
+import queue
+import signal
+import sys
+import time
+
+import pika
+
+from bbq.fleet import DEFAULT_SHARDS, FleetEngine, owned_shards
+from bbq.log import setup_logging
+from bbq.metrics import configure
+
+
+def _terminate(signum, frame):
+    # Unwind through the engine's finally blocks so acks and checkpoints are flushed
+    sys.exit(0)
+
+
+def fleet_worker(worker: int, workers: int, host: str, shards: int, engine_options: dict, log_options: dict,
+                 stats_queue, stats_interval: float, metrics_port: int | None = None):
+    """Serve one worker's shards until terminated, reporting stats to the supervisor.
+
+    Parameters:
+        worker (int): index of this worker
+        workers (int): workers in the pool
+        host (str): the host name or IP address of the RabbitMQ server
+        shards (int): shard queues in the fleet topology
+        engine_options (dict): keyword arguments for FleetEngine
+        log_options (dict): keyword arguments for setup_logging
+        stats_queue: multiprocessing queue the stats are put on
+        stats_interval (float): seconds between stats reports
+        metrics_port (int | None): base metrics port; worker i serves on metrics_port + i
+    """
+    signal.signal(signal.SIGTERM, _terminate)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the supervisor handles CTRL+C
+    setup_logging(**log_options)
+    configure(metrics_port + worker if metrics_port is not None else None)
+    engine = FleetEngine(host, owned_shards(worker, workers, shards), shards, **engine_options)
+    try:
+        engine.start()
+        next_report = time.monotonic() + stats_interval
+        while True:
+            engine.poll()
+            if time.monotonic() >= next_report:
+                stats_queue.put((worker, engine.stats()))
+                next_report += stats_interval
+    except pika.exceptions.AMQPConnectionError as e:
+        # The supervisor restarts the worker with backoff
+        print(f"ERROR: worker {worker} could not reach RabbitMQ on host={host}: {e!r}")
+        sys.exit(1)
+    finally:
+        engine.close()
+
+
+class Supervisor:
+    """Start, watch and restart a pool of fleet worker processes.
+
+    Parameters:
+        host (str): the host name or IP address of the RabbitMQ server
+        workers (int): worker processes to run
+        shards (int): shard queues in the fleet topology
+        engine_options (dict): keyword arguments for each worker's FleetEngine
+        log_options (dict): keyword arguments for each worker's setup_logging
+        stats_interval (float): seconds between stats reports
+        restart_delay (float): first backoff before restarting a crashed worker
+        max_restart_delay (float): cap on the restart backoff
+        metrics_port (int | None): base metrics port; worker i serves on metrics_port + i
+    """
+
+    def __init__(self, host: str, workers: int, shards: int = DEFAULT_SHARDS, engine_options: dict | None = None,
+                 log_options: dict | None = None, stats_interval: float = 10.0, restart_delay: float = 1.0,
+                 max_restart_delay: float = 60.0, metrics_port: int | None = None):
+        if workers > shards:
+            raise ValueError(f"workers ({workers}) must not exceed shards ({shards}); extra workers would sit idle")
+        self.host = host
+        self.workers = workers
+        self.shards = shards
+        self.engine_options = engine_options or {}
+        self.log_options = log_options or {}
+        self.stats_interval = stats_interval
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.metrics_port = metrics_port
+        self._context = multiprocessing.get_context("spawn")
+        self.stats_queue = self._context.Queue()
+        self.processes = {}   # worker -> Process
+        self.started_at = {}  # worker -> monotonic start time
+        self.backoff = {}     # worker -> next restart delay
+        self.restart_at = {}  # worker -> monotonic time a crashed worker is due to restart
+        self.restarts = 0
+        self.latest = {}      # worker -> last stats report
+        self._last_total = 0
+        self._last_report = time.monotonic()
+
+    def _spawn(self, worker: int):
+        process = self._context.Process(
+            target=fleet_worker, name=f"bbq-worker-{worker}",
+            args=(worker, self.workers, self.host, self.shards, self.engine_options, self.log_options,
+                  self.stats_queue, self.stats_interval, self.metrics_port))
+        process.start()
+        self.processes[worker] = process
+        self.started_at[worker] = time.monotonic()
+
+    def start(self):
+        """Start every worker."""
+        for worker in range(self.workers):
+            self.backoff[worker] = self.restart_delay
+            self._spawn(worker)
+
+    def _reap(self, now: float):
+        """Schedule restarts for workers that have exited with an error."""
+        for worker, process in list(self.processes.items()):
+            if process.is_alive():
+                continue
+            del self.processes[worker]
+            process.join()
+            if process.exitcode == 0:
+                print(f" [!] Worker {worker} exited")
+                continue
+            if now - self.started_at[worker] > self.max_restart_delay:
+                # It had been healthy for a while, so this is a fresh failure
+                self.backoff[worker] = self.restart_delay
+            delay = self.backoff[worker]
+            self.backoff[worker] = min(delay * 2, self.max_restart_delay)
+            self.restart_at[worker] = now + delay
+            print(f" [!] Worker {worker} exited with code {process.exitcode}; restarting in {delay:.1f} s")
+
+    def _restart_due(self, now: float):
+        for worker, due in list(self.restart_at.items()):
+            if now >= due:
+                del self.restart_at[worker]
+                self.restarts += 1
+                self._spawn(worker)
+
+    def _collect(self):
+        while True:
+            try:
+                worker, stats = self.stats_queue.get_nowait()
+            except queue.Empty:
+                return
+            self.latest[worker] = stats
+
+    def totals(self) -> dict:
+        """Fleet totals from the latest report of every worker."""
+        shards = [shard for stats in self.latest.values() for shard in stats.values()]
+        return {
+            "workers": len(self.processes),
+            "restarts": self.restarts,
+            "devices": sum(shard["devices"] for shard in shards),
+            "readings": sum(shard["readings"] for shard in shards),
+            "unknown": sum(shard["unknown"] for shard in shards),
+            "dead_lettered": sum(shard["dead_lettered"] for shard in shards),
+            "retried": sum(shard["retried"] for shard in shards),
+            "skipped": sum(shard["skipped"] for shard in shards),
+        }
+
+    def report(self) -> str:
+        """Format the fleet totals with the reading rate since the last report."""
+        now = time.monotonic()
+        totals = self.totals()
+        # Counters restart from zero with a restarted worker, so the rate never goes negative
+        rate = max(0, totals["readings"] - self._last_total) / max(now - self._last_report, 1e-9)
+        self._last_total, self._last_report = totals["readings"], now
+        return (f" [*] {totals['workers']}/{self.workers} workers up, {totals['restarts']} restarts, "
+                f"{totals['devices']} devices, {totals['readings']} readings ({rate:,.0f}/sec), "
+                f"{totals['dead_lettered']} dead-lettered, {totals['retried']} retried, "
+                f"{totals['skipped']} skipped")
+
+    def run_forever(self):
+        """Watch the workers, restart crashed ones and print stats until interrupted."""
+        next_report = time.monotonic() + self.stats_interval
+        while self.processes or self.restart_at:
+            now = time.monotonic()
+            timeout = min([next_report] + list(self.restart_at.values())) - now
+            sentinels = [process.sentinel for process in self.processes.values()]
+            multiprocessing.connection.wait(sentinels, timeout=max(0.0, timeout))
+            now = time.monotonic()
+            self._reap(now)
+            self._restart_due(now)
+            self._collect()
+            if now >= next_report:
+                print(self.report())
+                next_report = now + self.stats_interval
+
+    def stop(self, timeout: float = 10.0):
+        """Ask every worker to shut down cleanly, killing any that do not within timeout."""
+        self.restart_at.clear()
+        for process in self.processes.values():
+            process.terminate()
+        deadline = time.monotonic() + timeout
+        for process in self.processes.values():
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+                process.join()
+        self._collect()
+        self.processes.clear()
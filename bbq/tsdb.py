@@ -0,0 +1,331 @@
+"""
+BBQ History Store
+
+File Description & Approach:
+Local time-series storage for every reading the consumers see, with downsampled rollups so long
+cooks can be charted quickly. Each series (a channel queue, or "<device>/<queue>" in fleet mode)
+is a directory of append-only column files, one per field and resolution:
+
+    raw.ts raw.temp                                    every reading
+    60.ts 60.min 60.max 60.mean 60.count               1 minute buckets
+    600.ts 600.min 600.max 600.mean 600.count          10 minute buckets
+
+Timestamps are float64 and temperatures float32, little-endian. Rollups are maintained
+incrementally on ingest: each resolution keeps its open bucket (min, max, sum, count) in memory
+and appends one row to its columns when a reading starts the next bucket. On open, the open
+buckets are rebuilt from the raw readings after the last flushed row, so nothing is lost on a
+restart.
+
+Series are append-only in timestamp order, so a reading at or before the newest stored one (e.g.
+smoker-temps.csv replayed a second time) is not stored. The first such reading of each series is
+logged to "bbq.history" and the rest are counted in Series.ignored.
+
+query() picks the finest resolution that answers the range in at most max_points rows, binary
+searches the timestamp column through a memory map and reads only the rows in range, so a 12 hour
+curve comes from about 72 ten-minute rows (or 720 one-minute rows) instead of every raw point.
+"""
+
+import array
+import bisect
+from collections import namedtuple
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+
+RESOLUTIONS = (60, 600)  # rollup bucket sizes in seconds
+
+history_log = logging.getLogger("bbq.history")
+
+# One row of a query result: bucket start (or reading time), min, max, mean and readings in it
+Point = namedtuple("Point", ["timestamp", "min", "max", "mean", "count"])
+
+
+class _Column:
+    """Append-only little-endian column file of one struct format.
+
+    Rows are buffered in memory and appended by flush(), which opens the file only while writing,
+    so a fleet of thousands of series does not hold thousands of file descriptors.
+    """
+
+    def __init__(self, path: str, typecode: str):
+        self.path = path
+        self._pack = struct.Struct("<" + typecode).pack
+        self._pending = bytearray()
+
+    def append(self, value):
+        self._pending += self._pack(value)
+
+    def flush(self):
+        if self._pending:
+            with open(self.path, "ab") as file:
+                file.write(self._pending)
+            self._pending.clear()
+
+
+def _row_count(path: str, itemsize: int) -> int:
+    try:
+        return os.path.getsize(path) // itemsize
+    except FileNotFoundError:
+        return 0
+
+
+def _read_column(path: str, typecode: str, start: int = 0, stop: int | None = None) -> array.array:
+    """Read rows [start, stop) of a column file (whole rows only)."""
+    values = array.array(typecode)
+    try:
+        with open(path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size // values.itemsize
+            stop = size if stop is None else min(stop, size)
+            if stop > start:
+                file.seek(start * values.itemsize)
+                values.frombytes(file.read((stop - start) * values.itemsize))
+    except FileNotFoundError:
+        pass
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+def _search(path: str, timestamp: float, side: str = "left") -> int:
+    """Binary search a float64 timestamp column on disk without reading it all."""
+    try:
+        with open(path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size // 8
+            if size == 0:
+                return 0
+            with mmap.mmap(file.fileno(), size * 8, access=mmap.ACCESS_READ) as mapped:
+                column = memoryview(mapped).cast("d")
+                try:
+                    if side == "left":
+                        return bisect.bisect_left(column, timestamp)
+                    return bisect.bisect_right(column, timestamp)
+                finally:
+                    column.release()
+    except FileNotFoundError:
+        return 0
+
+
+class _Rollup:
+    """Open bucket and column files of one resolution."""
+
+    def __init__(self, directory: str, seconds: int):
+        self.seconds = seconds
+        prefix = os.path.join(directory, str(seconds))
+        self.columns = [_Column(f"{prefix}.ts", "d"), _Column(f"{prefix}.min", "f"),
+                        _Column(f"{prefix}.max", "f"), _Column(f"{prefix}.mean", "f"),
+                        _Column(f"{prefix}.count", "I")]
+        self.start = None  # open bucket start
+        self.low = self.high = self.total = 0.0
+        self.count = 0
+
+    def add(self, timestamp: float, temp: float):
+        start = timestamp - timestamp % self.seconds
+        if start != self.start:
+            self.flush_bucket()
+            self.start, self.low, self.high, self.total, self.count = start, temp, temp, temp, 1
+            return
+        if temp < self.low:
+            self.low = temp
+        elif temp > self.high:
+            self.high = temp
+        self.total += temp
+        self.count += 1
+
+    def open_point(self) -> Point | None:
+        if self.start is None:
+            return None
+        return Point(self.start, self.low, self.high, self.total / self.count, self.count)
+
+    def flush_bucket(self):
+        """Append the open bucket as one row."""
+        point = self.open_point()
+        if point is not None:
+            for column, value in zip(self.columns, point):
+                column.append(value)
+        self.start = None
+
+
+class Series:
+    """Raw readings and rollups of one series, appended in timestamp order.
+
+    Parameters:
+        directory (str): the series directory, created if missing
+        flush_interval (float): seconds between flushes of the column files
+    """
+
+    def __init__(self, directory: str, flush_interval: float = 5.0):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._raw_ts = _Column(os.path.join(directory, "raw.ts"), "d")
+        self._raw_temp = _Column(os.path.join(directory, "raw.temp"), "f")
+        self.rollups = [_Rollup(directory, seconds) for seconds in RESOLUTIONS]
+        self.last = None
+        self.ignored = 0  # readings at or before the last stored one
+        self._recover()
+        self._last_flush = time.monotonic()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _recover(self):
+        """Rebuild the open buckets from the raw readings after the last flushed rows."""
+        raw_path = self._path("raw.ts")
+        rows = _row_count(raw_path, 8)
+        if not rows:
+            return
+        self.last = _read_column(raw_path, "d", rows - 1, rows)[0]
+        resume = []
+        for rollup in self.rollups:
+            path = self._path(f"{rollup.seconds}.ts")
+            flushed = _row_count(path, 8)
+            resume.append(_read_column(path, "d", flushed - 1, flushed)[0] + rollup.seconds
+                          if flushed else float("-inf"))
+        # Only the tail after the oldest open bucket is read back
+        first = _search(raw_path, min(resume))
+        timestamps = _read_column(raw_path, "d", first, rows)
+        temps = _read_column(self._path("raw.temp"), "f", first, first + len(timestamps))
+        for rollup, resume_at in zip(self.rollups, resume):
+            for index in range(bisect.bisect_left(timestamps, resume_at), len(temps)):
+                rollup.add(timestamps[index], temps[index])
+
+    def append(self, timestamp: float, temp: float):
+        """Store a reading and update the rollups (readings at or before the last one are ignored)."""
+        if self.last is not None and timestamp <= self.last:
+            if not self.ignored:
+                history_log.warning("History in %s already ends at %.0f; not storing older readings from %.0f on "
+                                    "(move the directory away to keep a replayed cook)",
+                                    self.directory, self.last, timestamp,
+                                    extra={"series": self.directory, "last": self.last, "timestamp": timestamp})
+            self.ignored += 1
+            return
+        self.last = timestamp
+        self._raw_ts.append(timestamp)
+        self._raw_temp.append(temp)
+        for rollup in self.rollups:
+            rollup.add(timestamp, temp)
+
+    def flush(self):
+        """Append the buffered rows to the files."""
+        self._raw_ts.flush()
+        self._raw_temp.flush()
+        for rollup in self.rollups:
+            for column in rollup.columns:
+                column.flush()
+        self._last_flush = time.monotonic()
+
+    def flush_if_due(self):
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def close(self):
+        """Flush the files; open buckets are rebuilt from raw readings on the next open."""
+        self.flush()
+
+
+def query_series(directory: str, start: float, end: float, max_points: int = 1000,
+                 resolution: int | None = None) -> tuple[int, list]:
+    """Return (resolution seconds, points) for one series directory between start and end.
+
+    Resolution 0 means raw readings. Rows are read from the files only, so this also works while
+    another process is appending; the newest bucket appears once it has been flushed.
+    """
+    span = max(end - start, 0.0)
+    if resolution is None:
+        resolution = RESOLUTIONS[-1]
+        for seconds in (0,) + RESOLUTIONS:
+            if seconds == 0:
+                lo = _search(os.path.join(directory, "raw.ts"), start)
+                hi = _search(os.path.join(directory, "raw.ts"), end, "right")
+                if hi - lo <= max_points:
+                    resolution = 0
+                    break
+            elif span / seconds <= max_points:
+                resolution = seconds
+                break
+
+    if resolution == 0:
+        ts_path = os.path.join(directory, "raw.ts")
+        lo, hi = _search(ts_path, start), _search(ts_path, end, "right")
+        timestamps = _read_column(ts_path, "d", lo, hi)
+        temps = _read_column(os.path.join(directory, "raw.temp"), "f", lo, lo + len(timestamps))
+        return 0, [Point(ts, temp, temp, temp, 1) for ts, temp in zip(timestamps, temps)]
+
+    prefix = os.path.join(directory, str(resolution))
+    # Include the bucket that contains start
+    lo, hi = _search(f"{prefix}.ts", start - resolution, "right"), _search(f"{prefix}.ts", end, "right")
+    columns = [_read_column(f"{prefix}.{name}", code, lo, hi)
+               for name, code in (("ts", "d"), ("min", "f"), ("max", "f"), ("mean", "f"), ("count", "I"))]
+    rows = min(len(column) for column in columns)
+    return resolution, [Point(*(column[i] for column in columns)) for i in range(rows)]
+
+
+class HistoryStore:
+    """Series directories under one root, opened on first use.
+
+    Parameters:
+        root (str): directory holding one subdirectory per series
+        flush_interval (float): seconds between flushes of each series' files
+    """
+
+    def __init__(self, root: str, flush_interval: float = 5.0):
+        self.root = root
+        self.flush_interval = flush_interval
+        self.open_series = {}
+
+    def series(self, name: str) -> Series:
+        """Return the writer for a series, e.g. "01-smoker" or "pit-07/01-smoker"."""
+        series = self.open_series.get(name)
+        if series is None:
+            series = self.open_series[name] = Series(os.path.join(self.root, name), self.flush_interval)
+        return series
+
+    def release(self, name: str):
+        """Flush and forget an open series; it is reopened on its next reading."""
+        series = self.open_series.pop(name, None)
+        if series is not None:
+            series.close()
+
+    def query(self, name: str, start: float, end: float, max_points: int = 1000,
+              resolution: int | None = None) -> tuple[int, list]:
+        """Return (resolution seconds, points) for a series between start and end (epoch seconds)."""
+        series = self.open_series.get(name)
+        if series is not None:
+            series.flush()
+        resolution, points = query_series(os.path.join(self.root, name), start, end, max_points, resolution)
+        if series is not None and resolution:
+            # Add the bucket still being filled, which only this process knows about
+            rollup = next(rollup for rollup in series.rollups if rollup.seconds == resolution)
+            point = rollup.open_point()
+            if point is not None and point.timestamp <= end:
+                points.append(point)
+        return resolution, points
+
+    def latest(self, name: str) -> float | None:
+        """Return the timestamp of the newest stored reading of a series, if any."""
+        series = self.open_series.get(name)
+        if series is not None:
+            return series.last
+        path = os.path.join(self.root, name, "raw.ts")
+        rows = _row_count(path, 8)
+        return _read_column(path, "d", rows - 1, rows)[0] if rows else None
+
+    def names(self) -> list[str]:
+        """Return every series stored under the root."""
+        found = []
+        for directory, _, files in os.walk(self.root):
+            if "raw.ts" in files:
+                found.append(os.path.relpath(directory, self.root).replace(os.sep, "/"))
+        return sorted(found)
+
+    def flush_if_due(self):
+        for series in self.open_series.values():
+            series.flush_if_due()
+
+    def close(self):
+        for series in self.open_series.values():
+            series.close()
+        self.open_series.clear()
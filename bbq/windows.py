@@ -0,0 +1,112 @@
+"""
+BBQ Time Windows
+
+File Description & Approach:
+A sliding window keyed by the reading timestamps rather than by a fixed count, so "the last
+2.5 minutes" means exactly that no matter how irregularly the readings arrive. Readings older than
+the span are evicted from the left of a deque as new ones are appended. Two monotonic deques keep
+the running minimum and maximum, so append/evict are O(1) amortized and first/last/min/max are
+O(1) without rescanning the window. Readings are expected in timestamp order, as they arrive from
+a queue.
+
+A window is ready once its readings cover the whole span without a gap. The window remembers
+where its current run of readings started, and a run ends whenever two consecutive readings are
+more than max_gap apart. After a sensor dropout or a pause longer than that, anywhere in the
+window, it is not ready again until a full span of new readings has arrived, so a change or rate
+is never computed across a gap.
+"""
+
+from collections import deque
+
+# Readings further apart than this fraction of the span break a window's coverage
+GAP_FRACTION = 0.5
+
+
+class TimeWindow:
+    """Readings from the last span seconds with running first/last/min/max.
+
+    Parameters:
+        span (float): window length in seconds
+        max_gap (float | None): longest seconds between readings that still count as covered;
+            None uses GAP_FRACTION of the span
+    """
+
+    def __init__(self, span: float, max_gap: float | None = None):
+        self.span = span
+        self.max_gap = span * GAP_FRACTION if max_gap is None else max_gap
+        self._items = deque()  # (timestamp, value) in arrival order
+        self._mins = deque()   # candidates for the minimum, values increasing
+        self._maxs = deque()   # candidates for the maximum, values decreasing
+        self._coverage_start = None  # timestamp of the first reading since the last gap
+
+    def append(self, timestamp: float, value: float):
+        """Add a reading and evict readings that have fallen out of the span."""
+        if self._coverage_start is None or timestamp - self._items[-1][0] > self.max_gap:
+            # First reading, or the first after a gap: coverage starts over
+            self._coverage_start = timestamp
+        self._items.append((timestamp, value))
+
+        # Drop candidates that can never be the min/max again
+        while self._mins and self._mins[-1][1] >= value:
+            self._mins.pop()
+        self._mins.append((timestamp, value))
+        while self._maxs and self._maxs[-1][1] <= value:
+            self._maxs.pop()
+        self._maxs.append((timestamp, value))
+
+        # Evict readings older than the span
+        cutoff = timestamp - self.span
+        while self._items[0][0] < cutoff:
+            self._items.popleft()
+        while self._mins[0][0] < cutoff:
+            self._mins.popleft()
+        while self._maxs[0][0] < cutoff:
+            self._maxs.popleft()
+
+    def restore(self, readings):
+        """Rebuild the window from saved (timestamp, value) readings, oldest first."""
+        for timestamp, value in readings:
+            self.append(timestamp, value)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def ready(self) -> bool:
+        """True while the readings cover the whole span with no gap longer than max_gap."""
+        return bool(self._items) and self._items[-1][0] - self._coverage_start >= self.span
+
+    @property
+    def first_timestamp(self) -> float | None:
+        """Timestamp of the oldest reading, or None while the window is empty."""
+        return self._items[0][0] if self._items else None
+
+    @property
+    def last_timestamp(self) -> float | None:
+        """Timestamp of the newest reading, or None while the window is empty."""
+        return self._items[-1][0] if self._items else None
+
+    @property
+    def first(self) -> float:
+        return self._items[0][1]
+
+    @property
+    def last(self) -> float:
+        return self._items[-1][1]
+
+    @property
+    def min(self) -> float:
+        return self._mins[0][1]
+
+    @property
+    def max(self) -> float:
+        return self._maxs[0][1]
+
+    @property
+    def change(self) -> float:
+        """Newest reading minus the oldest reading in the window."""
+        return self._items[-1][1] - self._items[0][1]
+
+    def items(self):
+        """Return the (timestamp, value) readings currently in the window."""
+        return list(self._items)
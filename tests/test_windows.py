@@ -0,0 +1,50 @@
+"""
+Regression tests for TimeWindow readiness (run with python -m pytest).
+"""
+
+from bbq.windows import TimeWindow
+
+
+def test_gap_inside_window_is_not_ready():
+    # Readings every 30 seconds, then a 400 second dropout still inside the 600 second span
+    window = TimeWindow(600)
+    for timestamp in range(-700, 101, 30):
+        window.append(timestamp, 150.0)
+    assert window.ready
+    window.append(500, 151.0)
+    assert not window.ready
+
+
+def test_ready_again_after_a_full_span_of_new_readings():
+    window = TimeWindow(600)
+    for timestamp in range(0, 1000, 5):
+        window.append(timestamp, 150.0)
+    window.append(1900, 150.5)
+    assert len(window) == 1 and not window.ready
+    timestamp = 1900
+    while timestamp < 2495:
+        timestamp += 5
+        window.append(timestamp, 151.0)
+        assert not window.ready
+    window.append(2500, 151.0)
+    assert window.ready
+
+
+def test_backtest_matches_streaming_across_gaps():
+    import pytest
+
+    pd = pytest.importorskip("pandas")
+    from bbq.backtest import TIME_COLUMN, replay_alerts, rule_alerts
+    from bbq.consumer import FOOD_A_CHANNEL
+
+    # A slow rise with an interior dropout: stalls are only reported where the window is covered
+    timestamps = [t for t in range(0, 3600, 30) if not 1500 < t < 1900]
+    frame = pd.DataFrame({
+        TIME_COLUMN: [f"t{t}" for t in timestamps],
+        "timestamp": [float(t) for t in timestamps],
+        "Channel2": [150.0 + t / 4000 for t in timestamps],
+    })
+    expected = replay_alerts(frame, FOOD_A_CHANNEL)
+    assert expected
+    assert rule_alerts(frame, FOOD_A_CHANNEL) == expected
+    assert all(alert.timestamp - 1900 >= 600 for alert in expected if alert.timestamp > 1500)